@@ -0,0 +1,266 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from wet_lab.models import FastqFile
+from .models import FeatureOutput, FeatureRead, AnnotationMetadata, TaxonomicAnnotation, TaxonAbundance, TAXONOMY_RANKS
+
+# ranks a matrix can be collapsed to, highest to lowest; 'taxon' keeps every lineage and the lowest named taxon
+TAXON_ABUNDANCE_RANKS = TAXONOMY_RANKS + ['taxon']
+
+
+########################################
+# TAXON ABUNDANCE MATERIALIZATION      #
+########################################
+# lineage columns copied from TaxonomicAnnotation onto TaxonAbundance, lowest named taxon first
+TAXON_ABUNDANCE_FIELDS = ['ta_taxon', 'ta_domain', 'ta_kingdom', 'ta_supergroup', 'ta_phylum_division', 'ta_class',
+                          'ta_order', 'ta_family', 'ta_genus', 'ta_species']
+# first key of the pg_advisory_xact_lock(int, int) taken on a run while its TaxonAbundance rows are rebuilt,
+# so the lock does not collide with advisory locks keyed on other tables' pks
+TAXON_ABUNDANCE_LOCK_KEY = 7301
+
+
+def taxon_abundance_sql():
+    # INSERT ... SELECT of the summed reads per annotation run, extraction and lineage of one denoise/cluster run;
+    # params are (refreshed_datetime, denoise_cluster_metadata pk, denoise_cluster_metadata pk)
+    qn = connection.ops.quote_name
+    lineage_columns = [qn(TaxonomicAnnotation._meta.get_field(field).column) for field in TAXON_ABUNDANCE_FIELDS]
+    return 'INSERT INTO {abundance} ({run}, {annotation_run}, {extraction}, {lineage}, {number_reads}, ' \
+           '{number_features}, {refreshed}) ' \
+           'SELECT o.{feature_run}, t.{annotation}, r.{read_extraction}, {t_lineage}, SUM(r.{read_number_reads}), ' \
+           'COUNT(DISTINCT o.{feature_pk}), %s ' \
+           'FROM {annotation_table} t ' \
+           'INNER JOIN {annotation_metadata_table} a ON a.{annotation_metadata_pk} = t.{annotation} ' \
+           'INNER JOIN {feature_table} o ON o.{feature_pk} = t.{annotation_feature} ' \
+           'INNER JOIN {read_table} r ON r.{read_feature} = o.{feature_pk} ' \
+           'WHERE o.{feature_run} = %s AND a.{annotation_metadata_run} = %s AND r.{read_extraction} IS NOT NULL ' \
+           'GROUP BY o.{feature_run}, t.{annotation}, r.{read_extraction}, {t_lineage}'.format(
+               abundance=qn(TaxonAbundance._meta.db_table),
+               run=qn(TaxonAbundance._meta.get_field('denoise_cluster_metadata').column),
+               annotation_run=qn(TaxonAbundance._meta.get_field('annotation_metadata').column),
+               extraction=qn(TaxonAbundance._meta.get_field('extraction').column),
+               lineage=', '.join(qn(TaxonAbundance._meta.get_field(field).column) for field in TAXON_ABUNDANCE_FIELDS),
+               number_reads=qn(TaxonAbundance._meta.get_field('number_reads').column),
+               number_features=qn(TaxonAbundance._meta.get_field('number_features').column),
+               refreshed=qn(TaxonAbundance._meta.get_field('refreshed_datetime').column),
+               t_lineage=', '.join('t.{column}'.format(column=column) for column in lineage_columns),
+               annotation_table=qn(TaxonomicAnnotation._meta.db_table),
+               annotation=qn(TaxonomicAnnotation._meta.get_field('annotation_metadata').column),
+               annotation_feature=qn(TaxonomicAnnotation._meta.get_field('feature').column),
+               annotation_metadata_table=qn(AnnotationMetadata._meta.db_table),
+               annotation_metadata_pk=qn(AnnotationMetadata._meta.pk.column),
+               annotation_metadata_run=qn(AnnotationMetadata._meta.get_field('denoise_cluster_metadata').column),
+               feature_table=qn(FeatureOutput._meta.db_table),
+               feature_pk=qn(FeatureOutput._meta.pk.column),
+               feature_run=qn(FeatureOutput._meta.get_field('denoise_cluster_metadata').column),
+               read_table=qn(FeatureRead._meta.db_table),
+               read_feature=qn(FeatureRead._meta.get_field('feature').column),
+               read_extraction=qn(FeatureRead._meta.get_field('extraction').column),
+               read_number_reads=qn(FeatureRead._meta.get_field('number_reads').column))
+
+
+def materialize_taxon_abundance(denoise_cluster_metadata_pk):
+    # rebuild the TaxonAbundance rows of one denoise/cluster run from its reads and annotations in the database,
+    # replacing the previous rows in the same transaction; returns the number of rows written. Concurrent rebuilds
+    # of the same run queue on an advisory lock, otherwise both could delete and then both insert, doubling the rows.
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [TAXON_ABUNDANCE_LOCK_KEY, denoise_cluster_metadata_pk])
+        TaxonAbundance.objects.filter(denoise_cluster_metadata_id=denoise_cluster_metadata_pk).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(taxon_abundance_sql(), [timezone.now(), denoise_cluster_metadata_pk, denoise_cluster_metadata_pk])
+            created = cursor.rowcount
+    return created
+
+
+########################################
+# TAXON ABUNDANCE MATRIX               #
+########################################
+def get_rank_fields(rank='taxon'):
+    # TaxonAbundance lineage columns down to and including rank, e.g., 'class' is domain ... class
+    if rank not in TAXON_ABUNDANCE_RANKS:
+        raise ValueError('Unknown rank "{rank}"'.format(rank=rank))
+    ranks = TAXON_ABUNDANCE_RANKS[:TAXON_ABUNDANCE_RANKS.index(rank) + 1]
+    return ['ta_{rank}'.format(rank=lineage_rank) for lineage_rank in ranks]
+
+
+def get_default_annotation_metadata(denoise_cluster_metadata):
+    # the latest annotation run of a denoise/cluster run
+    return AnnotationMetadata.objects.filter(denoise_cluster_metadata=denoise_cluster_metadata).order_by(
+        '-analysis_datetime', '-pk').first()
+
+
+def get_taxon_abundance_queryset(denoise_cluster_metadata, annotation_metadata):
+    # the materialized rows of an annotation run; a run whose matrix was never built, e.g., annotations loaded
+    # before TaxonAbundance existed, is materialized on first use
+    queryset = TaxonAbundance.objects.filter(denoise_cluster_metadata=denoise_cluster_metadata,
+                                             annotation_metadata=annotation_metadata)
+    if not queryset.exists() and TaxonomicAnnotation.objects.filter(annotation_metadata=annotation_metadata).exists():
+        materialize_taxon_abundance(denoise_cluster_metadata.pk)
+    return queryset
+
+
+def get_taxon_abundance_matrix(denoise_cluster_metadata, annotation_metadata=None, rank='taxon'):
+    # taxon x extraction read counts as columnar arrays, summed in the database to rank:
+    # {'rank': ..., 'taxa': {lineage column: [...]}, 'extractions': [barcode_slug, ...],
+    #  'matrix': {'taxon': [row index], 'extraction': [column index], 'number_reads': [count]}}
+    # the matrix is sparse; extraction and taxon pairs without reads are left out
+    rank_fields = get_rank_fields(rank)
+    if annotation_metadata is None:
+        annotation_metadata = get_default_annotation_metadata(denoise_cluster_metadata)
+    matrix = {'denoise_cluster_metadata': denoise_cluster_metadata.denoise_cluster_slug,
+              'annotation_metadata': annotation_metadata.annotation_slug if annotation_metadata else None,
+              'rank': rank,
+              'taxa': {field: [] for field in rank_fields},
+              'extractions': [],
+              'matrix': {'taxon': [], 'extraction': [], 'number_reads': []}}
+    if annotation_metadata is None:
+        return matrix
+    rows = get_taxon_abundance_queryset(denoise_cluster_metadata, annotation_metadata).values(
+        *rank_fields, 'extraction__barcode_slug').annotate(number_reads=Sum('number_reads')).order_by(*rank_fields)
+    taxa = {}
+    extractions = {}
+    for row in rows:
+        lineage = tuple(row[field] for field in rank_fields)
+        if lineage not in taxa:
+            taxa[lineage] = len(taxa)
+            for field, name in zip(rank_fields, lineage):
+                matrix['taxa'][field].append(name)
+        barcode_slug = row['extraction__barcode_slug']
+        if barcode_slug not in extractions:
+            extractions[barcode_slug] = len(extractions)
+            matrix['extractions'].append(barcode_slug)
+        matrix['matrix']['taxon'].append(taxa[lineage])
+        matrix['matrix']['extraction'].append(extractions[barcode_slug])
+        matrix['matrix']['number_reads'].append(row['number_reads'])
+    return matrix
+
+
+def get_taxon_abundance_rows(matrix):
+    # the dense form of get_taxon_abundance_matrix for csv: (header, rows), one row per taxon with its lineage
+    # columns followed by one count column per extraction
+    rank_fields = list(matrix['taxa'])
+    header = rank_fields + matrix['extractions']
+    rows = [dict(zip(rank_fields, lineage), **{barcode_slug: 0 for barcode_slug in matrix['extractions']})
+            for lineage in zip(*matrix['taxa'].values())]
+    for taxon, extraction, number_reads in zip(*matrix['matrix'].values()):
+        rows[taxon][matrix['extractions'][extraction]] = number_reads
+    return header, rows
+
+
+########################################
+# TAXON ROLLUPS                        #
+########################################
+# ta_* ranks and the curated manual_* ranks a rollup can be summed to
+TAXON_ROLLUP_RANKS = TAXON_ABUNDANCE_RANKS + ['manual_{rank}'.format(rank=rank) for rank in TAXONOMY_RANKS]
+# sample groups a rollup can be split by
+TAXON_ROLLUP_GROUPS = ['site', 'project', 'month', 'primer']
+
+
+def get_rollup_rank_field(rank='taxon'):
+    # FeatureRead path of a rank's name through the feature's annotations, e.g., 'genus' is ta_genus and
+    # 'manual_genus' is the name of the curated TaxonGenus
+    if rank not in TAXON_ROLLUP_RANKS:
+        raise ValueError('Unknown rank "{rank}"'.format(rank=rank))
+    if rank.startswith('manual_'):
+        return 'feature__taxonomicannotation__{rank}__taxon_{name}'.format(rank=rank, name=rank[len('manual_'):])
+    return 'feature__taxonomicannotation__ta_{rank}'.format(rank=rank)
+
+
+def get_rollup_group_expression(group_by):
+    # FeatureRead expression of a sample group; reads of a survey in several projects count toward each project,
+    # month is truncated in the database, and primer is the primer set of the extraction's fastq files within the
+    # run's quality metadata, picked by subquery so paired fastq files do not double the reads
+    if group_by == 'site':
+        return F('extraction__field_sample__survey_global_id__site_id__site_id')
+    if group_by == 'project':
+        return F('extraction__field_sample__survey_global_id__project_ids__project_code')
+    if group_by == 'month':
+        return TruncMonth('extraction__field_sample__survey_global_id__survey_datetime')
+    if group_by == 'primer':
+        return Subquery(FastqFile.objects.filter(
+            fastq_files=OuterRef('feature__denoise_cluster_metadata__quality_metadata'),
+            extraction=OuterRef('extraction')).order_by('primer_set__primer_set_name').values(
+            'primer_set__primer_set_name')[:1])
+    raise ValueError('Unknown group "{group_by}"'.format(group_by=group_by))
+
+
+def get_taxon_rollup_version(denoise_cluster_metadata_pk):
+    # per run token in every rollup cache key: the latest refresh of the run's materialized TaxonAbundance, which
+    # materialize_taxon_abundance rewrites after the run's reads or annotations change, so every cached rank and
+    # group of the run misses at once. it is read from the database rather than kept in the cache so a refresh
+    # by the celery worker is seen by every web process whatever the cache backend
+    refreshed = TaxonAbundance.objects.filter(denoise_cluster_metadata_id=denoise_cluster_metadata_pk).aggregate(
+        refreshed=Max('refreshed_datetime'))['refreshed']
+    return int(refreshed.timestamp() * 1000000) if refreshed else 0
+
+
+def query_taxon_rollup(denoise_cluster_metadata, annotation_metadata, rank='taxon', group_by=None):
+    # summed reads of the run's features by rank name, and by sample group when group_by is set, of one
+    # annotation run; features without an annotation in that run are left out
+    rank_field = get_rollup_rank_field(rank)
+    reads = FeatureRead.objects.filter(feature__denoise_cluster_metadata=denoise_cluster_metadata,
+                                       feature__taxonomicannotation__annotation_metadata=annotation_metadata)
+    columns = {'taxon': F(rank_field)}
+    if group_by:
+        columns['group'] = get_rollup_group_expression(group_by)
+    rows = reads.values(**columns).annotate(number_reads=Sum('number_reads')).order_by(*columns)
+    rollup = {'group': [], 'taxon': [], 'number_reads': []}
+    for row in rows:
+        group = row.get('group')
+        if group_by == 'month' and group is not None:
+            # same label as the dashboard charts
+            group = group.strftime('%m/%Y')
+        rollup['group'].append(group)
+        rollup['taxon'].append(row['taxon'])
+        rollup['number_reads'].append(row['number_reads'])
+    return rollup
+
+
+def get_taxon_rollup(denoise_cluster_metadata, annotation_metadata=None, rank='taxon', group_by=None):
+    # cached query_taxon_rollup as columnar arrays:
+    # {'rank': ..., 'group_by': ..., 'rollup': {'group': [...], 'taxon': [...], 'number_reads': [...]}}
+    # annotation_metadata defaults to the run's latest annotation run
+    if group_by is not None and group_by not in TAXON_ROLLUP_GROUPS:
+        raise ValueError('Unknown group "{group_by}"'.format(group_by=group_by))
+    get_rollup_rank_field(rank)
+    if annotation_metadata is None:
+        annotation_metadata = get_default_annotation_metadata(denoise_cluster_metadata)
+    rollup = {'denoise_cluster_metadata': denoise_cluster_metadata.denoise_cluster_slug,
+              'annotation_metadata': annotation_metadata.annotation_slug if annotation_metadata else None,
+              'rank': rank,
+              'group_by': group_by,
+              'rollup': {'group': [], 'taxon': [], 'number_reads': []}}
+    if annotation_metadata is None:
+        return rollup
+    key = 'taxon_rollup:{pk}:{version}:{annotation}:{rank}:{group_by}'.format(
+        pk=denoise_cluster_metadata.pk, version=get_taxon_rollup_version(denoise_cluster_metadata.pk),
+        annotation=annotation_metadata.pk, rank=rank, group_by=group_by or '')
+    rollup['rollup'] = cache.get(key)
+    if rollup['rollup'] is None:
+        rollup['rollup'] = query_taxon_rollup(denoise_cluster_metadata, annotation_metadata, rank, group_by)
+        cache.set(key, rollup['rollup'], settings.TAXON_ROLLUP_CACHE_TIMEOUT)
+    return rollup
+
+
+def get_taxon_rollup_chart(rollup, top=10):
+    # chart.js form of get_taxon_rollup: 'labels' are the groups, one dataset per taxon of the top taxa by
+    # reads, the rest summed into 'Other'; 'data' is the total of each group, as in the other dashboard charts
+    totals = {}
+    for taxon, number_reads in zip(rollup['rollup']['taxon'], rollup['rollup']['number_reads']):
+        totals[taxon] = totals.get(taxon, 0) + number_reads
+    top_taxa = sorted(totals, key=lambda taxon: totals[taxon], reverse=True)[:top]
+    labels = list(dict.fromkeys(rollup['rollup']['group']))
+    group_index = {group: index for index, group in enumerate(labels)}
+    datasets = {taxon: [0] * len(labels) for taxon in top_taxa}
+    data = [0] * len(labels)
+    for group, taxon, number_reads in zip(*rollup['rollup'].values()):
+        label = taxon if taxon in datasets else 'Other'
+        if label not in datasets:
+            datasets[label] = [0] * len(labels)
+        datasets[label][group_index[group]] += number_reads
+        data[group_index[group]] += number_reads
+    return {'labels': labels, 'data': data,
+            'datasets': [{'label': label, 'data': counts} for label, counts in datasets.items()]}
@@ -2,16 +2,40 @@
 # from django.contrib import admin
 from django.contrib.gis import admin
 from import_export.admin import ImportExportActionModelAdmin
-from .models import QualityMetadata, DenoiseClusterMethod, DenoiseClusterMetadata, FeatureOutput, FeatureRead, \
+from utility.dispatch import queue_cascade
+from .models import QualityMetadata, DenoiseClusterMethod, DenoiseClusterMetadata, FeatureSequence, FeatureOutput, FeatureRead, \
     ReferenceDatabase, TaxonDomain, TaxonKingdom, TaxonSupergroup, TaxonPhylumDivision, \
     TaxonClass, TaxonOrder, TaxonFamily, TaxonGenus, TaxonSpecies, AnnotationMethod, AnnotationMetadata, \
     TaxonomicAnnotation
+from .forms import FeatureOutputAdminForm
 from .resources import QualityMetadataAdminResource, DenoiseClusterMethodAdminResource, \
     DenoiseClusterMetadataAdminResource, FeatureOutputAdminResource, FeatureReadAdminResource, \
     ReferenceDatabaseAdminResource, TaxonDomainAdminResource, TaxonKingdomAdminResource, TaxonSupergroupAdminResource, \
     TaxonPhylumDivisionAdminResource, TaxonClassAdminResource, TaxonOrderAdminResource, TaxonFamilyAdminResource, \
     TaxonGenusAdminResource, TaxonSpeciesAdminResource, \
     AnnotationMethodAdminResource, AnnotationMetadataAdminResource, TaxonomicAnnotationAdminResource
+from .tasks import refresh_taxon_abundance
+
+
+class RefreshTaxonAbundanceAdminMixin:
+    # deletes send no signal for the abundance matrix, see signals.py, so admin deletes of the rows it is summed
+    # from queue the rebuild of their runs; run_lookup is the path from the model to its DenoiseClusterMetadata
+    run_lookup = None
+
+    def get_denoise_cluster_metadata_pks(self, queryset):
+        return list(queryset.order_by().values_list(self.run_lookup, flat=True).distinct())
+
+    def delete_model(self, request, obj):
+        denoise_cluster_metadata_pks = self.get_denoise_cluster_metadata_pks(self.model.objects.filter(pk=obj.pk))
+        super().delete_model(request, obj)
+        for denoise_cluster_metadata_pk in denoise_cluster_metadata_pks:
+            queue_cascade(refresh_taxon_abundance, denoise_cluster_metadata_pk)
+
+    def delete_queryset(self, request, queryset):
+        denoise_cluster_metadata_pks = self.get_denoise_cluster_metadata_pks(queryset)
+        super().delete_queryset(request, queryset)
+        for denoise_cluster_metadata_pk in denoise_cluster_metadata_pks:
+            queue_cascade(refresh_taxon_abundance, denoise_cluster_metadata_pk)
 
 
 class QualityMetadataAdmin(ImportExportActionModelAdmin):
@@ -149,15 +173,32 @@ class DenoiseClusterMetadataAdmin(ImportExportActionModelAdmin):
 admin.site.register(DenoiseClusterMetadata, DenoiseClusterMetadataAdmin)
 
 
-class FeatureOutputAdmin(ImportExportActionModelAdmin):
+class FeatureSequenceAdmin(admin.ModelAdmin):
+    # sequences are added through FeatureOutput and shared by every run that saw them
+    list_display = ('__str__', 'created_by', 'created_datetime', )
+    readonly_fields = ('sequence_hash', 'feature_sequence', 'created_by', 'modified_datetime', 'created_datetime', )
+    search_fields = ['=sequence_hash', ]
+
+    def has_add_permission(self, request, obj=None):
+        # disable add because rows are created by FeatureOutput.save() and the feature table loader
+        return False
+
+
+admin.site.register(FeatureSequence, FeatureSequenceAdmin)
+
+
+class FeatureOutputAdmin(RefreshTaxonAbundanceAdminMixin, ImportExportActionModelAdmin):
     # import_export configs - export ONLY
+    run_lookup = 'denoise_cluster_metadata'
     resource_class = FeatureOutputAdminResource
+    form = FeatureOutputAdminForm
     # changes the order of how the tables are displayed and specifies what to display
     # search_fields = ['project', 'system', 'watershed']
     list_display = ('__str__', 'created_by', 'created_datetime', )
     # list_filter = ('denoise_cluster_metadata__denoise_cluster_slug', )
     readonly_fields = ('feature_slug', 'modified_datetime', 'created_datetime', )
-    search_fields = ['feature_id', 'feature_sequence', ]
+    # sequences are matched on their indexed sha1 sequence_hash rather than the sequence text
+    search_fields = ['feature_id', '=sequence__sequence_hash', ]
     autocomplete_fields = ['denoise_cluster_metadata', ]
 
     def add_view(self, request, extra_content=None):
@@ -188,8 +229,9 @@ class FeatureOutputAdmin(ImportExportActionModelAdmin):
 admin.site.register(FeatureOutput, FeatureOutputAdmin)
 
 
-class FeatureReadAdmin(ImportExportActionModelAdmin):
+class FeatureReadAdmin(RefreshTaxonAbundanceAdminMixin, ImportExportActionModelAdmin):
     # import_export configs - export ONLY
+    run_lookup = 'feature__denoise_cluster_metadata'
     resource_class = FeatureReadAdminResource
     # changes the order of how the tables are displayed and specifies what to display
     # search_fields = ['project', 'system', 'watershed']
@@ -730,8 +772,9 @@ class AnnotationMetadataAdmin(ImportExportActionModelAdmin):
 admin.site.register(AnnotationMetadata, AnnotationMetadataAdmin)
 
 
-class TaxonomicAnnotationAdmin(ImportExportActionModelAdmin):
+class TaxonomicAnnotationAdmin(RefreshTaxonAbundanceAdminMixin, ImportExportActionModelAdmin):
     # import_export configs - export ONLY
+    run_lookup = 'annotation_metadata__denoise_cluster_metadata'
     resource_class = TaxonomicAnnotationAdminResource
     # changes the order of how the tables are displayed and specifies what to display
     # search_fields = ['project', 'system', 'watershed']
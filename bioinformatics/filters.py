@@ -1,11 +1,11 @@
 from django_filters import rest_framework as filters
 from users.models import CustomUser
 from utility.models import ProcessLocation
-from utility.widgets import CustomSelect2Multiple, CustomSelect2
+from utility.widgets import CustomSelect2Multiple, CustomSelect2, Select2Autocomplete
 from wet_lab.models import RunResult, Extraction
 from .models import QualityMetadata, DenoiseClusterMethod, DenoiseClusterMetadata, FeatureOutput, FeatureRead, \
     ReferenceDatabase, TaxonDomain, TaxonKingdom, TaxonSupergroup, TaxonPhylumDivision, TaxonClass, TaxonOrder, \
-    TaxonFamily, TaxonGenus, TaxonSpecies, AnnotationMethod, AnnotationMetadata, TaxonomicAnnotation
+    TaxonFamily, TaxonGenus, TaxonSpecies, AnnotationMethod, AnnotationMetadata, TaxonomicAnnotation, get_sequence_hash
 
 
 # Create your filters here.
@@ -22,7 +22,7 @@ def get_quality_metadata_analysis_label_choices(model=QualityMetadata, field='an
 
 
 class QualityMetadataFilter(filters.FilterSet):
-    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=CustomSelect2)
+    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'))
     process_location = filters.ModelChoiceFilter(field_name='process_location__process_location_name', queryset=ProcessLocation.objects.all(), widget=CustomSelect2)
     analysis_label = filters.ChoiceFilter(choices=get_quality_metadata_analysis_label_choices, widget=CustomSelect2)
 
@@ -41,9 +41,9 @@ def get_denoise_cluster_metadata_analysis_label_choices(model=DenoiseClusterMeta
 
 
 class DenoiseClusterMetadataFilter(filters.FilterSet):
-    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=CustomSelect2)
+    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'))
     process_location = filters.ModelChoiceFilter(field_name='process_location__process_location_name', queryset=ProcessLocation.objects.all(), widget=CustomSelect2)
-    quality_metadata = filters.ModelChoiceFilter(field_name='quality_metadata__quality_slug', queryset=QualityMetadata.objects.all(), widget=CustomSelect2)
+    quality_metadata = filters.ModelChoiceFilter(field_name='quality_metadata__quality_slug', queryset=QualityMetadata.objects.all(), widget=Select2Autocomplete(url='autocomplete_qualitymetadata'))
     analysis_label = filters.ChoiceFilter(choices=get_denoise_cluster_metadata_analysis_label_choices, widget=CustomSelect2)
     denoise_cluster_method = filters.ModelChoiceFilter(field_name='denoise_cluster_method__denoise_cluster_method_slug', queryset=DenoiseClusterMethod.objects.all(), widget=CustomSelect2)
 
@@ -53,8 +53,8 @@ class DenoiseClusterMetadataFilter(filters.FilterSet):
 
 
 class FeatureOutputFilter(filters.FilterSet):
-    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=CustomSelect2)
-    denoise_cluster_metadata = filters.ModelChoiceFilter(field_name='denoise_cluster_metadata__denoise_cluster_slug', queryset=DenoiseClusterMetadata.objects.all(), widget=CustomSelect2)
+    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'))
+    denoise_cluster_metadata = filters.ModelChoiceFilter(field_name='denoise_cluster_metadata__denoise_cluster_slug', queryset=DenoiseClusterMetadata.objects.all(), widget=Select2Autocomplete(url='autocomplete_denoiseclustermetadata'))
 
     class Meta:
         model = FeatureOutput
@@ -62,9 +62,9 @@ class FeatureOutputFilter(filters.FilterSet):
 
 
 class FeatureReadFilter(filters.FilterSet):
-    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=CustomSelect2)
-    extraction = filters.ModelChoiceFilter(field_name='extraction__barcode_slug', queryset=Extraction.objects.all(), widget=CustomSelect2)
-    feature = filters.ModelChoiceFilter(field_name='feature__feature_slug', queryset=FeatureOutput.objects.all(), widget=CustomSelect2)
+    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'))
+    extraction = filters.ModelChoiceFilter(field_name='extraction__barcode_slug', queryset=Extraction.objects.all(), widget=Select2Autocomplete(url='autocomplete_extraction'))
+    feature = filters.ModelChoiceFilter(field_name='feature__feature_slug', queryset=FeatureOutput.objects.all(), widget=Select2Autocomplete(url='autocomplete_featureoutput'))
 
     class Meta:
         model = FeatureRead
@@ -81,10 +81,10 @@ def get_annotation_metadata_analysis_label_choices(model=AnnotationMetadata, fie
 
 
 class AnnotationMetadataFilter(filters.FilterSet):
-    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=CustomSelect2)
+    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'))
     analysis_label = filters.ChoiceFilter(choices=get_annotation_metadata_analysis_label_choices, widget=CustomSelect2)
     process_location = filters.ModelChoiceFilter(field_name='process_location__process_location_name', queryset=ProcessLocation.objects.all(), widget=CustomSelect2)
-    denoise_cluster_metadata = filters.ModelChoiceFilter(field_name='denoise_cluster_metadata__denoise_cluster_slug', queryset=DenoiseClusterMetadata.objects.all(), widget=CustomSelect2)
+    denoise_cluster_metadata = filters.ModelChoiceFilter(field_name='denoise_cluster_metadata__denoise_cluster_slug', queryset=DenoiseClusterMetadata.objects.all(), widget=Select2Autocomplete(url='autocomplete_denoiseclustermetadata'))
     annotation_method = filters.ModelChoiceFilter(field_name='annotation_method__annotation_method_name_slug', queryset=AnnotationMethod.objects.all(), widget=CustomSelect2)
 
     class Meta:
@@ -92,130 +92,31 @@ class AnnotationMetadataFilter(filters.FilterSet):
         fields = ['created_by', 'analysis_label', 'process_location', 'denoise_cluster_metadata', 'annotation_method', ]
 
 
-def get_ta_taxon_choices(model=TaxonomicAnnotation, field='ta_taxon'):
-    # https://stackoverflow.com/questions/55123710/django-filters-modelchoicefilter-distinct-values-from-field
-    # https://github.com/carltongibson/django-filter/issues/877
-    choices = []
-    for k in model.objects.values_list(field).distinct():
-        choices.append((k[0], k[0]))
-    return choices
-
-
-def get_ta_domain_choices(model=TaxonomicAnnotation, field='ta_domain'):
-    # https://stackoverflow.com/questions/55123710/django-filters-modelchoicefilter-distinct-values-from-field
-    # https://github.com/carltongibson/django-filter/issues/877
-    choices = []
-    for k in model.objects.values_list(field).distinct():
-        choices.append((k[0], k[0]))
-    return choices
-
-
-def get_ta_kingdom_choices(model=TaxonomicAnnotation, field='ta_kingdom'):
-    # https://stackoverflow.com/questions/55123710/django-filters-modelchoicefilter-distinct-values-from-field
-    # https://github.com/carltongibson/django-filter/issues/877
-    choices = []
-    for k in model.objects.values_list(field).distinct():
-        choices.append((k[0], k[0]))
-    return choices
-
-
-def get_ta_supergroup_choices(model=TaxonomicAnnotation, field='ta_supergroup'):
-    # https://stackoverflow.com/questions/55123710/django-filters-modelchoicefilter-distinct-values-from-field
-    # https://github.com/carltongibson/django-filter/issues/877
-    choices = []
-    for k in model.objects.values_list(field).distinct():
-        choices.append((k[0], k[0]))
-    return choices
-
-
-def get_ta_phylum_division_choices(model=TaxonomicAnnotation, field='ta_phylum_division'):
-    # https://stackoverflow.com/questions/55123710/django-filters-modelchoicefilter-distinct-values-from-field
-    # https://github.com/carltongibson/django-filter/issues/877
-    choices = []
-    for k in model.objects.values_list(field).distinct():
-        choices.append((k[0], k[0]))
-    return choices
-
-
-def get_ta_class_choices(model=TaxonomicAnnotation, field='ta_class'):
-    # https://stackoverflow.com/questions/55123710/django-filters-modelchoicefilter-distinct-values-from-field
-    # https://github.com/carltongibson/django-filter/issues/877
-    choices = []
-    for k in model.objects.values_list(field).distinct():
-        choices.append((k[0], k[0]))
-    return choices
-
-
-def get_ta_order_choices(model=TaxonomicAnnotation, field='ta_order'):
-    # https://stackoverflow.com/questions/55123710/django-filters-modelchoicefilter-distinct-values-from-field
-    # https://github.com/carltongibson/django-filter/issues/877
-    choices = []
-    for k in model.objects.values_list(field).distinct():
-        choices.append((k[0], k[0]))
-    return choices
-
-
-def get_ta_family_choices(model=TaxonomicAnnotation, field='ta_family'):
-    # https://stackoverflow.com/questions/55123710/django-filters-modelchoicefilter-distinct-values-from-field
-    # https://github.com/carltongibson/django-filter/issues/877
-    choices = []
-    for k in model.objects.values_list(field).distinct():
-        choices.append((k[0], k[0]))
-    return choices
-
-
-def get_ta_genus_choices(model=TaxonomicAnnotation, field='ta_genus'):
-    # https://stackoverflow.com/questions/55123710/django-filters-modelchoicefilter-distinct-values-from-field
-    # https://github.com/carltongibson/django-filter/issues/877
-    choices = []
-    for k in model.objects.values_list(field).distinct():
-        choices.append((k[0], k[0]))
-    return choices
-
-
-def get_ta_species_choices(model=TaxonomicAnnotation, field='ta_species'):
-    # https://stackoverflow.com/questions/55123710/django-filters-modelchoicefilter-distinct-values-from-field
-    # https://github.com/carltongibson/django-filter/issues/877
-    choices = []
-    for k in model.objects.values_list(field).distinct():
-        choices.append((k[0], k[0]))
-    return choices
-
-
-def get_ta_common_name_choices(model=TaxonomicAnnotation, field='ta_common_name'):
-    # https://stackoverflow.com/questions/55123710/django-filters-modelchoicefilter-distinct-values-from-field
-    # https://github.com/carltongibson/django-filter/issues/877
-    choices = []
-    for k in model.objects.values_list(field).distinct():
-        choices.append((k[0], k[0]))
-    return choices
-
-
 class TaxonomicAnnotationFilter(filters.FilterSet):
-    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=CustomSelect2)
-    feature = filters.ModelChoiceFilter(field_name='feature__feature_slug', queryset=FeatureOutput.objects.all(), widget=CustomSelect2)
-    annotation_metadata = filters.ModelChoiceFilter(field_name='annotation_metadata__annotation_slug', queryset=AnnotationMetadata.objects.all(), widget=CustomSelect2)
+    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'))
+    feature = filters.ModelChoiceFilter(field_name='feature__feature_slug', queryset=FeatureOutput.objects.all(), widget=Select2Autocomplete(url='autocomplete_featureoutput'))
+    annotation_metadata = filters.ModelChoiceFilter(field_name='annotation_metadata__annotation_slug', queryset=AnnotationMetadata.objects.all(), widget=Select2Autocomplete(url='autocomplete_annotationmetadata'))
     reference_database = filters.ModelChoiceFilter(field_name='reference_database__refdb_slug', queryset=ReferenceDatabase.objects.all(), widget=CustomSelect2)
-    ta_taxon = filters.ChoiceFilter(choices=get_ta_taxon_choices, widget=CustomSelect2)
-    ta_domain = filters.ChoiceFilter(choices=get_ta_domain_choices, widget=CustomSelect2)
-    ta_kingdom = filters.ChoiceFilter(choices=get_ta_kingdom_choices, widget=CustomSelect2)
-    ta_supergroup = filters.ChoiceFilter(choices=get_ta_supergroup_choices, widget=CustomSelect2)
-    ta_phylum_division = filters.ChoiceFilter(choices=get_ta_phylum_division_choices, widget=CustomSelect2)
-    ta_class = filters.ChoiceFilter(choices=get_ta_class_choices, widget=CustomSelect2)
-    ta_order = filters.ChoiceFilter(choices=get_ta_order_choices, widget=CustomSelect2)
-    ta_family = filters.ChoiceFilter(choices=get_ta_family_choices, widget=CustomSelect2)
-    ta_genus = filters.ChoiceFilter(choices=get_ta_genus_choices, widget=CustomSelect2)
-    ta_species = filters.ChoiceFilter(choices=get_ta_species_choices, widget=CustomSelect2)
-    ta_common_name = filters.ChoiceFilter(choices=get_ta_common_name_choices, widget=CustomSelect2)
-    manual_domain = filters.ModelChoiceFilter(field_name='manual_domain__taxon_domain_slug', queryset=TaxonDomain.objects.all(), widget=CustomSelect2)
-    manual_kingdom = filters.ModelChoiceFilter(field_name='manual_kingdom__taxon_kingdom_slug', queryset=TaxonKingdom.objects.all(), widget=CustomSelect2)
-    manual_supergroup = filters.ModelChoiceFilter(field_name='manual_supergroup__taxon_supergroup_slug', queryset=TaxonSupergroup.objects.all(), widget=CustomSelect2)
-    manual_phylum_division = filters.ModelChoiceFilter(field_name='manual_phylum_division__taxon_phylum_division_slug', queryset=TaxonPhylumDivision.objects.all(), widget=CustomSelect2)
-    manual_class = filters.ModelChoiceFilter(field_name='manual_class__taxon_class_slug', queryset=TaxonClass.objects.all(), widget=CustomSelect2)
-    manual_order = filters.ModelChoiceFilter(field_name='manual_order__taxon_order_slug', queryset=TaxonOrder.objects.all(), widget=CustomSelect2)
-    manual_family = filters.ModelChoiceFilter(field_name='manual_family__taxon_family_slug', queryset=TaxonFamily.objects.all(), widget=CustomSelect2)
-    manual_genus = filters.ModelChoiceFilter(field_name='manual_genus__taxon_genus_slug', queryset=TaxonGenus.objects.all(), widget=CustomSelect2)
-    manual_species = filters.ModelChoiceFilter(field_name='manual_species__taxon_species_slug', queryset=TaxonSpecies.objects.all(), widget=CustomSelect2)
+    ta_taxon = filters.CharFilter(widget=Select2Autocomplete(url='autocomplete_annotation_taxon'))
+    ta_domain = filters.CharFilter(widget=Select2Autocomplete(url='autocomplete_annotation_domain'))
+    ta_kingdom = filters.CharFilter(widget=Select2Autocomplete(url='autocomplete_annotation_kingdom'))
+    ta_supergroup = filters.CharFilter(widget=Select2Autocomplete(url='autocomplete_annotation_supergroup'))
+    ta_phylum_division = filters.CharFilter(widget=Select2Autocomplete(url='autocomplete_annotation_phylum_division'))
+    ta_class = filters.CharFilter(widget=Select2Autocomplete(url='autocomplete_annotation_class'))
+    ta_order = filters.CharFilter(widget=Select2Autocomplete(url='autocomplete_annotation_order'))
+    ta_family = filters.CharFilter(widget=Select2Autocomplete(url='autocomplete_annotation_family'))
+    ta_genus = filters.CharFilter(widget=Select2Autocomplete(url='autocomplete_annotation_genus'))
+    ta_species = filters.CharFilter(widget=Select2Autocomplete(url='autocomplete_annotation_species'))
+    ta_common_name = filters.CharFilter(widget=Select2Autocomplete(url='autocomplete_annotation_common_name'))
+    manual_domain = filters.ModelChoiceFilter(field_name='manual_domain__taxon_domain_slug', queryset=TaxonDomain.objects.all(), widget=Select2Autocomplete(url='autocomplete_taxon_domain'))
+    manual_kingdom = filters.ModelChoiceFilter(field_name='manual_kingdom__taxon_kingdom_slug', queryset=TaxonKingdom.objects.all(), widget=Select2Autocomplete(url='autocomplete_taxon_kingdom'))
+    manual_supergroup = filters.ModelChoiceFilter(field_name='manual_supergroup__taxon_supergroup_slug', queryset=TaxonSupergroup.objects.all(), widget=Select2Autocomplete(url='autocomplete_taxon_supergroup'))
+    manual_phylum_division = filters.ModelChoiceFilter(field_name='manual_phylum_division__taxon_phylum_division_slug', queryset=TaxonPhylumDivision.objects.all(), widget=Select2Autocomplete(url='autocomplete_taxon_phylum_division'))
+    manual_class = filters.ModelChoiceFilter(field_name='manual_class__taxon_class_slug', queryset=TaxonClass.objects.all(), widget=Select2Autocomplete(url='autocomplete_taxon_class'))
+    manual_order = filters.ModelChoiceFilter(field_name='manual_order__taxon_order_slug', queryset=TaxonOrder.objects.all(), widget=Select2Autocomplete(url='autocomplete_taxon_order'))
+    manual_family = filters.ModelChoiceFilter(field_name='manual_family__taxon_family_slug', queryset=TaxonFamily.objects.all(), widget=Select2Autocomplete(url='autocomplete_taxon_family'))
+    manual_genus = filters.ModelChoiceFilter(field_name='manual_genus__taxon_genus_slug', queryset=TaxonGenus.objects.all(), widget=Select2Autocomplete(url='autocomplete_taxon_genus'))
+    manual_species = filters.ModelChoiceFilter(field_name='manual_species__taxon_species_slug', queryset=TaxonSpecies.objects.all(), widget=Select2Autocomplete(url='autocomplete_taxon_species'))
 
     class Meta:
         model = TaxonomicAnnotation
@@ -268,10 +169,16 @@ class DenoiseClusterMetadataSerializerFilter(filters.FilterSet):
 class FeatureOutputSerializerFilter(filters.FilterSet):
     created_by = filters.CharFilter(field_name='created_by__email', lookup_expr='iexact')
     denoise_cluster_metadata = filters.CharFilter(field_name='denoise_cluster_metadata__denoise_cluster_slug', lookup_expr='iexact')
+    # every run's feature with this sequence, matched on the indexed sequence_hash
+    feature_sequence = filters.CharFilter(method='filter_feature_sequence')
+    sequence_hash = filters.CharFilter(field_name='sequence__sequence_hash', lookup_expr='exact')
 
     class Meta:
         model = FeatureOutput
-        fields = ['created_by', 'denoise_cluster_metadata', ]
+        fields = ['created_by', 'denoise_cluster_metadata', 'feature_sequence', 'sequence_hash', ]
+
+    def filter_feature_sequence(self, queryset, name, value):
+        return queryset.filter(sequence__sequence_hash=get_sequence_hash(value))
 
 
 class FeatureReadSerializerFilter(filters.FilterSet):
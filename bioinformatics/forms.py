@@ -343,7 +343,28 @@ class DenoiseClusterMetadataUpdateForm(forms.ModelForm):
         self.fields['analysis_sop'].queryset = StandardOperatingProcedure.objects.filter(sop_type=SopTypes.BIOINFO).order_by('-created_datetime')
 
 
-class FeatureOutputForm(forms.ModelForm):
+class FeatureSequenceFormMixin:
+    # feature_sequence is not a column of FeatureOutput; the text is edited here and linked to its
+    # FeatureSequence when the feature is saved
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.initial.setdefault('feature_sequence', self.instance.feature_sequence)
+
+    def save(self, commit=True):
+        self.instance.feature_sequence = self.cleaned_data['feature_sequence']
+        return super().save(commit)
+
+
+class FeatureOutputAdminForm(FeatureSequenceFormMixin, forms.ModelForm):
+    feature_sequence = forms.CharField(required=True, widget=forms.Textarea)
+
+    class Meta:
+        model = FeatureOutput
+        fields = ['feature_id', 'feature_sequence', 'denoise_cluster_metadata', 'created_by', ]
+
+
+class FeatureOutputForm(FeatureSequenceFormMixin, forms.ModelForm):
     feature_id = forms.CharField(
         required=True,
         widget=forms.Textarea(
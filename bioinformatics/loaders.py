@@ -0,0 +1,388 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import DecimalValidator
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from utility.dispatch import queue_cascade
+from utility.models import slug_date_format, get_default_user
+from .models import FeatureOutput, FeatureRead, TaxonomicAnnotation, TAXONOMY_RANKS, get_sequence_hash, \
+    resolve_feature_sequences
+from .tasks import refresh_taxon_abundance
+
+FEATURE_TABLE_FORMATS = ['tsv', 'biom']
+# rank prefixes of SILVA (d__), Greengenes (k__), NCBI (sk__) and PR2 style lineages
+TAXONOMY_RANK_PREFIXES = {'d': 'domain', 'sk': 'domain', 'k': 'kingdom', 'sg': 'supergroup', 'p': 'phylum_division',
+                          'dv': 'phylum_division', 'c': 'class', 'o': 'order', 'f': 'family', 'g': 'genus',
+                          's': 'species'}
+# ranks of lineages without prefixes, by position; SILVA 7 level taxonomy by default
+DEFAULT_TAXONOMY_RANKS = ['domain', 'phylum_division', 'class', 'order', 'family', 'genus', 'species']
+# classifier placeholders that are kept as the taxon but not as a rank
+UNASSIGNED_TAXA = ['unassigned', 'unclassified', 'unknown']
+
+
+class FeatureTableError(ValueError):
+    pass
+
+
+class TaxonomyTableError(ValueError):
+    pass
+
+
+########################################
+# FEATURE TABLE PARSING                #
+########################################
+def read_text(feature_file):
+    # uploaded files and files opened with open(path, 'rb') are read as utf-8 text
+    if isinstance(feature_file, (str, bytes)):
+        feature_file = io.BytesIO(feature_file.encode('utf-8') if isinstance(feature_file, str) else feature_file)
+    if isinstance(feature_file, io.TextIOBase):
+        return feature_file
+    return io.TextIOWrapper(feature_file, encoding='utf-8-sig', newline='')
+
+
+def read_feature_table_tsv(feature_file):
+    # dense feature x sample table, as written by DADA2 or `biom convert --to-tsv`: the header is the first line
+    # that is not a comment, or the '#OTU ID' comment line, followed by one barcode_slug per column.
+    # yields (barcode_slugs, None) first, then (feature_id, [(column index, number_reads), ...]) for every feature
+    # with only the non-zero counts
+    reader = csv.reader(read_text(feature_file), delimiter='\t')
+    header = None
+    for row in reader:
+        if not row or not any(row):
+            continue
+        if header is None:
+            if row[0].startswith('#') and row[0].lstrip('#').strip().lower() not in ('otu id', 'feature id', 'asv id'):
+                continue
+            header = [column.strip() for column in row[1:]]
+            yield header, None
+            continue
+        counts = []
+        for index, value in enumerate(row[1:len(header) + 1]):
+            number_reads = parse_number_reads(value, row[0])
+            if number_reads:
+                counts.append((index, number_reads))
+        yield row[0].strip(), counts
+    if header is None:
+        raise FeatureTableError('Feature table has no header row')
+
+
+def read_feature_table_biom(feature_file):
+    # BIOM 1.0 (JSON) table with features as rows and barcode_slugs as columns; sparse and dense matrices are
+    # read without the biom package. BIOM 2.x (HDF5) files can be converted with `biom convert --to-json`.
+    try:
+        table = json.load(read_text(feature_file))
+    except ValueError as err:
+        raise FeatureTableError('Feature table is not a BIOM 1.0 JSON file: {err}'.format(err=err))
+    header = [column['id'] for column in table.get('columns', [])]
+    yield header, None
+    counts_by_row = {}
+    if table.get('matrix_type') == 'sparse':
+        for row_index, column_index, value in table.get('data', []):
+            number_reads = parse_number_reads(value, table['rows'][row_index]['id'])
+            if number_reads:
+                counts_by_row.setdefault(row_index, []).append((column_index, number_reads))
+    else:
+        for row_index, values in enumerate(table.get('data', [])):
+            for column_index, value in enumerate(values):
+                number_reads = parse_number_reads(value, table['rows'][row_index]['id'])
+                if number_reads:
+                    counts_by_row.setdefault(row_index, []).append((column_index, number_reads))
+    for row_index, row in enumerate(table.get('rows', [])):
+        yield row['id'], sorted(counts_by_row.get(row_index, []))
+
+
+def parse_number_reads(value, feature_id):
+    # counts are written as 12 or 12.0 by most tools
+    try:
+        number_reads = float(value or 0)
+    except (TypeError, ValueError):
+        raise FeatureTableError('Invalid read count {value!r} for feature {feature}'.format(value=value, feature=feature_id))
+    if number_reads < 0 or number_reads != int(number_reads):
+        raise FeatureTableError('Invalid read count {value!r} for feature {feature}'.format(value=value, feature=feature_id))
+    return int(number_reads)
+
+
+def read_feature_table(feature_file, table_format='tsv'):
+    if table_format not in FEATURE_TABLE_FORMATS:
+        raise FeatureTableError('Feature table format "{format}" is not supported'.format(format=table_format))
+    return globals()['read_feature_table_{format}'.format(format=table_format)](feature_file)
+
+
+def read_fasta(sequence_file):
+    # {feature_id: sequence} from a FASTA file of representative sequences, e.g., dada2 or qiime2 rep-seqs;
+    # the id is the first word of the header line
+    sequences = {}
+    feature_id = None
+    for line in read_text(sequence_file):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('>'):
+            feature_id = line[1:].split()[0] if len(line) > 1 else ''
+            sequences[feature_id] = []
+        elif feature_id is None:
+            raise FeatureTableError('Representative sequences are not in FASTA format')
+        else:
+            sequences[feature_id].append(line)
+    return {feature_id: ''.join(lines) for feature_id, lines in sequences.items()}
+
+
+########################################
+# FEATURE TABLE LOADING                #
+########################################
+def get_extraction_pks(barcode_slugs):
+    # resolve every column of the table to an Extraction in one query
+    from wet_lab.models import Extraction
+    extraction_pks = dict(Extraction.objects.filter(barcode_slug__in=barcode_slugs).values_list('barcode_slug', 'pk'))
+    missing = [barcode_slug for barcode_slug in barcode_slugs if barcode_slug not in extraction_pks]
+    if missing:
+        raise FeatureTableError('Unknown extraction barcodes: {barcodes}'.format(barcodes=', '.join(missing)))
+    return [extraction_pks[barcode_slug] for barcode_slug in barcode_slugs]
+
+
+def load_feature_table(denoise_cluster_metadata, feature_file, sequence_file=None, table_format='tsv',
+                       created_by=None, replace=False, batch_size=None):
+    # load the ASVs and read counts of one denoise/cluster run from a feature x extraction table.
+    # - extractions are resolved by barcode_slug in one query; an unknown barcode aborts the load
+    # - features that already exist for the run are matched on feature_id; new features are bulk created with
+    #   their sequence from sequence_file (FASTA), or with the feature_id as the sequence when there is no
+    #   sequence file, as in a DADA2 sequence table. The FeatureOutput.save() slug is built in python and
+    #   sequences are resolved to FeatureSequence rows once per batch.
+    # - zero counts are not stored; reads are bulk created in chunks of batch_size
+    # a run that already has reads is only reloaded with replace=True, which deletes its reads first.
+    # everything runs in one transaction; returns the row counts and rows per second
+    if batch_size is None:
+        batch_size = settings.FEATURE_TABLE_BATCH_SIZE
+    start = timezone.now()
+    created_by_pk = created_by.pk if created_by is not None else get_default_user()
+    sequences = read_fasta(sequence_file) if sequence_file is not None else None
+    rows = read_feature_table(feature_file, table_format)
+    barcode_slugs, _ = next(rows)
+    analysis_date_fmt = slug_date_format(denoise_cluster_metadata.analysis_datetime)
+    stats = {'features_created': 0, 'features_matched': 0, 'reads_created': 0, 'reads_deleted': 0}
+    with transaction.atomic():
+        extraction_pks = get_extraction_pks(barcode_slugs)
+        existing_reads = FeatureRead.objects.filter(feature__denoise_cluster_metadata=denoise_cluster_metadata)
+        if existing_reads.exists():
+            if not replace:
+                raise FeatureTableError('{run} already has feature reads; reload with replace to overwrite them'.format(
+                    run=denoise_cluster_metadata.denoise_cluster_slug))
+            stats['reads_deleted'], _ = existing_reads.delete()
+        # {feature_id: (pk, feature_slug)} of the run's features, filled in as new features are created
+        features = {feature_id: (pk, feature_slug) for feature_id, pk, feature_slug in FeatureOutput.objects.filter(
+            denoise_cluster_metadata=denoise_cluster_metadata).values_list('feature_id', 'pk', 'feature_slug')}
+        seen = set()
+        pending_features = []
+        pending_reads = []
+
+        def add_reads(feature_id, counts):
+            feature_pk, feature_slug = features[feature_id]
+            # FeatureRead.save() slugs the feature's str(), which is its feature_slug
+            read_prefix = slugify(feature_slug)
+            for column_index, number_reads in counts:
+                pending_reads.append(FeatureRead(feature_id=feature_pk,
+                                                 extraction_id=extraction_pks[column_index],
+                                                 number_reads=number_reads,
+                                                 read_slug='{id}_{num_reads}'.format(id=read_prefix, num_reads=number_reads),
+                                                 created_by_id=created_by_pk))
+            if len(pending_reads) >= batch_size:
+                flush_reads()
+
+        def flush_reads():
+            FeatureRead.objects.bulk_create(pending_reads, batch_size=batch_size)
+            stats['reads_created'] += len(pending_reads)
+            pending_reads.clear()
+
+        def flush_features():
+            # sequences shared with other runs, or within the table, point at the one stored FeatureSequence
+            sequence_pks = resolve_feature_sequences([feature.feature_sequence for feature, counts in pending_features],
+                                                     created_by_pk, batch_size)
+            for feature, counts in pending_features:
+                feature.sequence_id = sequence_pks[get_sequence_hash(feature.feature_sequence)]
+            # bulk_create sets the pks on PostgreSQL, so the reads of the new features can follow
+            FeatureOutput.objects.bulk_create([feature for feature, counts in pending_features], batch_size=batch_size)
+            stats['features_created'] += len(pending_features)
+            for feature, counts in pending_features:
+                features[feature.feature_id] = (feature.pk, feature.feature_slug)
+                add_reads(feature.feature_id, counts)
+            pending_features.clear()
+
+        for feature_id, counts in rows:
+            if feature_id in seen:
+                raise FeatureTableError('Feature {feature} is listed twice'.format(feature=feature_id))
+            seen.add(feature_id)
+            if feature_id in features:
+                stats['features_matched'] += 1
+                add_reads(feature_id, counts)
+                continue
+            if sequences is None:
+                feature_sequence = feature_id
+            elif feature_id in sequences:
+                feature_sequence = sequences[feature_id]
+            else:
+                raise FeatureTableError('No representative sequence for feature {feature}'.format(feature=feature_id))
+            pending_features.append((FeatureOutput(denoise_cluster_metadata=denoise_cluster_metadata,
+                                                   feature_id=feature_id,
+                                                   feature_sequence=feature_sequence,
+                                                   feature_slug='{feature}_{date}'.format(feature=slugify(feature_id),
+                                                                                          date=analysis_date_fmt),
+                                                   created_by_id=created_by_pk), counts))
+            if len(pending_features) >= batch_size:
+                flush_features()
+        flush_features()
+        flush_reads()
+        # bulk_create sends no post_save, so the abundance matrix is queued here and sent on commit
+        queue_cascade(refresh_taxon_abundance, denoise_cluster_metadata.pk)
+    elapsed = (timezone.now() - start).total_seconds()
+    stats['seconds'] = round(elapsed, 2)
+    loaded = stats['features_created'] + stats['reads_created']
+    stats['rows_per_second'] = round(loaded / elapsed, 1) if elapsed else loaded
+    return stats
+
+
+########################################
+# TAXONOMY PARSING                     #
+########################################
+def read_taxonomy_table(taxonomy_file):
+    # QIIME2 taxonomy.tsv (Feature ID, Taxon, Confidence or Consensus), as exported with `qiime tools export`;
+    # the '#q2:types' line is skipped. Returns a DataFrame with feature_id, lineage and confidence columns
+    import pandas as pd
+    try:
+        table = pd.read_csv(read_text(taxonomy_file), sep='\t', dtype=str, keep_default_na=False,
+                            quoting=csv.QUOTE_NONE)
+    except (ValueError, pd.errors.ParserError) as err:
+        raise TaxonomyTableError('Taxonomy table is not a tab separated file: {err}'.format(err=err))
+    columns = {column.strip().lstrip('#').strip().lower(): column for column in table.columns}
+    feature_column = columns.get('feature id', columns.get('otu id', table.columns[0] if len(table.columns) else None))
+    lineage_column = columns.get('taxon', columns.get('taxonomy'))
+    if feature_column is None or lineage_column is None:
+        raise TaxonomyTableError('Taxonomy table needs a Feature ID and a Taxon column')
+    confidence_column = columns.get('confidence', columns.get('consensus'))
+    table = table[~table[feature_column].str.startswith('#')]
+    return pd.DataFrame({'feature_id': table[feature_column].str.strip(),
+                         'lineage': table[lineage_column].str.strip(),
+                         'confidence': table[confidence_column].str.strip() if confidence_column else ''}).reset_index(drop=True)
+
+
+def parse_lineages(lineages, ranks=None):
+    # split every lineage in one pass over the exploded ranks rather than row by row, e.g.,
+    # 'd__Bacteria; p__Proteobacteria; c__; ...' or 'Eukaryota;Chordata;...' by position in ranks, where '' skips
+    # a level, e.g., PR2 subdivisions.
+    # Returns a DataFrame on the index of lineages with the lowest named taxon and one column per TAXONOMY_RANKS;
+    # empty ranks such as 'g__' are blank
+    import pandas as pd
+    if ranks is None:
+        ranks = DEFAULT_TAXONOMY_RANKS
+    if lineages.empty:
+        return pd.DataFrame(columns=['taxon'] + TAXONOMY_RANKS, index=lineages.index)
+    parts = lineages.str.split(';').explode().fillna('').str.strip().rename_axis('row')
+    position = parts.groupby(level=0).cumcount()
+    prefixed = parts.str.extract(r'^([A-Za-z]{1,2})__(.*)$')
+    has_prefix = prefixed[0].notna()
+    rank = prefixed[0].str.lower().map(TAXONOMY_RANK_PREFIXES).where(has_prefix, position.map(dict(enumerate(ranks))))
+    name = prefixed[1].where(has_prefix, parts).fillna('').str.strip().str.slice(0, 255)
+    taxon = name[name.ne('')].groupby(level=0).last().reindex(lineages.index, fill_value='')
+    named = name.ne('') & ~name.str.lower().isin(UNASSIGNED_TAXA) & rank.notna()
+    # a rank repeated in a lineage keeps its lowest name
+    ranked = pd.DataFrame({'rank': rank, 'name': name})[named].reset_index().drop_duplicates(['row', 'rank'], keep='last')
+    table = ranked.pivot(index='row', columns='rank', values='name').reindex(index=lineages.index,
+                                                                           columns=TAXONOMY_RANKS).fillna('')
+    table.insert(0, 'taxon', taxon)
+    return table
+
+
+def parse_confidence(value, feature_id, row_num):
+    # blank for classifiers that do not report one; nan, inf and values that do not fit TaxonomicAnnotation.confidence
+    # are rejected here rather than by the database on insert
+    if not value:
+        return None
+    confidence_field = TaxonomicAnnotation._meta.get_field('confidence')
+    try:
+        confidence = Decimal(value)
+        DecimalValidator(confidence_field.max_digits, confidence_field.decimal_places)(confidence)
+    except (InvalidOperation, ValidationError):
+        raise TaxonomyTableError('Row {row}: invalid confidence {value!r} for feature {feature}'.format(
+            row=row_num, value=value, feature=feature_id))
+    return confidence
+
+
+########################################
+# TAXONOMY LOADING                     #
+########################################
+def load_taxonomy(annotation_metadata, taxonomy_file, reference_databases=(), ranks=None, created_by=None,
+                  replace=False, batch_size=None):
+    # load the classifier output of one annotation run, e.g., QIIME2 feature-classifier taxonomy.tsv
+    # - lineages are parsed with parse_lineages in one vectorized pass
+    # - feature ids are resolved to the FeatureOutput of the run's DenoiseClusterMetadata in one query;
+    #   an unknown feature aborts the load
+    # - annotations and their reference_database through rows are bulk created in chunks of batch_size, with the
+    #   TaxonomicAnnotation.save() slug built in python
+    # an annotation run that already has annotations is only reloaded with replace=True, which deletes them first.
+    # everything runs in one transaction; returns the row counts and rows per second
+    if batch_size is None:
+        batch_size = settings.FEATURE_TABLE_BATCH_SIZE
+    start = timezone.now()
+    unknown_ranks = [rank for rank in ranks or [] if rank and rank not in TAXONOMY_RANKS]
+    if unknown_ranks:
+        raise TaxonomyTableError('Unknown ranks: {ranks}'.format(ranks=', '.join(unknown_ranks)))
+    created_by_pk = created_by.pk if created_by is not None else get_default_user()
+    table = read_taxonomy_table(taxonomy_file)
+    duplicated = table['feature_id'][table['feature_id'].duplicated()].unique().tolist()
+    if duplicated:
+        raise TaxonomyTableError('Features listed twice: {features}'.format(features=', '.join(duplicated[:10])))
+    lineages = parse_lineages(table['lineage'], ranks)
+    reference_database_pks = [getattr(reference_database, 'pk', reference_database) for reference_database in reference_databases]
+    through_model = TaxonomicAnnotation.reference_database.through
+    stats = {'annotations_created': 0, 'annotations_deleted': 0, 'reference_links_created': 0}
+    with transaction.atomic():
+        existing_annotations = TaxonomicAnnotation.objects.filter(annotation_metadata=annotation_metadata)
+        if existing_annotations.exists():
+            if not replace:
+                raise TaxonomyTableError('{run} already has taxonomic annotations; reload with replace to overwrite them'.format(
+                    run=annotation_metadata.annotation_slug))
+            _, deleted = existing_annotations.delete()
+            stats['annotations_deleted'] = deleted.get(TaxonomicAnnotation._meta.label, 0)
+        features = dict(FeatureOutput.objects.filter(
+            denoise_cluster_metadata_id=annotation_metadata.denoise_cluster_metadata_id).values_list('feature_id', 'pk'))
+        missing = [feature_id for feature_id in table['feature_id'].tolist() if feature_id not in features]
+        if missing:
+            raise TaxonomyTableError('Unknown features for {run}: {features}'.format(
+                run=annotation_metadata.annotation_slug, features=', '.join(missing[:10])))
+        pending_annotations = []
+
+        def flush_annotations():
+            TaxonomicAnnotation.objects.bulk_create(pending_annotations, batch_size=batch_size)
+            stats['annotations_created'] += len(pending_annotations)
+            through_rows = [through_model(taxonomicannotation_id=annotation.pk, referencedatabase_id=reference_database_pk)
+                            for annotation in pending_annotations for reference_database_pk in reference_database_pks]
+            through_model.objects.bulk_create(through_rows, batch_size=batch_size)
+            stats['reference_links_created'] += len(through_rows)
+            pending_annotations.clear()
+
+        columns = [table['feature_id'].tolist(), table['confidence'].tolist(), lineages['taxon'].tolist()] + \
+                  [lineages[rank].tolist() for rank in TAXONOMY_RANKS]
+        for row_num, (feature_id, confidence, taxon, *taxon_ranks) in enumerate(zip(*columns), start=1):
+            annotation = TaxonomicAnnotation(feature_id=features[feature_id],
+                                             annotation_metadata=annotation_metadata,
+                                             confidence=parse_confidence(confidence, feature_id, row_num),
+                                             ta_taxon=taxon,
+                                             annotation_slug='{taxon}_{feature}'.format(taxon=slugify(taxon),
+                                                                                        feature=slugify(feature_id))[:255],
+                                             created_by_id=created_by_pk)
+            for rank, rank_name in zip(TAXONOMY_RANKS, taxon_ranks):
+                setattr(annotation, 'ta_{rank}'.format(rank=rank), rank_name)
+            pending_annotations.append(annotation)
+            if len(pending_annotations) >= batch_size:
+                flush_annotations()
+        flush_annotations()
+        queue_cascade(refresh_taxon_abundance, annotation_metadata.denoise_cluster_metadata_id)
+    elapsed = (timezone.now() - start).total_seconds()
+    stats['seconds'] = round(elapsed, 2)
+    loaded = stats['annotations_created'] + stats['reference_links_created']
+    stats['rows_per_second'] = round(loaded / elapsed, 1) if elapsed else loaded
+    return stats
@@ -0,0 +1,53 @@
+import os
+from django.core.management import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from bioinformatics.models import DenoiseClusterMetadata
+from bioinformatics.loaders import FEATURE_TABLE_FORMATS, FeatureTableError, load_feature_table
+
+
+class Command(BaseCommand):
+    help = 'Loads a feature x extraction table (TSV or BIOM 1.0 JSON) and its representative sequences (FASTA) ' \
+           'into FeatureOutput and FeatureRead for one DenoiseClusterMetadata'
+
+    def add_arguments(self, parser):
+        parser.add_argument('denoise_cluster_slug', help='denoise_cluster_slug of the run the table belongs to')
+        parser.add_argument('feature_table', help='feature table, one row per feature and one column per extraction barcode_slug')
+        parser.add_argument('--sequences', help='FASTA of representative sequences; defaults to the feature ids')
+        parser.add_argument('--format', choices=FEATURE_TABLE_FORMATS,
+                            help='feature table format; defaults to biom for .biom and .json files, otherwise tsv')
+        parser.add_argument('--created-by', help='email of the user the rows are created by')
+        parser.add_argument('--replace', action='store_true', help='delete the reads already loaded for the run')
+        parser.add_argument('--batch-size', type=int, help='rows per bulk insert (FEATURE_TABLE_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        try:
+            denoise_cluster_metadata = DenoiseClusterMetadata.objects.get(denoise_cluster_slug=options['denoise_cluster_slug'])
+        except DenoiseClusterMetadata.DoesNotExist:
+            raise CommandError('DenoiseClusterMetadata "{slug}" does not exist'.format(slug=options['denoise_cluster_slug']))
+        created_by = None
+        if options['created_by']:
+            try:
+                created_by = get_user_model().objects.get(email=options['created_by'])
+            except get_user_model().DoesNotExist:
+                raise CommandError('User "{email}" does not exist'.format(email=options['created_by']))
+        table_format = options['format']
+        if table_format is None:
+            table_format = 'biom' if os.path.splitext(options['feature_table'])[1].lower() in ('.biom', '.json') else 'tsv'
+        sequence_file = open(options['sequences'], 'rb') if options['sequences'] else None
+        try:
+            with open(options['feature_table'], 'rb') as feature_file:
+                stats = load_feature_table(denoise_cluster_metadata, feature_file,
+                                           sequence_file=sequence_file,
+                                           table_format=table_format,
+                                           created_by=created_by,
+                                           replace=options['replace'],
+                                           batch_size=options['batch_size'])
+        except FeatureTableError as err:
+            raise CommandError(str(err))
+        finally:
+            if sequence_file is not None:
+                sequence_file.close()
+        self.stdout.write(self.style.SUCCESS(
+            '{run}: {features_created} features created, {features_matched} matched, {reads_created} reads created '
+            '({reads_deleted} replaced) in {seconds}s, {rows_per_second} rows/s'.format(
+                run=denoise_cluster_metadata.denoise_cluster_slug, **stats)))
@@ -0,0 +1,51 @@
+from django.core.management import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from bioinformatics.models import AnnotationMetadata, ReferenceDatabase
+from bioinformatics.loaders import TaxonomyTableError, load_taxonomy
+
+
+class Command(BaseCommand):
+    help = 'Loads a taxonomy table (e.g., QIIME2 taxonomy.tsv) into TaxonomicAnnotation for one AnnotationMetadata'
+
+    def add_arguments(self, parser):
+        parser.add_argument('annotation_slug', help='annotation_slug of the annotation run the table belongs to')
+        parser.add_argument('taxonomy_table', help='taxonomy table with Feature ID, Taxon and Confidence columns')
+        parser.add_argument('--reference-database', action='append', default=[], dest='reference_databases',
+                            help='refdb_slug of a reference database the features were classified against; repeatable')
+        parser.add_argument('--ranks',
+                            help='comma separated ranks of lineages without rank prefixes, e.g., '
+                                 'domain,supergroup,phylum_division,,class,order,family,genus,species')
+        parser.add_argument('--created-by', help='email of the user the rows are created by')
+        parser.add_argument('--replace', action='store_true', help='delete the annotations already loaded for the run')
+        parser.add_argument('--batch-size', type=int, help='rows per bulk insert (FEATURE_TABLE_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        try:
+            annotation_metadata = AnnotationMetadata.objects.get(annotation_slug=options['annotation_slug'])
+        except AnnotationMetadata.DoesNotExist:
+            raise CommandError('AnnotationMetadata "{slug}" does not exist'.format(slug=options['annotation_slug']))
+        reference_databases = list(ReferenceDatabase.objects.filter(refdb_slug__in=options['reference_databases']))
+        missing = set(options['reference_databases']) - {reference_database.refdb_slug for reference_database in reference_databases}
+        if missing:
+            raise CommandError('ReferenceDatabase "{slugs}" does not exist'.format(slugs=', '.join(sorted(missing))))
+        created_by = None
+        if options['created_by']:
+            try:
+                created_by = get_user_model().objects.get(email=options['created_by'])
+            except get_user_model().DoesNotExist:
+                raise CommandError('User "{email}" does not exist'.format(email=options['created_by']))
+        ranks = [rank.strip() for rank in options['ranks'].split(',')] if options['ranks'] else None
+        try:
+            with open(options['taxonomy_table'], 'rb') as taxonomy_file:
+                stats = load_taxonomy(annotation_metadata, taxonomy_file,
+                                      reference_databases=reference_databases,
+                                      ranks=ranks,
+                                      created_by=created_by,
+                                      replace=options['replace'],
+                                      batch_size=options['batch_size'])
+        except TaxonomyTableError as err:
+            raise CommandError(str(err))
+        self.stdout.write(self.style.SUCCESS(
+            '{run}: {annotations_created} annotations created ({annotations_deleted} replaced), '
+            '{reference_links_created} reference database links in {seconds}s, {rows_per_second} rows/s'.format(
+                run=annotation_metadata.annotation_slug, **stats)))
@@ -0,0 +1,78 @@
+import hashlib
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import utility.models
+
+
+def link_feature_sequences(apps, schema_editor):
+    # store each distinct sequence once, keyed on the sha1 of the normalized sequence, and point every
+    # FeatureOutput at it; features are read in batches so long sequence tables are not held in memory at once
+    FeatureOutput = apps.get_model('bioinformatics', 'FeatureOutput')
+    FeatureSequence = apps.get_model('bioinformatics', 'FeatureSequence')
+    batch_size = 5000
+    last_pk = 0
+    while True:
+        features = list(FeatureOutput.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+            'pk', 'feature_sequence', 'created_by_id')[:batch_size])
+        if not features:
+            break
+        last_pk = features[-1][0]
+        new_sequences = {}
+        feature_hashes = {}
+        for pk, feature_sequence, created_by_id in features:
+            feature_sequence = ''.join(feature_sequence.split()).upper()
+            sequence_hash = hashlib.sha1(feature_sequence.encode('utf-8')).hexdigest()
+            new_sequences.setdefault(sequence_hash, FeatureSequence(sequence_hash=sequence_hash,
+                                                                    feature_sequence=feature_sequence,
+                                                                    created_by_id=created_by_id))
+            feature_hashes[pk] = sequence_hash
+        FeatureSequence.objects.bulk_create(list(new_sequences.values()), ignore_conflicts=True)
+        sequence_pks = dict(FeatureSequence.objects.filter(sequence_hash__in=list(new_sequences)).values_list(
+            'sequence_hash', 'pk'))
+        FeatureOutput.objects.bulk_update([FeatureOutput(pk=pk, sequence_id=sequence_pks[sequence_hash])
+                                           for pk, sequence_hash in feature_hashes.items()], ['sequence'])
+
+
+def unlink_feature_sequences(apps, schema_editor):
+    FeatureOutput = apps.get_model('bioinformatics', 'FeatureOutput')
+    FeatureSequence = apps.get_model('bioinformatics', 'FeatureSequence')
+    FeatureOutput.objects.update(feature_sequence=models.Subquery(
+        FeatureSequence.objects.filter(pk=models.OuterRef('sequence_id')).values('feature_sequence')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bioinformatics', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeatureSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modified_datetime', models.DateTimeField(auto_now=True, null=True, verbose_name='Modified DateTime')),
+                ('created_datetime', models.DateTimeField(auto_now_add=True, verbose_name='Created DateTime')),
+                ('sequence_hash', models.CharField(max_length=40, unique=True, verbose_name='Sequence Hash')),
+                ('feature_sequence', models.TextField(verbose_name='Feature Sequence')),
+                ('created_by', models.ForeignKey(default=utility.models.get_default_user, on_delete=models.SET(utility.models.get_sentinel_user), to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Feature Sequence',
+                'verbose_name_plural': 'Feature Sequences',
+            },
+        ),
+        migrations.AddField(
+            model_name='featureoutput',
+            name='sequence',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.RESTRICT, related_name='features', to='bioinformatics.featuresequence'),
+        ),
+        migrations.AlterField(
+            model_name='featureoutput',
+            name='feature_sequence',
+            field=models.TextField(null=True, verbose_name='Feature Sequence'),
+        ),
+        migrations.RunPython(link_feature_sequences, unlink_feature_sequences),
+    ]
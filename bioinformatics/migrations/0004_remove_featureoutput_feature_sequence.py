@@ -0,0 +1,22 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    # separate from 0003 because postgresql does not alter a table with pending trigger events from the backfill
+
+    dependencies = [
+        ('bioinformatics', '0003_featuresequence'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='featureoutput',
+            name='feature_sequence',
+        ),
+        migrations.AlterField(
+            model_name='featureoutput',
+            name='sequence',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='features', to='bioinformatics.featuresequence'),
+        ),
+    ]
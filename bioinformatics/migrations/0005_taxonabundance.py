@@ -0,0 +1,40 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wet_lab', '0001_initial'),
+        ('bioinformatics', '0004_remove_featureoutput_feature_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaxonAbundance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ta_taxon', models.CharField(blank=True, max_length=255, verbose_name='Taxon')),
+                ('ta_domain', models.CharField(blank=True, max_length=255, verbose_name='Domain')),
+                ('ta_kingdom', models.CharField(blank=True, max_length=255, verbose_name='Kingdom')),
+                ('ta_supergroup', models.CharField(blank=True, max_length=255, verbose_name='Supergroup')),
+                ('ta_phylum_division', models.CharField(blank=True, max_length=255, verbose_name='Phylum/Division')),
+                ('ta_class', models.CharField(blank=True, max_length=255, verbose_name='Class')),
+                ('ta_order', models.CharField(blank=True, max_length=255, verbose_name='Order')),
+                ('ta_family', models.CharField(blank=True, max_length=255, verbose_name='Family')),
+                ('ta_genus', models.CharField(blank=True, max_length=255, verbose_name='Genus')),
+                ('ta_species', models.CharField(blank=True, max_length=255, verbose_name='Species')),
+                ('number_reads', models.BigIntegerField(verbose_name='Number Reads')),
+                ('number_features', models.PositiveIntegerField(verbose_name='Number Features')),
+                ('refreshed_datetime', models.DateTimeField(auto_now_add=True, verbose_name='Refreshed DateTime')),
+                ('annotation_metadata', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bioinformatics.annotationmetadata')),
+                ('denoise_cluster_metadata', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='bioinformatics.denoiseclustermetadata')),
+                ('extraction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='wet_lab.extraction')),
+            ],
+            options={
+                'verbose_name': 'Taxon Abundance',
+                'verbose_name_plural': 'Taxon Abundance',
+                'indexes': [models.Index(fields=['denoise_cluster_metadata', 'annotation_metadata'], name='taxon_abundance_run_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bioinformatics', '0005_taxonabundance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='featureoutput',
+            index=models.Index(fields=['created_datetime', 'id'], name='featureoutput_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='featureread',
+            index=models.Index(fields=['created_datetime', 'id'], name='featureread_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taxonomicannotation',
+            index=models.Index(fields=['created_datetime', 'id'], name='taxonannotation_created_idx'),
+        ),
+    ]
@@ -1,9 +1,13 @@
+import hashlib
 from django.contrib.gis.db import models
 from django.utils.text import slugify
 from django.utils import timezone
-from utility.models import DateTimeUserMixin, ProcessLocation, slug_date_format, get_default_process_location
+from utility.models import DateTimeUserMixin, ProcessLocation, slug_date_format, get_default_process_location, \
+    get_default_user
 from utility.enumerations import YesNo, QualityChecks
 
+# TaxonomicAnnotation ta_* ranks, highest to lowest
+TAXONOMY_RANKS = ['domain', 'kingdom', 'supergroup', 'phylum_division', 'class', 'order', 'family', 'genus', 'species']
 
 # Create your models here.
 class QualityMetadata(DateTimeUserMixin):
@@ -102,14 +106,84 @@ class DenoiseClusterMetadata(DateTimeUserMixin):
         verbose_name_plural = 'DenoiseCluster Metadata'
 
 
+def normalize_feature_sequence(feature_sequence):
+    # sequences are compared without whitespace or line breaks and in upper case, e.g., 'acgt\nacgt' is 'ACGTACGT'
+    return ''.join(feature_sequence.split()).upper()
+
+
+def get_sequence_hash(feature_sequence):
+    # content address of a sequence; sha1 of the normalized sequence
+    return hashlib.sha1(normalize_feature_sequence(feature_sequence).encode('utf-8')).hexdigest()
+
+
+def resolve_feature_sequences(feature_sequences, created_by_pk=None, batch_size=None):
+    # {sequence_hash: FeatureSequence pk} for every sequence; sequences that are not stored yet are inserted
+    # with INSERT ... ON CONFLICT DO NOTHING and everything is then read back in one query on the unique hash
+    if created_by_pk is None:
+        created_by_pk = get_default_user()
+    new_sequences = {}
+    for feature_sequence in feature_sequences:
+        feature_sequence = normalize_feature_sequence(feature_sequence)
+        new_sequences.setdefault(get_sequence_hash(feature_sequence), feature_sequence)
+    FeatureSequence.objects.bulk_create([FeatureSequence(sequence_hash=sequence_hash,
+                                                         feature_sequence=feature_sequence,
+                                                         created_by_id=created_by_pk)
+                                         for sequence_hash, feature_sequence in new_sequences.items()],
+                                        batch_size=batch_size,
+                                        ignore_conflicts=True)
+    return dict(FeatureSequence.objects.filter(sequence_hash__in=list(new_sequences)).values_list('sequence_hash', 'pk'))
+
+
+class FeatureSequence(DateTimeUserMixin):
+    # each distinct ASV/OTU sequence is stored once and shared by the FeatureOutput of every run that saw it;
+    # lookups by sequence go through the unique sequence_hash index instead of comparing the sequence text
+    sequence_hash = models.CharField('Sequence Hash', max_length=40, unique=True)
+    feature_sequence = models.TextField('Feature Sequence')
+
+    def save(self, *args, **kwargs):
+        self.feature_sequence = normalize_feature_sequence(self.feature_sequence)
+        self.sequence_hash = get_sequence_hash(self.feature_sequence)
+        super(FeatureSequence, self).save(*args, **kwargs)
+
+    def get_denoise_cluster_metadata(self):
+        # the runs that saw this sequence
+        return DenoiseClusterMetadata.objects.filter(featureoutput__sequence=self).distinct()
+
+    def __str__(self):
+        return self.sequence_hash
+
+    class Meta:
+        app_label = 'bioinformatics'
+        verbose_name = 'Feature Sequence'
+        verbose_name_plural = 'Feature Sequences'
+
+
 class FeatureOutput(DateTimeUserMixin):
     # TODO - runid + ASV is not necssarily unique, e.g., ASV_0001 for each run vs UUID ASV_ID
     denoise_cluster_metadata = models.ForeignKey(DenoiseClusterMetadata, on_delete=models.RESTRICT)
     feature_id = models.TextField('Feature ID')
-    feature_sequence = models.TextField('Feature Sequence')
+    sequence = models.ForeignKey(FeatureSequence, on_delete=models.RESTRICT, related_name='features')
     feature_slug = models.SlugField('Feature Slug', max_length=255)
 
+    @property
+    def feature_sequence(self):
+        # a sequence assigned since the last save, otherwise the stored sequence
+        if getattr(self, '_feature_sequence', None) is not None:
+            return self._feature_sequence
+        if self.sequence_id is None:
+            return None
+        return self.sequence.feature_sequence
+
+    @feature_sequence.setter
+    def feature_sequence(self, value):
+        # resolved to its FeatureSequence on save(); bulk_create callers set sequence_id from resolve_feature_sequences
+        self._feature_sequence = normalize_feature_sequence(value) if value is not None else None
+
     def save(self, *args, **kwargs):
+        if getattr(self, '_feature_sequence', None) is not None:
+            sequence_hash = get_sequence_hash(self._feature_sequence)
+            self.sequence_id = resolve_feature_sequences([self._feature_sequence], self.created_by_id)[sequence_hash]
+            self._feature_sequence = None
         analysis_date_fmt = slug_date_format(self.denoise_cluster_metadata.analysis_datetime)
         # truncated_feat_id = self.feature_id[0:24]
         self.feature_slug = '{feature}_{date}'.format(feature=slugify(self.feature_id), date=analysis_date_fmt)
@@ -122,6 +196,8 @@ class FeatureOutput(DateTimeUserMixin):
         app_label = 'bioinformatics'
         verbose_name = 'Feature Output'
         verbose_name_plural = 'Feature Outputs'
+        # keyset pagination of the api, see utility.pagination.KeysetPagination
+        indexes = [models.Index(fields=['created_datetime', 'id'], name='featureoutput_created_idx')]
 
 
 class FeatureRead(DateTimeUserMixin):
@@ -141,6 +217,8 @@ class FeatureRead(DateTimeUserMixin):
         app_label = 'bioinformatics'
         verbose_name = 'Feature Read'
         verbose_name_plural = 'Feature Reads'
+        # keyset pagination of the api, see utility.pagination.KeysetPagination
+        indexes = [models.Index(fields=['created_datetime', 'id'], name='featureread_created_idx')]
 
 
 class ReferenceDatabase(DateTimeUserMixin):
@@ -550,3 +628,36 @@ class TaxonomicAnnotation(DateTimeUserMixin):
         app_label = 'bioinformatics'
         verbose_name = 'Taxonomic Annotation'
         verbose_name_plural = 'Taxonomic Annotations'
+        # keyset pagination of the api, see utility.pagination.KeysetPagination
+        indexes = [models.Index(fields=['created_datetime', 'id'], name='taxonannotation_created_idx')]
+
+
+class TaxonAbundance(models.Model):
+    # materialized taxon x extraction read counts of a denoise/cluster run, one row per annotation run, extraction
+    # and lineage; rebuilt by abundance.materialize_taxon_abundance when the run's reads or annotations change
+    denoise_cluster_metadata = models.ForeignKey(DenoiseClusterMetadata, on_delete=models.CASCADE)
+    annotation_metadata = models.ForeignKey(AnnotationMetadata, on_delete=models.CASCADE)
+    extraction = models.ForeignKey('wet_lab.Extraction', on_delete=models.CASCADE)
+    ta_taxon = models.CharField('Taxon', blank=True, max_length=255)
+    ta_domain = models.CharField('Domain', blank=True, max_length=255)
+    ta_kingdom = models.CharField('Kingdom', blank=True, max_length=255)
+    ta_supergroup = models.CharField('Supergroup', blank=True, max_length=255)
+    ta_phylum_division = models.CharField('Phylum/Division', blank=True, max_length=255)
+    ta_class = models.CharField('Class', blank=True, max_length=255)
+    ta_order = models.CharField('Order', blank=True, max_length=255)
+    ta_family = models.CharField('Family', blank=True, max_length=255)
+    ta_genus = models.CharField('Genus', blank=True, max_length=255)
+    ta_species = models.CharField('Species', blank=True, max_length=255)
+    number_reads = models.BigIntegerField('Number Reads')
+    number_features = models.PositiveIntegerField('Number Features')
+    refreshed_datetime = models.DateTimeField('Refreshed DateTime', auto_now_add=True)
+
+    def __str__(self):
+        return '{run}_{taxon}_{extraction}'.format(run=self.denoise_cluster_metadata_id, taxon=self.ta_taxon,
+                                                   extraction=self.extraction_id)
+
+    class Meta:
+        app_label = 'bioinformatics'
+        verbose_name = 'Taxon Abundance'
+        verbose_name_plural = 'Taxon Abundance'
+        indexes = [models.Index(fields=['denoise_cluster_metadata', 'annotation_metadata'], name='taxon_abundance_run_idx')]
@@ -2,12 +2,26 @@ from import_export import resources, fields
 from import_export.widgets import ForeignKeyWidget, ManyToManyWidget
 from .models import QualityMetadata, DenoiseClusterMethod, FeatureRead, FeatureOutput, DenoiseClusterMetadata, \
     ReferenceDatabase, TaxonDomain, TaxonKingdom, TaxonSupergroup, TaxonPhylumDivision, TaxonClass, TaxonOrder, TaxonFamily, TaxonGenus, \
-    TaxonSpecies, AnnotationMethod, AnnotationMetadata, TaxonomicAnnotation
+    TaxonSpecies, AnnotationMethod, AnnotationMetadata, TaxonomicAnnotation, get_sequence_hash
 from utility.models import ProcessLocation, StandardOperatingProcedure
 from wet_lab.models import FastqFile, Extraction
 from users.models import CustomUser
 
 
+class FeatureSequenceField(fields.Field):
+    # imports and exports the sequence text, but matches existing features on the indexed sequence_hash
+    def clean(self, row, **kwargs):
+        value = super().clean(row, **kwargs)
+        return get_sequence_hash(value) if value else value
+
+    def get_value(self, instance):
+        return instance.feature_sequence
+
+    def save(self, instance, row, is_m2m=False, **kwargs):
+        if not self.readonly:
+            instance.feature_sequence = row[self.column_name]
+
+
 class QualityMetadataAdminResource(resources.ModelResource):
     class Meta:
         model = QualityMetadata
@@ -131,6 +145,10 @@ class FeatureOutputAdminResource(resources.ModelResource):
         export_order = ('id', 'feature_id', 'feature_sequence', 'denoise_cluster_metadata',
                         'created_by', 'created_datetime', )
 
+    feature_sequence = FeatureSequenceField(
+        column_name='feature_sequence',
+        attribute='sequence__sequence_hash')
+
     denoise_cluster_metadata = fields.Field(
         column_name='denoise_cluster_metadata',
         attribute='denoise_cluster_metadata',
@@ -141,6 +159,9 @@ class FeatureOutputAdminResource(resources.ModelResource):
         attribute='created_by',
         widget=ForeignKeyWidget(CustomUser, 'email'))
 
+    def filter_export(self, queryset, **kwargs):
+        return queryset.select_related('sequence')
+
     # https://stackoverflow.com/questions/50952887/django-import-export-assign-current-user
     def before_import_row(self, row, **kwargs):
         row['created_by'] = kwargs['user'].email
@@ -5,6 +5,8 @@ from .models import QualityMetadata, DenoiseClusterMethod, DenoiseClusterMetadat
     TaxonClass, TaxonOrder, TaxonFamily, TaxonGenus, TaxonSpecies, AnnotationMethod, AnnotationMetadata, \
     TaxonomicAnnotation
 from wet_lab.models import FastqFile, Extraction
+from .loaders import FEATURE_TABLE_FORMATS, TAXONOMY_RANKS
+from .abundance import TAXON_ABUNDANCE_RANKS, TAXON_ROLLUP_RANKS, TAXON_ROLLUP_GROUPS
 from utility.enumerations import QualityChecks
 from utility.models import ProcessLocation, StandardOperatingProcedure
 
@@ -104,13 +106,14 @@ class FeatureOutputSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(read_only=True)
     feature_id = serializers.CharField(read_only=False)
     feature_sequence = serializers.CharField(read_only=False)
+    sequence_hash = serializers.ReadOnlyField(source='sequence.sequence_hash')
     feature_slug = serializers.SlugField(read_only=True, max_length=255)
     created_datetime = serializers.DateTimeField(read_only=True)
     modified_datetime = serializers.DateTimeField(read_only=True)
 
     class Meta:
         model = FeatureOutput
-        fields = ['id', 'feature_id', 'feature_slug', 'feature_sequence', 'denoise_cluster_metadata',
+        fields = ['id', 'feature_id', 'feature_slug', 'feature_sequence', 'sequence_hash', 'denoise_cluster_metadata',
                   'created_by', 'created_datetime', 'modified_datetime', ]
     # Since denoise_cluster_metadata and created_by reference different tables and we
     # want to show 'label' rather than some unintelligable field (like pk 1), have to add
@@ -138,6 +141,15 @@ class FeatureReadSerializer(serializers.ModelSerializer):
     feature = serializers.SlugRelatedField(many=False, read_only=False, slug_field='feature_slug', queryset=FeatureOutput.objects.all())
 
 
+class FeatureTableImportSerializer(serializers.Serializer):
+    # feature x extraction table and representative sequences of one denoise/cluster run, see load_feature_table
+    denoise_cluster_metadata = serializers.SlugRelatedField(slug_field='denoise_cluster_slug', queryset=DenoiseClusterMetadata.objects.all())
+    feature_table = serializers.FileField()
+    feature_sequences = serializers.FileField(required=False)
+    table_format = serializers.ChoiceField(choices=FEATURE_TABLE_FORMATS, default='tsv')
+    replace = serializers.BooleanField(default=False)
+
+
 class ReferenceDatabaseSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(read_only=True)
     refdb_name = serializers.CharField(max_length=255)
@@ -494,3 +506,34 @@ class TaxonomicAnnotationSerializer(serializers.ModelSerializer):
     manual_family = serializers.SlugRelatedField(many=False, allow_null=True, read_only=False, slug_field='taxon_family_slug', queryset=TaxonFamily.objects.all())
     manual_genus = serializers.SlugRelatedField(many=False, allow_null=True, read_only=False, slug_field='taxon_genus_slug', queryset=TaxonGenus.objects.all())
     manual_species = serializers.SlugRelatedField(many=False, allow_null=True, read_only=False, slug_field='taxon_species_slug', queryset=TaxonSpecies.objects.all())
+
+
+class TaxonomyImportSerializer(serializers.Serializer):
+    # classifier output of one annotation run, e.g., QIIME2 taxonomy.tsv, see load_taxonomy
+    annotation_metadata = serializers.SlugRelatedField(slug_field='annotation_slug', queryset=AnnotationMetadata.objects.all())
+    taxonomy_table = serializers.FileField()
+    reference_database = serializers.SlugRelatedField(many=True, required=False, slug_field='refdb_slug', queryset=ReferenceDatabase.objects.all())
+    # ranks of lineages without rank prefixes, in order; '' skips a level
+    ranks = serializers.ListField(child=serializers.ChoiceField(choices=[''] + TAXONOMY_RANKS, allow_blank=True), required=False)
+    replace = serializers.BooleanField(default=False)
+
+
+class TaxonAbundanceQuerySerializer(serializers.Serializer):
+    # query parameters of the taxon abundance matrix; annotation_metadata defaults to the run's latest annotation run
+    denoise_cluster_metadata = serializers.SlugRelatedField(slug_field='denoise_cluster_slug', queryset=DenoiseClusterMetadata.objects.all())
+    annotation_metadata = serializers.SlugRelatedField(slug_field='annotation_slug', queryset=AnnotationMetadata.objects.all(), required=False)
+    rank = serializers.ChoiceField(choices=TAXON_ABUNDANCE_RANKS, default='taxon')
+
+    def validate(self, data):
+        annotation_metadata = data.get('annotation_metadata')
+        if annotation_metadata is not None and annotation_metadata.denoise_cluster_metadata_id != data['denoise_cluster_metadata'].pk:
+            raise serializers.ValidationError({'annotation_metadata': ['Annotation run is not of this denoise/cluster run']})
+        return data
+
+
+class TaxonRollupQuerySerializer(TaxonAbundanceQuerySerializer):
+    # query parameters of a rank rollup; rank also takes the curated manual_* ranks and group_by splits the reads
+    # by field site, project, survey month or primer set
+    rank = serializers.ChoiceField(choices=TAXON_ROLLUP_RANKS, default='taxon')
+    group_by = serializers.ChoiceField(choices=TAXON_ROLLUP_GROUPS, required=False)
+    top = serializers.IntegerField(min_value=1, max_value=50, default=10)
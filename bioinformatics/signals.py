@@ -1,48 +1,36 @@
 # https://stackoverflow.com/questions/2719038/where-should-signal-handlers-live-in-a-django-project
 # https://docs.djangoproject.com/en/4.0/topics/signals/
 from django.db.models.signals import post_save
-from django.dispatch import receiver
-from django.db import transaction
-from .tasks import update_domain, update_kingdom, update_supergroup, update_phylum_division, update_family, update_class, update_genus, \
-    update_order
-from .models import TaxonDomain, TaxonKingdom, TaxonSupergroup, TaxonPhylumDivision, TaxonClass, TaxonOrder, TaxonFamily, TaxonGenus
+from utility.dispatch import queue_cascade
+from .tasks import update_taxon_slugs, refresh_taxon_abundance
+from .models import TaxonDomain, TaxonKingdom, TaxonSupergroup, TaxonPhylumDivision, TaxonClass, TaxonOrder, TaxonFamily, TaxonGenus, \
+    FeatureRead, TaxonomicAnnotation
 
 
-@receiver(post_save, sender=TaxonDomain, dispatch_uid='update_domain')
-def update_domain_post_save(sender, instance, **kwargs):
-    transaction.on_commit(update_domain.s(instance.pk, instance.taxon_domain_slug).delay)
+def update_taxon_slugs_post_save(sender, instance, **kwargs):
+    # propagate the saved rank's slug to every lower rank once the transaction commits; rows saved in the
+    # same transaction (e.g., an admin import) share one task per rank
+    queue_cascade(update_taxon_slugs, instance.pk, args=(sender._meta.label,))
 
 
-@receiver(post_save, sender=TaxonKingdom, dispatch_uid='update_kingdom')
-def update_kingdom_post_save(sender, instance, **kwargs):
-    transaction.on_commit(update_kingdom.s(instance.pk, instance.taxon_kingdom_slug).delay)
+# TaxonSpecies is the lowest rank and has no descendants to update
+for taxon_model in [TaxonDomain, TaxonKingdom, TaxonSupergroup, TaxonPhylumDivision, TaxonClass, TaxonOrder,
+                    TaxonFamily, TaxonGenus]:
+    post_save.connect(update_taxon_slugs_post_save, sender=taxon_model,
+                      dispatch_uid='update_taxon_slugs_{model}'.format(model=taxon_model._meta.model_name))
 
 
-@receiver(post_save, sender=TaxonSupergroup, dispatch_uid='update_supergroup')
-def update_supergroup_post_save(sender, instance, **kwargs):
-    transaction.on_commit(update_supergroup.s(instance.pk, instance.taxon_supergroup_slug).delay)
+def refresh_taxon_abundance_post_save(sender, instance, **kwargs):
+    # rebuild the run's TaxonAbundance once the transaction commits; every read or annotation saved in the same
+    # transaction shares one task per run. The bulk loaders and the api and admin deletes queue the refresh
+    # themselves, so there is no post_delete receiver, which would also turn queryset deletes into row by row deletes
+    if sender is FeatureRead:
+        denoise_cluster_metadata_pk = instance.feature.denoise_cluster_metadata_id
+    else:
+        denoise_cluster_metadata_pk = instance.annotation_metadata.denoise_cluster_metadata_id
+    queue_cascade(refresh_taxon_abundance, denoise_cluster_metadata_pk)
 
 
-@receiver(post_save, sender=TaxonPhylumDivision, dispatch_uid='update_phylum_division')
-def update_phylum_division_post_save(sender, instance, **kwargs):
-    transaction.on_commit(update_phylum_division.s(instance.pk, instance.taxon_phylum_division_slug).delay)
-
-
-@receiver(post_save, sender=TaxonClass, dispatch_uid='update_class')
-def update_class_post_save(sender, instance, **kwargs):
-    transaction.on_commit(update_class.s(instance.pk, instance.taxon_class_slug).delay)
-
-
-@receiver(post_save, sender=TaxonOrder, dispatch_uid='update_order')
-def update_order_post_save(sender, instance, **kwargs):
-    transaction.on_commit(update_order.s(instance.pk, instance.taxon_order_slug).delay)
-
-
-@receiver(post_save, sender=TaxonFamily, dispatch_uid='update_family')
-def update_family_post_save(sender, instance, **kwargs):
-    transaction.on_commit(update_family.s(instance.pk, instance.taxon_family_slug).delay)
-
-
-@receiver(post_save, sender=TaxonGenus, dispatch_uid='update_genus')
-def update_genus_post_save(sender, instance, **kwargs):
-    transaction.on_commit(update_genus.s(instance.pk, instance.taxon_genus_slug).delay)
+for abundance_model in [FeatureRead, TaxonomicAnnotation]:
+    post_save.connect(refresh_taxon_abundance_post_save, sender=abundance_model,
+                      dispatch_uid='refresh_taxon_abundance_{model}'.format(model=abundance_model._meta.model_name))
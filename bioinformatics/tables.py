@@ -64,6 +64,7 @@ class FeatureOutputTable(tables.Table):
     created_datetime = tables.DateTimeColumn(format='M d, Y h:i a')
     modified_datetime = tables.DateTimeColumn(format='M d, Y h:i a')
     created_by = tables.Column(accessor='created_by.email')
+    feature_sequence = tables.Column(accessor='sequence.feature_sequence')
     edit = tables.LinkColumn('update_featureoutput', text='Update', args=[A('pk')], orderable=False)
 
     class Meta:
@@ -1,12 +1,17 @@
+import json
 from django.test import TestCase
 from django.utils import timezone
-from .models import QualityMetadata, DenoiseClusterMethod, DenoiseClusterMetadata, FeatureOutput, FeatureRead, \
+from .models import QualityMetadata, DenoiseClusterMethod, DenoiseClusterMetadata, FeatureSequence, FeatureOutput, FeatureRead, \
     ReferenceDatabase, TaxonSpecies, TaxonFamily, TaxonDomain, TaxonGenus, TaxonOrder, TaxonClass, \
     TaxonPhylumDivision, TaxonKingdom, TaxonSupergroup, TaxonomicAnnotation, AnnotationMethod, AnnotationMetadata
 from utility.tests import ProcessLocationTestCase, StandardOperatingProcedureTestCase
 from utility.models import ProcessLocation, StandardOperatingProcedure
 from wet_lab.tests import FastqFileTestCase, ExtractionTestCase
 from wet_lab.models import FastqFile, Extraction
+from .tasks import propagate_taxon_slugs
+from .abundance import materialize_taxon_abundance, get_taxon_abundance_matrix, get_taxon_abundance_rows, \
+    get_taxon_rollup, get_taxon_rollup_chart
+from .loaders import FeatureTableError, TaxonomyTableError, load_feature_table, load_taxonomy
 
 
 class QualityMetadataTestCase(TestCase):
@@ -103,6 +108,16 @@ class FeatureOutputTestCase(TestCase):
         test_exists = FeatureOutput.objects.filter(feature_id='77850c8cf42c8aaf177fc02b0df016f9')[:1].get()
         self.assertIs(test_exists.was_added_recently(), True)
 
+    def test_feature_sequence_stored_once(self):
+        # the same sequence from another feature is linked to the stored FeatureSequence, whitespace and case aside
+        feature = FeatureOutput.objects.get(feature_id='77850c8cf42c8aaf177fc02b0df016f9')
+        other = FeatureOutput.objects.create(denoise_cluster_metadata=feature.denoise_cluster_metadata,
+                                             feature_id='ASV_1',
+                                             feature_sequence=' {seq}\n'.format(seq=feature.feature_sequence.lower()))
+        self.assertEqual(other.sequence_id, feature.sequence_id)
+        self.assertEqual(FeatureSequence.objects.count(), 1)
+        self.assertEqual(list(feature.sequence.get_denoise_cluster_metadata()), [feature.denoise_cluster_metadata])
+
 
 class FeatureReadTestCase(TestCase):
     def setUp(self):
@@ -122,6 +137,40 @@ class FeatureReadTestCase(TestCase):
         self.assertIs(test_exists.was_added_recently(), True)
 
 
+class FeatureTableLoadTestCase(TestCase):
+    def setUp(self):
+        denoise_cluster_metadata_test = DenoiseClusterMetadataTestCase()
+        extraction_test = ExtractionTestCase()
+        denoise_cluster_metadata_test.setUp()
+        extraction_test.setUp()
+        self.denoise_cluster_metadata = DenoiseClusterMetadata.objects.filter()[:1].get()
+        self.barcode_slug = Extraction.objects.filter()[:1].get().barcode_slug
+
+    def test_load_feature_table(self):
+        feature_table = '# Constructed from biom file\n#OTU ID\t{barcode}\nASV_1\t12.0\nASV_2\t0\n'.format(barcode=self.barcode_slug)
+        stats = load_feature_table(self.denoise_cluster_metadata, feature_table, sequence_file='>ASV_1\nACGT\nACGT\n>ASV_2\nTTTT\n')
+        self.assertEqual(stats['features_created'], 2)
+        # zero counts are not stored
+        self.assertEqual(stats['reads_created'], 1)
+        feature = FeatureOutput.objects.get(denoise_cluster_metadata=self.denoise_cluster_metadata, feature_id='ASV_1')
+        self.assertEqual(feature.feature_sequence, 'ACGTACGT')
+        read = FeatureRead.objects.get(feature=feature)
+        self.assertEqual(read.number_reads, 12)
+        self.assertEqual(read.read_slug, '{feature}_12'.format(feature=feature.feature_slug))
+        with self.assertRaises(FeatureTableError):
+            load_feature_table(self.denoise_cluster_metadata, feature_table)
+        # a sparse biom table replaces the reads and matches the existing features
+        biom_table = json.dumps({'matrix_type': 'sparse', 'rows': [{'id': 'ASV_1'}, {'id': 'ASV_2'}],
+                                 'columns': [{'id': self.barcode_slug}], 'data': [[1, 0, 5]]})
+        stats = load_feature_table(self.denoise_cluster_metadata, biom_table, table_format='biom', replace=True)
+        self.assertEqual((stats['features_matched'], stats['reads_created'], stats['reads_deleted']), (2, 1, 1))
+
+    def test_unknown_extraction(self):
+        with self.assertRaises(FeatureTableError):
+            load_feature_table(self.denoise_cluster_metadata, '#OTU ID\tunknown-barcode\nASV_1\t1\n')
+        self.assertFalse(FeatureOutput.objects.filter(feature_id='ASV_1').exists())
+
+
 class ReferenceDatabaseTestCase(TestCase):
     def setUp(self):
         current_datetime = timezone.now()
@@ -253,6 +302,26 @@ class TaxonSpeciesTestCase(TestCase):
         self.assertIs(test_exists.was_added_recently(), True)
 
 
+class TaxonSlugPropagationTestCase(TestCase):
+    def setUp(self):
+        species_test = TaxonSpeciesTestCase()
+        species_test.setUp()
+
+    def test_propagate_taxon_slugs(self):
+        # rename the kingdom without save() and propagate it in single row batches
+        kingdom = TaxonKingdom.objects.get(taxon_kingdom='test_kingdom')
+        TaxonKingdom.objects.filter(pk=kingdom.pk).update(taxon_kingdom='renamed_kingdom', taxon_kingdom_slug='renamed_kingdom')
+        counts = propagate_taxon_slugs(TaxonKingdom, [kingdom.pk], batch_size=1)
+        self.assertNotIn('bioinformatics.TaxonKingdom', counts)
+        self.assertEqual(counts['bioinformatics.TaxonSpecies'], 1)
+        species = TaxonSpecies.objects.get(taxon_species='test_species')
+        self.assertEqual(species.taxon_kingdom_slug, 'renamed_kingdom')
+        self.assertEqual(species.taxon_genus_slug, 'test_genus')
+        # idempotent, a second run changes nothing
+        counts = propagate_taxon_slugs(TaxonKingdom, [kingdom.pk], batch_size=1)
+        self.assertEqual(sum(counts.values()), 0)
+
+
 class AnnotationMethodTestCase(TestCase):
     def setUp(self):
         AnnotationMethod.objects.get_or_create(annotation_method_name='test_name',
@@ -352,3 +421,84 @@ class TaxonomicAnnotationTestCase(TestCase):
         # test if date is added correctly
         test_exists = TaxonomicAnnotation.objects.filter()[:1].get()
         self.assertIs(test_exists.was_added_recently(), True)
+
+
+class TaxonomyLoadTestCase(TestCase):
+    def setUp(self):
+        feature_test = FeatureOutputTestCase()
+        annotation_metadata_test = AnnotationMetadataTestCase()
+        reference_database_test = ReferenceDatabaseTestCase()
+        feature_test.setUp()
+        annotation_metadata_test.setUp()
+        reference_database_test.setUp()
+        self.feature = FeatureOutput.objects.filter()[:1].get()
+        self.annotation_metadata = AnnotationMetadata.objects.filter()[:1].get()
+        self.reference_database = ReferenceDatabase.objects.filter()[:1].get()
+
+    def test_load_taxonomy(self):
+        taxonomy_table = 'Feature ID\tTaxon\tConfidence\n#q2:types\tcategorical\tcategorical\n' \
+                         '{feature}\td__Eukaryota; p__Chordata; c__Actinopteri; o__Gadiformes; f__Gadidae; g__; s__\t0.97\n'.format(
+                             feature=self.feature.feature_id)
+        stats = load_taxonomy(self.annotation_metadata, taxonomy_table, reference_databases=[self.reference_database])
+        self.assertEqual((stats['annotations_created'], stats['reference_links_created']), (1, 1))
+        annotation = TaxonomicAnnotation.objects.get(annotation_metadata=self.annotation_metadata)
+        self.assertEqual((annotation.ta_taxon, annotation.ta_domain, annotation.ta_family, annotation.ta_genus),
+                         ('Gadidae', 'Eukaryota', 'Gadidae', ''))
+        self.assertEqual(annotation.annotation_slug, 'gadidae_{feature}'.format(feature=self.feature.feature_id))
+        self.assertEqual(list(annotation.reference_database.all()), [self.reference_database])
+        with self.assertRaises(TaxonomyTableError):
+            load_taxonomy(self.annotation_metadata, taxonomy_table)
+        # lineages without rank prefixes are ranked by position
+        stats = load_taxonomy(self.annotation_metadata,
+                              'Feature ID\tTaxon\n{feature}\tEukaryota;Opisthokonta;Metazoa\n'.format(feature=self.feature.feature_id),
+                              ranks=['domain', 'supergroup', 'kingdom'], replace=True)
+        self.assertEqual((stats['annotations_created'], stats['annotations_deleted']), (1, 1))
+        annotation = TaxonomicAnnotation.objects.get(annotation_metadata=self.annotation_metadata)
+        self.assertEqual((annotation.ta_supergroup, annotation.ta_kingdom, annotation.confidence), ('Opisthokonta', 'Metazoa', None))
+
+    def test_unknown_feature(self):
+        with self.assertRaises(TaxonomyTableError):
+            load_taxonomy(self.annotation_metadata, 'Feature ID\tTaxon\nunknown-feature\td__Bacteria\n')
+        self.assertFalse(TaxonomicAnnotation.objects.exists())
+
+    def test_invalid_confidence(self):
+        # confidences the database would refuse are reported with their row before anything is written
+        for confidence in ['nan', 'inf', '12345678901234567', '0.12345678901']:
+            with self.assertRaisesMessage(TaxonomyTableError, 'Row 1: invalid confidence'):
+                load_taxonomy(self.annotation_metadata, 'Feature ID\tTaxon\tConfidence\n{feature}\td__Bacteria\t{confidence}\n'.format(
+                    feature=self.feature.feature_id, confidence=confidence))
+        self.assertFalse(TaxonomicAnnotation.objects.exists())
+
+
+class TaxonAbundanceTestCase(TestCase):
+    def setUp(self):
+        read_test = FeatureReadTestCase()
+        annotation_test = TaxonomicAnnotationTestCase()
+        read_test.setUp()
+        annotation_test.setUp()
+        self.denoise_cluster_metadata = DenoiseClusterMetadata.objects.filter()[:1].get()
+        self.extraction = Extraction.objects.filter()[:1].get()
+
+    def test_taxon_abundance_matrix(self):
+        self.assertEqual(materialize_taxon_abundance(self.denoise_cluster_metadata.pk), 1)
+        matrix = get_taxon_abundance_matrix(self.denoise_cluster_metadata, rank='phylum_division')
+        self.assertEqual(matrix['taxa']['ta_phylum_division'], ['test_phylum'])
+        self.assertEqual(matrix['extractions'], [self.extraction.barcode_slug])
+        self.assertEqual(matrix['matrix'], {'taxon': [0], 'extraction': [0], 'number_reads': [9999]})
+        header, rows = get_taxon_abundance_rows(matrix)
+        self.assertEqual(header[-1], self.extraction.barcode_slug)
+        self.assertEqual(rows[0][self.extraction.barcode_slug], 9999)
+
+    def test_taxon_rollup(self):
+        rollup = get_taxon_rollup(self.denoise_cluster_metadata, rank='manual_genus')
+        self.assertEqual(rollup['rollup'], {'group': [None], 'taxon': ['test_genus'], 'number_reads': [9999]})
+        # cached until the run's taxon abundance is refreshed
+        FeatureRead.objects.filter(feature__denoise_cluster_metadata=self.denoise_cluster_metadata).update(number_reads=1)
+        self.assertEqual(get_taxon_rollup(self.denoise_cluster_metadata, rank='manual_genus')['rollup']['number_reads'], [9999])
+        materialize_taxon_abundance(self.denoise_cluster_metadata.pk)
+        self.assertEqual(get_taxon_rollup(self.denoise_cluster_metadata, rank='manual_genus')['rollup']['number_reads'], [1])
+        rollup = get_taxon_rollup(self.denoise_cluster_metadata, rank='genus', group_by='site')
+        self.assertEqual(rollup['rollup']['number_reads'], [1])
+        chart = get_taxon_rollup_chart(rollup)
+        self.assertEqual(chart['data'], [1])
+        self.assertEqual(chart['datasets'], [{'label': 'test_genus', 'data': [1]}])
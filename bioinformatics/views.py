@@ -7,13 +7,17 @@ from django.core.exceptions import PermissionDenied
 from django.shortcuts import redirect, render
 from django.http import HttpResponse, JsonResponse
 from django.utils import timezone
-from rest_framework import viewsets
+from rest_framework import viewsets, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.response import Response
 from django_filters import rest_framework as filters
 from django_tables2.views import SingleTableMixin
 from django_filters.views import FilterView
-from utility.views import export_context, CreatePopupMixin, UpdatePopupMixin
+from utility.views import export_context, CreatePopupMixin, UpdatePopupMixin, Select2AutocompleteView
 from utility.charts import return_select2_options
 from utility.serializers import SerializerExportMixin
+from utility.pagination import KeysetPagination
 import bioinformatics.serializers as bioinfo_serializers
 import bioinformatics.filters as bioinfo_filters
 from .models import QualityMetadata, DenoiseClusterMethod, DenoiseClusterMetadata, FeatureOutput, FeatureRead, \
@@ -23,6 +27,10 @@ from .forms import FeatureOutputForm, FeatureReadForm, QualityMetadataForm, Anno
      TaxonomicAnnotationForm, DenoiseClusterMetadataCreateForm, DenoiseClusterMetadataUpdateForm
 from .tables import QualityMetadataTable, TaxonomicAnnotationTable, AnnotationMetadataTable, \
     DenoiseClusterMetadataTable, FeatureOutputTable, FeatureReadTable, FeatureReadTaxonTable
+from .loaders import FeatureTableError, TaxonomyTableError, load_feature_table, load_taxonomy
+from .abundance import get_taxon_abundance_matrix, get_taxon_abundance_rows, get_taxon_rollup, get_taxon_rollup_chart
+from .tasks import refresh_taxon_abundance
+from utility.dispatch import queue_cascade
 from django.conf import settings
 
 
@@ -30,6 +38,51 @@ from django.conf import settings
 ########################################
 # FRONTEND REQUESTS                    #
 ########################################
+class QualityMetadataAutocompleteView(Select2AutocompleteView):
+    model = QualityMetadata
+    text_field = 'analysis_label'
+    search_fields = ['analysis_label', 'quality_slug']
+
+
+class DenoiseClusterMetadataAutocompleteView(Select2AutocompleteView):
+    model = DenoiseClusterMetadata
+    text_field = 'denoise_cluster_slug'
+
+
+class FeatureOutputAutocompleteView(Select2AutocompleteView):
+    model = FeatureOutput
+    text_field = 'feature_slug'
+    search_fields = ['feature_id', 'feature_slug']
+
+
+class AnnotationMetadataAutocompleteView(Select2AutocompleteView):
+    model = AnnotationMetadata
+    text_field = 'annotation_slug'
+
+
+class TaxonAutocompleteView(Select2AutocompleteView):
+    # manual_* filters; one url per rank, e.g., TaxonAutocompleteView.as_view(rank='genus')
+    rank = None
+    rank_models = {'domain': TaxonDomain, 'kingdom': TaxonKingdom, 'supergroup': TaxonSupergroup,
+                   'phylum_division': TaxonPhylumDivision, 'class': TaxonClass, 'order': TaxonOrder,
+                   'family': TaxonFamily, 'genus': TaxonGenus, 'species': TaxonSpecies}
+
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
+        self.model = self.rank_models[self.rank]
+        self.text_field = 'taxon_{rank}'.format(rank=self.rank)
+
+
+class AnnotationTaxonAutocompleteView(Select2AutocompleteView):
+    # distinct ta_* names of the taxonomic annotations, e.g., AnnotationTaxonAutocompleteView.as_view(rank='genus')
+    model = TaxonomicAnnotation
+    rank = None
+
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
+        self.id_field = self.text_field = 'ta_{rank}'.format(rank=self.rank)
+
+
 @login_required(login_url='dashboard_login')
 def get_taxon_kingdom_options(request):
     taxon = request.GET.get('id')
@@ -104,6 +157,7 @@ def get_feature_read_taxon_table(request, pk):
                                                'INNER JOIN bioinformatics_featureread r ON r.feature_id = t.feature_id '
                                                'INNER JOIN wet_lab_extraction e ON e.id = r.extraction_id '
                                                'INNER JOIN bioinformatics_featureoutput o ON o.id = r.feature_id '
+                                               'INNER JOIN bioinformatics_featuresequence s ON s.id = o.sequence_id '
                                                'INNER JOIN bioinformatics_denoiseclustermetadata d ON d.id = o.denoise_cluster_metadata_id '
                                                'WHERE d.id = %s', [pk])
     for record in queryset:
@@ -125,12 +179,26 @@ def get_feature_read_taxon_table(request, pk):
             'ta_species': record.ta_species,
             'ta_common_name': record.ta_common_name
         })
-        table = FeatureReadTaxonTable(data)
+    table = FeatureReadTaxonTable(data)
 
-        return render(request, 'home/django-material-dashboard/model-list.html', {
-            'table': table,
-            'page_title': 'Taxon Feature Reads'
-        })
+    return render(request, 'home/django-material-dashboard/model-list.html', {
+        'table': table,
+        'page_title': 'Taxon Feature Reads'
+    })
+
+
+@login_required(login_url='dashboard_login')
+@permission_required('bioinformatics.view_taxonomicannotation', login_url='/dashboard/login/')
+def get_taxon_rollup_chart_data(request):
+    # same query parameters as the taxon rollup api; labels are the groups with one dataset per top taxon
+    serializer = bioinfo_serializers.TaxonRollupQuerySerializer(data=request.GET)
+    if not serializer.is_valid():
+        return JsonResponse(data=serializer.errors, status=400)
+    rollup = get_taxon_rollup(serializer.validated_data['denoise_cluster_metadata'],
+                              annotation_metadata=serializer.validated_data.get('annotation_metadata'),
+                              rank=serializer.validated_data['rank'],
+                              group_by=serializer.validated_data.get('group_by'))
+    return JsonResponse(data=get_taxon_rollup_chart(rollup, top=serializer.validated_data['top']))
 
 
 ########################################
@@ -411,6 +479,7 @@ class FeatureOutputFilterView(LoginRequiredMixin, PermissionRequiredMixin, Seria
     # View site filter view with REST serializer and django-tables2
     # export_formats = ['csv', 'xlsx'] # set in user_sites in default
     model = FeatureOutput
+    queryset = FeatureOutput.objects.select_related('sequence')
     table_class = FeatureOutputTable
     template_name = 'home/django-material-dashboard/model-filter-list.html'
     permission_required = ('bioinformatics.view_featureoutput', )
@@ -867,19 +936,63 @@ class DenoiseClusterMetadataViewSet(viewsets.ModelViewSet):
 
 class FeatureOutputViewSet(viewsets.ModelViewSet):
     serializer_class = bioinfo_serializers.FeatureOutputSerializer
-    queryset = FeatureOutput.objects.prefetch_related('created_by', 'denoise_cluster_metadata')
+    queryset = FeatureOutput.objects.prefetch_related('created_by', 'denoise_cluster_metadata', 'sequence')
+    pagination_class = KeysetPagination
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = bioinfo_filters.FeatureOutputSerializerFilter
     swagger_tags = ['bioinformatics denoclust']
 
+    def perform_destroy(self, instance):
+        # deletes send no signal for the abundance matrix, see signals.py; the feature's reads and annotations
+        # are deleted with it
+        denoise_cluster_metadata_pk = instance.denoise_cluster_metadata_id
+        super().perform_destroy(instance)
+        queue_cascade(refresh_taxon_abundance, denoise_cluster_metadata_pk)
+
 
 class FeatureReadViewSet(viewsets.ModelViewSet):
     serializer_class = bioinfo_serializers.FeatureReadSerializer
     queryset = FeatureRead.objects.prefetch_related('created_by', 'extraction', 'feature')
+    pagination_class = KeysetPagination
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = bioinfo_filters.FeatureReadSerializerFilter
     swagger_tags = ['bioinformatics denoclust']
 
+    def perform_destroy(self, instance):
+        # deletes send no signal for the abundance matrix, see signals.py
+        denoise_cluster_metadata_pk = instance.feature.denoise_cluster_metadata_id
+        super().perform_destroy(instance)
+        queue_cascade(refresh_taxon_abundance, denoise_cluster_metadata_pk)
+
+
+class FeatureTableImportViewSet(viewsets.GenericViewSet):
+    # POST a feature table to load its features and reads in bulk; requires add permission on FeatureRead
+    # and FeatureOutput, and with replace, which deletes the run's features and reads first, delete permission
+    # on both. The response has the row counts and load rate of load_feature_table.
+    serializer_class = bioinfo_serializers.FeatureTableImportSerializer
+    queryset = FeatureRead.objects.none()
+    parser_classes = [MultiPartParser, FormParser]
+    swagger_tags = ['bioinformatics denoclust']
+
+    def create(self, request):
+        if not request.user.has_perms(['bioinformatics.add_featureoutput', 'bioinformatics.add_featureread']):
+            raise PermissionDenied
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if serializer.validated_data['replace'] and not request.user.has_perms(
+                ['bioinformatics.delete_featureoutput', 'bioinformatics.delete_featureread']):
+            raise PermissionDenied
+        try:
+            stats = load_feature_table(serializer.validated_data['denoise_cluster_metadata'],
+                                       serializer.validated_data['feature_table'],
+                                       sequence_file=serializer.validated_data.get('feature_sequences'),
+                                       table_format=serializer.validated_data['table_format'],
+                                       created_by=request.user,
+                                       replace=serializer.validated_data['replace'])
+        except FeatureTableError as err:
+            raise ValidationError({'feature_table': [str(err)]})
+        return Response(stats, status=status.HTTP_201_CREATED)
+
 
 class ReferenceDatabaseViewSet(viewsets.ModelViewSet):
     # https://www.django-rest-framework.org/api-guide/filtering/#djangofilterbackend
@@ -985,6 +1098,94 @@ class TaxonomicAnnotationViewSet(viewsets.ModelViewSet):
                                                             'manual_supergroup',
                                                             'manual_phylum_division', 'manual_class', 'manual_order',
                                                             'manual_family', 'manual_genus', 'manual_species')
+    pagination_class = KeysetPagination
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = bioinfo_filters.TaxonomicAnnotationSerializerFilter
     swagger_tags = ['bioinformatics taxonomy']
+
+    def perform_destroy(self, instance):
+        # deletes send no signal for the abundance matrix, see signals.py
+        denoise_cluster_metadata_pk = instance.annotation_metadata.denoise_cluster_metadata_id
+        super().perform_destroy(instance)
+        queue_cascade(refresh_taxon_abundance, denoise_cluster_metadata_pk)
+
+
+class TaxonomyImportViewSet(viewsets.GenericViewSet):
+    # POST a taxonomy table to load the annotations of an annotation run in bulk; requires add permission on
+    # TaxonomicAnnotation, and with replace, which deletes the run's annotations first, delete permission too.
+    # The response has the row counts and load rate of load_taxonomy.
+    serializer_class = bioinfo_serializers.TaxonomyImportSerializer
+    queryset = TaxonomicAnnotation.objects.none()
+    parser_classes = [MultiPartParser, FormParser]
+    swagger_tags = ['bioinformatics taxonomy']
+
+    def create(self, request):
+        if not request.user.has_perm('bioinformatics.add_taxonomicannotation'):
+            raise PermissionDenied
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if serializer.validated_data['replace'] and not request.user.has_perm('bioinformatics.delete_taxonomicannotation'):
+            raise PermissionDenied
+        try:
+            stats = load_taxonomy(serializer.validated_data['annotation_metadata'],
+                                  serializer.validated_data['taxonomy_table'],
+                                  reference_databases=serializer.validated_data.get('reference_database', []),
+                                  ranks=serializer.validated_data.get('ranks'),
+                                  created_by=request.user,
+                                  replace=serializer.validated_data['replace'])
+        except TaxonomyTableError as err:
+            raise ValidationError({'taxonomy_table': [str(err)]})
+        return Response(stats, status=status.HTTP_201_CREATED)
+
+
+class TaxonAbundanceViewSet(viewsets.GenericViewSet):
+    # GET the materialized taxon x extraction matrix of a denoise/cluster run, e.g.,
+    # ?denoise_cluster_metadata=<slug>&rank=genus as columnar json, or with format=csv as one row per taxon and
+    # one column per extraction; requires view permission on TaxonomicAnnotation
+    serializer_class = bioinfo_serializers.TaxonAbundanceQuerySerializer
+    queryset = TaxonomicAnnotation.objects.none()
+    swagger_tags = ['bioinformatics taxonomy']
+
+    def get_renderer_context(self):
+        context = super().get_renderer_context()
+        if getattr(self, 'csv_header', None):
+            context['header'] = self.csv_header
+        return context
+
+    def list(self, request):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        matrix = get_taxon_abundance_matrix(serializer.validated_data['denoise_cluster_metadata'],
+                                            annotation_metadata=serializer.validated_data.get('annotation_metadata'),
+                                            rank=serializer.validated_data['rank'])
+        if request.accepted_renderer.format == 'csv':
+            self.csv_header, rows = get_taxon_abundance_rows(matrix)
+            return Response(rows)
+        return Response(matrix)
+
+
+class TaxonRollupViewSet(viewsets.GenericViewSet):
+    # GET the cached read counts of a denoise/cluster run summed to a rank, e.g.,
+    # ?denoise_cluster_metadata=<slug>&rank=manual_genus&group_by=site as columnar json, or with format=csv as one
+    # row per group and taxon; requires view permission on TaxonomicAnnotation
+    serializer_class = bioinfo_serializers.TaxonRollupQuerySerializer
+    queryset = TaxonomicAnnotation.objects.none()
+    swagger_tags = ['bioinformatics taxonomy']
+
+    def get_renderer_context(self):
+        context = super().get_renderer_context()
+        if getattr(self, 'csv_header', None):
+            context['header'] = self.csv_header
+        return context
+
+    def list(self, request):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        rollup = get_taxon_rollup(serializer.validated_data['denoise_cluster_metadata'],
+                                  annotation_metadata=serializer.validated_data.get('annotation_metadata'),
+                                  rank=serializer.validated_data['rank'],
+                                  group_by=serializer.validated_data.get('group_by'))
+        if request.accepted_renderer.format == 'csv':
+            self.csv_header = list(rollup['rollup'])
+            return Response([dict(zip(self.csv_header, row)) for row in zip(*rollup['rollup'].values())])
+        return Response(rollup)
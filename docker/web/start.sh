@@ -26,6 +26,8 @@ if [ "x$DJANGO_MANAGEPY_MIGRATE" = 'xon' ]; then
   python ${APP_HOME}/manage.py migrate freezer_inventory
   python ${APP_HOME}/manage.py migrate bioinformatics
   python ${APP_HOME}/manage.py migrate
+  # table of the default DatabaseCache (CACHE_BACKEND); a no-op for other cache backends
+  python ${APP_HOME}/manage.py createcachetable
 fi
 
 if [ "x$DJANGO_DATABASE_FLUSH" = 'xon' ]; then
@@ -17,6 +17,8 @@ if [ "x$DJANGO_MANAGEPY_MIGRATE" = 'xon' ]; then
 	# Run and apply database migrations
   echo "${0}: [$(date -u)] ***Applying database migrations***"
   python ${APP_HOME}/manage.py migrate
+  # table of the default DatabaseCache (CACHE_BACKEND); a no-op for other cache backends
+  python ${APP_HOME}/manage.py createcachetable
 fi
 
 if [ "x$DJANGO_DATABASE_FLUSH" = 'xon' ]; then
@@ -1,9 +1,16 @@
-from django.test import TestCase
+import json
+from unittest import mock
+from django.test import TestCase, RequestFactory
 from .models import EnvoBiomeFirst, EnvoBiomeSecond, EnvoFeatureFirst, EnvoFeatureSecond, System, Watershed, \
     FieldSite, EnvoFeatureFifth, EnvoFeatureSixth, EnvoFeatureThird, EnvoFeatureFourth, EnvoBiomeThird, \
     EnvoBiomeFourth, EnvoBiomeFifth, EnvoFeatureSeventh
 from utility.models import Fund, Project
 from utility.tests import FundTestCase, ProjectTestCase
+from utility.dispatch import suppress_cascade_dispatch
+from .tasks import cascade_envo_slugs, update_envo_slugs
+from .views import WATERSHED_GEOJSON_PROPERTIES
+from .tiles import get_tile, get_tile_version
+from utility.geojson import geojson_response
 # Create your tests here.
 
 
@@ -164,6 +171,39 @@ class EnvoFeatureSeventhTestCase(TestCase):
         self.assertIs(test_feature_tier.was_added_recently(), True)
 
 
+class EnvoSlugCascadeTestCase(TestCase):
+    def setUp(self):
+        biome_test = EnvoBiomeFifthTestCase()
+        biome_test.setUp()
+
+    def test_cascade_envo_slugs(self):
+        # rename the root of the fifth tier's lineage without save() and cascade the new slug down
+        fifth = EnvoBiomeFifth.objects.get(biome_fifth_tier='test_fifth_tier')
+        first_pk = fifth.biome_fourth_tier.biome_third_tier.biome_second_tier.biome_first_tier_id
+        EnvoBiomeFirst.objects.filter(pk=first_pk).update(biome_first_tier='Renamed Lake', biome_first_tier_slug='renamed-lake')
+        counts = cascade_envo_slugs(EnvoBiomeFirst, [first_pk])
+        self.assertEqual(counts['field_site.EnvoBiomeSecond'], 1)
+        self.assertEqual(counts['field_site.EnvoBiomeFifth'], 1)
+        fifth.refresh_from_db()
+        self.assertEqual(fifth.biome_first_tier_slug, 'renamed-lake')
+        self.assertEqual(fifth.biome_fourth_tier_slug, 'test_fourth_tier')
+        # running it again changes nothing
+        counts = cascade_envo_slugs(EnvoBiomeFirst, [first_pk])
+        self.assertEqual(sum(counts.values()), 0)
+
+    def test_coalesce_envo_dispatch(self):
+        # repeated saves of the same tiers are sent as one task with each root pk once
+        with suppress_cascade_dispatch(dispatch=False) as batch:
+            for biome_first_tier in EnvoBiomeFirst.objects.all():
+                biome_first_tier.save()
+                biome_first_tier.save()
+        first_pks = sorted(EnvoBiomeFirst.objects.values_list('pk', flat=True))
+        self.assertEqual(len(batch.jobs), 1)
+        with mock.patch.object(update_envo_slugs, 'delay') as delay:
+            batch.flush()
+        delay.assert_called_once_with('field_site.EnvoBiomeFirst', first_pks)
+
+
 class SystemTestCase(TestCase):
     def setUp(self):
         System.objects.get_or_create(system_code='L', defaults={'system_label': 'Lake'})
@@ -195,6 +235,25 @@ class WatershedTestCase(TestCase):
         nea = Watershed.objects.get(watershed_code='NE')
         self.assertIs(nea.was_added_recently(), True)
 
+    def test_geojson_response(self):
+        # the FeatureCollection is built in postgis; a matching If-None-Match is answered with 304
+        request = RequestFactory().get('/')
+        response = geojson_response(request, Watershed.objects.all(), WATERSHED_GEOJSON_PROPERTIES)
+        feature = json.loads(response.content)['features'][0]
+        self.assertEqual(feature['properties']['watershed_code'], 'NE')
+        self.assertEqual(feature['geometry']['type'], 'MultiPolygon')
+        request = RequestFactory().get('/', HTTP_IF_NONE_MATCH=response['ETag'])
+        response = geojson_response(request, Watershed.objects.all(), WATERSHED_GEOJSON_PROPERTIES)
+        self.assertEqual(response.status_code, 304)
+
+    def test_vector_tile(self):
+        # the world tile holds the watershed; saving a watershed drops the layer's cached tiles
+        self.assertTrue(get_tile('watershed', 0, 0, 0))
+        self.assertEqual(get_tile('watershed', 1, 1, 1), b'')
+        version = get_tile_version('watershed')
+        Watershed.objects.get(watershed_code='NE').save()
+        self.assertNotEqual(get_tile_version('watershed'), version)
+
 
 class FieldSiteTestCase(TestCase):
     def setUp(self):
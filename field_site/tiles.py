@@ -0,0 +1,139 @@
+import math
+import time
+from django.conf import settings
+from django.contrib.gis.geos import Polygon
+from django.core.cache import cache, caches
+from django.db import connections
+from django.db.models import F
+from field_survey.models import FieldSurvey
+from .models import FieldSite, Watershed, WorldBorder
+
+# https://postgis.net/docs/ST_AsMVT.html
+# https://postgis.net/docs/ST_AsMVTGeom.html
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+TILE_MAX_ZOOM = 22
+# web mercator width of the world in meters
+TILE_WORLD_SIZE = 2 * math.pi * 6378137
+# pixels between clustered points; points closer than this on screen share one feature with their point_count
+TILE_CLUSTER_RADIUS = 32
+
+TILE_LAYERS = {
+    'watershed': {'queryset': Watershed.objects.all(),
+                  'geometry_field': 'geom',
+                  'properties': ['watershed_code', 'watershed_label'],
+                  'permission': None,
+                  'cluster': False},
+    'worldborder': {'queryset': WorldBorder.objects.all(),
+                    'geometry_field': 'geom',
+                    'properties': ['name', 'iso3'],
+                    'permission': None,
+                    'cluster': False},
+    'fieldsite': {'queryset': FieldSite.objects.all(),
+                  'geometry_field': 'geom',
+                  'properties': ['site_id', 'general_location_name'],
+                  'permission': 'field_site.view_fieldsite',
+                  'cluster': True},
+    # a survey's geom is the geom of its site
+    'fieldsurvey': {'queryset': FieldSurvey.objects.all(),
+                    'geometry_field': 'site_id__geom',
+                    'properties': ['survey_global_id', 'site_id'],
+                    'permission': 'field_survey.view_fieldsurvey',
+                    'cluster': True},
+}
+# layers drawn from each model's geometry, for invalidating cached tiles when a row changes
+TILE_LAYER_MODELS = {Watershed: ['watershed'],
+                     WorldBorder: ['worldborder'],
+                     FieldSite: ['fieldsite', 'fieldsurvey'],
+                     FieldSurvey: ['fieldsurvey']}
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= TILE_MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def get_tile_bbox(z, x, y):
+    # lon/lat bounds of a slippy map tile
+    # https://wiki.openstreetmap.org/wiki/Slippy_map_tilenames
+    def lon(tile_x):
+        return tile_x / 2 ** z * 360 - 180
+
+    def lat(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / 2 ** z))))
+    return Polygon.from_bbox((lon(x), lat(y + 1), lon(x + 1), lat(y)))
+
+
+def get_tile_pixel_size(z):
+    # meters per tile extent unit at zoom z; geometries are simplified to this tolerance so a low zoom tile
+    # does not carry vertices it cannot draw
+    return TILE_WORLD_SIZE / 2 ** z / TILE_EXTENT
+
+
+def tile_sql(layer, z, x, y):
+    # ST_AsMVT over the layer's rows that overlap the tile; the bbox filter runs through django so the
+    # geometry's spatial index is used
+    config = TILE_LAYERS[layer]
+    bbox = get_tile_bbox(z, x, y)
+    bbox.srid = 4326
+    geometry_field = config['geometry_field']
+    queryset = config['queryset'].filter(**{'{field}__bboverlaps'.format(field=geometry_field): bbox})
+    columns = {'tile_geometry': F(geometry_field)}
+    columns.update({'tile_p{index}'.format(index=index): F(name) for index, name in enumerate(config['properties'])})
+    sql, params = queryset.order_by().values(**columns).query.sql_with_params()
+    quote_name = connections[queryset.db].ops.quote_name
+    pixel_size = get_tile_pixel_size(z)
+    if config['cluster']:
+        # points snapped to a grid of TILE_CLUSTER_RADIUS pixels; a lone point keeps its properties
+        geometry_sql = 'ST_Centroid(ST_Collect(ST_Transform(t.tile_geometry, 3857)))'
+        property_sql = ['count(*) AS point_count'] + [
+            'CASE WHEN count(*) = 1 THEN min(t.tile_p{index}::text) END AS {name}'.format(index=index, name=quote_name(name))
+            for index, name in enumerate(config['properties'])]
+        geometry_params = ()
+        group_sql = 'GROUP BY ST_SnapToGrid(ST_Transform(t.tile_geometry, 3857), %s)'
+        group_params = (pixel_size * TILE_CLUSTER_RADIUS, )
+    else:
+        geometry_sql = 'ST_SimplifyPreserveTopology(ST_Transform(t.tile_geometry, 3857), %s)'
+        property_sql = ['t.tile_p{index} AS {name}'.format(index=index, name=quote_name(name))
+                        for index, name in enumerate(config['properties'])]
+        geometry_params = (pixel_size, )
+        group_sql = ''
+        group_params = ()
+    geometry_sql = 'ST_AsMVTGeom({geometry_sql}, ST_TileEnvelope(%s, %s, %s), {extent}, {buffer}, true) AS geom'.format(
+        geometry_sql=geometry_sql, extent=TILE_EXTENT, buffer=TILE_BUFFER)
+    select_sql = ', '.join([geometry_sql] + property_sql)
+    mvt_sql = 'SELECT ST_AsMVT(mvt, %s, {extent}, \'geom\') FROM (' \
+              'SELECT {select_sql} ' \
+              'FROM ({sql}) t ' \
+              'WHERE t.tile_geometry IS NOT NULL {group_sql}' \
+              ') mvt WHERE mvt.geom IS NOT NULL'.format(extent=TILE_EXTENT, select_sql=select_sql, sql=sql,
+                                                        group_sql=group_sql)
+    return mvt_sql, (layer, ) + geometry_params + (z, x, y) + tuple(params) + group_params
+
+
+def get_tile_version(layer):
+    # per layer token in every tile cache key; invalidate_tiles replaces it so every cached tile of the layer
+    # misses at once without enumerating keys; kept in the default cache, while the tiles are in the 'views' cache
+    key = 'tile_version:{layer}'.format(layer=layer)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_tiles(layer):
+    cache.set('tile_version:{layer}'.format(layer=layer), time.time_ns(), None)
+
+
+def get_tile(layer, z, x, y):
+    # mapbox vector tile bytes of the layer; empty when no rows overlap the tile
+    key = 'tile:{layer}:{version}:{z}:{x}:{y}'.format(layer=layer, version=get_tile_version(layer), z=z, x=x, y=y)
+    tile = caches['views'].get(key)
+    if tile is None:
+        sql, params = tile_sql(layer, z, x, y)
+        with connections[TILE_LAYERS[layer]['queryset'].db].cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+        tile = bytes(row[0]) if row and row[0] is not None else b''
+        caches['views'].set(key, tile, settings.TILE_CACHE_TIMEOUT)
+    return tile
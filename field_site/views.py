@@ -1,27 +1,27 @@
 from django.db.models import F
-from django.core.serializers import serialize
 from django.core.exceptions import PermissionDenied
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.gis.geos import Point
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
 from django.utils import timezone
 from django.views.generic import DetailView
 from django.views.generic.edit import CreateView, UpdateView
 import csv
-import json
 from rest_framework import generics, viewsets
 from django_filters import rest_framework as filters
 from django_filters.views import FilterView
 from django_tables2.views import SingleTableMixin
 from utility.serializers import SerializerExportMixin
-from utility.views import export_context
+from utility.views import export_context, Select2AutocompleteView
 from utility.charts import return_select2_options
+from utility.geojson import geojson_response
 import field_site.serializers as fieldsite_serializers
 import field_site.filters as fieldsite_filters
 from .tables import FieldSiteTable
+from .tiles import TILE_LAYERS, is_valid_tile, get_tile
 from .models import EnvoBiomeFirst, EnvoBiomeSecond, EnvoBiomeThird, EnvoBiomeFourth, EnvoBiomeFifth, \
     EnvoFeatureFirst, EnvoFeatureSecond, EnvoFeatureThird, EnvoFeatureFourth, \
     EnvoFeatureFifth, EnvoFeatureSixth, EnvoFeatureSeventh, \
@@ -34,6 +34,15 @@ from django.conf import settings
 ########################################
 # FRONTEND REQUESTS                    #
 ########################################
+class FieldSiteAutocompleteView(Select2AutocompleteView):
+    model = FieldSite
+    text_field = 'general_location_name'
+    search_fields = ['site_id', 'general_location_name']
+
+
+WATERSHED_GEOJSON_PROPERTIES = {'pk': 'pk', 'watershed_code': 'watershed_code', 'watershed_label': 'watershed_label'}
+
+
 @login_required(login_url='dashboard_login')
 def get_watershed_geom(request):
     # https://simpleisbetterthancomplex.com/tutorial/2020/01/19/how-to-use-chart-js-with-django.html
@@ -41,9 +50,7 @@ def get_watershed_geom(request):
     # https://leafletjs.com/examples/geojson/
     # https://stackoverflow.com/questions/52025577/how-to-remove-certain-fields-when-doing-serialization-to-a-django-model
     # project = get_object_or_404(Project, pk=pk)
-    qs = Watershed.objects.only('pk', 'watershed_code', 'watershed_label', 'geom', )
-    qs_json = serialize('geojson', qs, fields=('pk', 'watershed_code', 'watershed_label', 'geom'))
-    return JsonResponse(json.loads(qs_json))
+    return geojson_response(request, Watershed.objects.all(), WATERSHED_GEOJSON_PROPERTIES)
 
 
 @permission_required('field_site.view_fieldsite', login_url='dashboard_login')
@@ -54,8 +61,6 @@ def get_field_site_geom(request):
     # https://leafletjs.com/examples/geojson/
     # https://stackoverflow.com/questions/52025577/how-to-remove-certain-fields-when-doing-serialization-to-a-django-model
     # project = get_object_or_404(Project, pk=pk)
-    qs = FieldSite.objects.only('site_id', 'general_location_name', 'geom', )
-    qs_json = serialize('geojson', qs, fields=('site_id', 'general_location_name', 'geom', ))
     # qs = FieldSite.objects.only('site_id', 'fund', 'system', 'watershed', 'general_location_name', 'purpose',
     #                             'envo_biome_first', 'envo_biome_second', 'envo_biome_third', 'envo_biome_fourth',
     #                             'envo_biome_fifth', 'envo_feature_first', 'envo_feature_second', 'envo_feature_third',
@@ -66,7 +71,8 @@ def get_field_site_geom(request):
     #                                            'envo_biome_fifth', 'envo_feature_first', 'envo_feature_second', 'envo_feature_third',
     #                                            'envo_feature_fourth', 'envo_feature_fifth', 'envo_feature_sixth', 'envo_feature_seventh',
     #                                            'geom',))
-    return JsonResponse(json.loads(qs_json))
+    return geojson_response(request, FieldSite.objects.all(),
+                            {'site_id': 'site_id', 'general_location_name': 'general_location_name'})
 
 
 @login_required(login_url='dashboard_login')
@@ -77,9 +83,18 @@ def get_point_intersect_watershed_geom(request, lat, long, srid):
     # https://stackoverflow.com/questions/52025577/how-to-remove-certain-fields-when-doing-serialization-to-a-django-model
     # project = get_object_or_404(Project, pk=pk)
     pnt = Point(x=long, y=lat, srid=srid)
-    qs = Watershed.objects.only('pk', 'watershed_code', 'watershed_label', 'geom').filter(geom__intersects=pnt)
-    qs_json = serialize('geojson', qs, fields=('pk', 'watershed_code', 'watershed_label', 'geom'))
-    return JsonResponse(json.loads(qs_json))
+    return geojson_response(request, Watershed.objects.filter(geom__intersects=pnt), WATERSHED_GEOJSON_PROPERTIES)
+
+
+@login_required(login_url='dashboard_login')
+def get_vector_tile(request, layer, z, x, y):
+    # mapbox vector tile of a TILE_LAYERS layer, e.g., for Leaflet.VectorGrid; site and survey layers are clustered
+    if layer not in TILE_LAYERS or not is_valid_tile(z, x, y):
+        raise Http404('Tile not found')
+    permission = TILE_LAYERS[layer]['permission']
+    if permission and not request.user.has_perm(permission):
+        raise PermissionDenied
+    return HttpResponse(get_tile(layer, z, x, y), content_type='application/vnd.mapbox-vector-tile')
 
 
 @login_required(login_url='dashboard_login')
@@ -7,3 +7,4 @@ class FieldSurveyConfig(AppConfig):
 
     def ready(self):
         import field_survey.signals
+        import field_survey.stats
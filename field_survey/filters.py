@@ -4,7 +4,7 @@ from django_filters.widgets import RangeWidget
 from field_site.models import FieldSite
 from users.models import CustomUser
 from utility.models import Project
-from utility.widgets import CustomSelect2Multiple, CustomSelect2
+from utility.widgets import CustomSelect2Multiple, CustomSelect2, Select2Autocomplete
 from sample_label.models import SampleBarcode
 from .models import FieldSurvey, FieldCrew, EnvMeasureType, EnvMeasure, \
     FieldSample, FilterSample, SubCoreSample
@@ -28,15 +28,15 @@ class FieldSurveyFilter(filters.FilterSet):
                                                     label='Project')
     site_id = filters.ModelChoiceFilter(field_name='site_id__site_id', 
                                         queryset=FieldSite.objects.all(), 
-                                        widget=CustomSelect2, 
+                                        widget=Select2Autocomplete(url='autocomplete_fieldsite'), 
                                         label='Site ID')
     username = filters.ModelChoiceFilter(field_name='username__agol_username', 
                                          queryset=CustomUser.objects.all(), 
-                                         widget=CustomSelect2, 
+                                         widget=Select2Autocomplete(url='autocomplete_user'), 
                                          label='Username')
     supervisor = filters.ModelChoiceFilter(field_name='supervisor__agol_username', 
                                            queryset=CustomUser.objects.all(), 
-                                           widget=CustomSelect2, 
+                                           widget=Select2Autocomplete(url='autocomplete_user'), 
                                            label='Supervisor')
     created_datetime = filters.DateFromToRangeFilter(field_name='created_datetime',
                                                      widget=RangeWidget(attrs={'class': 'form-control', 
@@ -52,7 +52,7 @@ class FieldSurveyFilter(filters.FilterSet):
 class FieldCrewFilter(filters.FilterSet):
     survey_global_id = filters.ModelChoiceFilter(field_name='survey_global_id__survey_global_id', 
                                                  queryset=FieldSurvey.objects.all(), 
-                                                 widget=CustomSelect2, 
+                                                 widget=Select2Autocomplete(url='autocomplete_fieldsurvey'), 
                                                  label='Survey Global ID')
     created_datetime = filters.DateFilter(input_formats=['%Y-%m-%d', '%d-%m-%Y'], 
                                           lookup_expr='icontains', 
@@ -60,7 +60,7 @@ class FieldCrewFilter(filters.FilterSet):
                                           label='Created DateTime')
     created_by = filters.ModelChoiceFilter(field_name='username__email', 
                                            queryset=CustomUser.objects.all(), 
-                                           widget=CustomSelect2, 
+                                           widget=Select2Autocomplete(url='autocomplete_user'), 
                                            label='Created By')
 
     class Meta:
@@ -78,7 +78,7 @@ class EnvMeasureFilter(filters.FilterSet):
                                               label='Created DateTime')
     created_by = filters.ModelChoiceFilter(field_name='survey_global_id__created_by__email', 
                                            queryset=CustomUser.objects.all(), 
-                                           widget=CustomSelect2, label='Created By')
+                                           widget=Select2Autocomplete(url='autocomplete_user'), label='Created By')
     field_sample_barcode = filters.CharFilter(field_name='survey_global_id__field_samples__field_sample_barcode__sample_barcode_id', 
                                               lookup_expr='iexact', 
                                               label='Sample Barcode')
@@ -100,11 +100,11 @@ class FieldSampleFilter(filters.FilterSet):
                                                     label='Project Code')
     site_name = filters.ModelChoiceFilter(field_name='survey_global_id__site_id', 
                                         queryset=FieldSite.objects.all(), 
-                                        widget=CustomSelect2, 
+                                        widget=Select2Autocomplete(url='autocomplete_fieldsite'), 
                                         label='Site Name')
     field_sample_barcode = filters.ModelChoiceFilter(field_name='field_sample_barcode', 
                                                      queryset=FieldSample.objects.all(), 
-                                                     widget=CustomSelect2, 
+                                                     widget=Select2Autocomplete(url='autocomplete_fieldsample'), 
                                                      label='Barcode')
     class Meta:
         model = FieldSample
@@ -118,15 +118,15 @@ class FilterSampleFilter(filters.FilterSet):
                                                     label='Project Code')
     site_name = filters.ModelChoiceFilter(field_name='field_sample__survey_global_id__site_id__general_location_name', 
                                         queryset=FieldSite.objects.all(), 
-                                        widget=CustomSelect2, 
+                                        widget=Select2Autocomplete(url='autocomplete_fieldsite'), 
                                         label='Site Name')
     username = filters.ModelChoiceFilter(field_name='field_sample__survey_global_id__username__agol_username', 
                                          queryset=CustomUser.objects.all(), 
-                                         widget=CustomSelect2, 
+                                         widget=Select2Autocomplete(url='autocomplete_user'), 
                                          label='Username')
     supervisor = filters.ModelChoiceFilter(field_name='field_sample__survey_global_id__supervisor__agol_username', 
                                            queryset=CustomUser.objects.all(), 
-                                           widget=CustomSelect2, 
+                                           widget=Select2Autocomplete(url='autocomplete_user'), 
                                            label='Supervisor')
     filter_datetime = filters.DateFilter(input_formats=['%Y-%m-%d', '%d-%m-%Y'], 
                                          lookup_expr='icontains', 
@@ -135,7 +135,7 @@ class FilterSampleFilter(filters.FilterSet):
                                          label='Filter DateTime')
     field_sample_barcode = filters.ModelChoiceFilter(field_name='field_sample__field_sample_barcode__sample_barcode_id', 
                                                      queryset=SampleBarcode.objects.all(), 
-                                                     widget=CustomSelect2, 
+                                                     widget=Select2Autocomplete(url='autocomplete_samplebarcode'), 
                                                      label='Barcode')
 
     class Meta:
@@ -146,11 +146,11 @@ class FilterSampleFilter(filters.FilterSet):
 
 class SubCoreSampleFilter(filters.FilterSet):
     project_ids = filters.ModelMultipleChoiceFilter(field_name='field_sample__survey_global_id__project_ids__project_label', queryset=Project.objects.all(), widget=CustomSelect2Multiple, label='Project')
-    site_id = filters.ModelChoiceFilter(field_name='field_sample__survey_global_id__site_id__site_id', queryset=FieldSite.objects.all(), widget=CustomSelect2, label='Site ID')
-    username = filters.ModelChoiceFilter(field_name='field_sample__survey_global_id__username__agol_username', queryset=CustomUser.objects.all(), widget=CustomSelect2, label='Username')
-    supervisor = filters.ModelChoiceFilter(field_name='field_sample__survey_global_id__supervisor__agol_username', queryset=CustomUser.objects.all(), widget=CustomSelect2, label='Supervisor')
+    site_id = filters.ModelChoiceFilter(field_name='field_sample__survey_global_id__site_id__site_id', queryset=FieldSite.objects.all(), widget=Select2Autocomplete(url='autocomplete_fieldsite'), label='Site ID')
+    username = filters.ModelChoiceFilter(field_name='field_sample__survey_global_id__username__agol_username', queryset=CustomUser.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'), label='Username')
+    supervisor = filters.ModelChoiceFilter(field_name='field_sample__survey_global_id__supervisor__agol_username', queryset=CustomUser.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'), label='Supervisor')
     subcore_datetime_start = filters.DateFilter(input_formats=['%Y-%m-%d', '%d-%m-%Y'], lookup_expr='icontains', widget=forms.SelectDateWidget(attrs={'class': 'form-control', }), label='SubCore DateTime')
-    field_sample_barcode = filters.ModelChoiceFilter(field_name='field_sample__field_sample_barcode__sample_barcode_id', queryset=FieldSample.objects.all(), widget=CustomSelect2, label='Barcode')
+    field_sample_barcode = filters.ModelChoiceFilter(field_name='field_sample__field_sample_barcode__sample_barcode_id', queryset=FieldSample.objects.all(), widget=Select2Autocomplete(url='autocomplete_fieldsample'), label='Barcode')
 
     class Meta:
         model = FieldSurvey
@@ -0,0 +1,474 @@
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+from field_site.models import FieldSite
+from field_site.tiles import invalidate_tiles
+from sample_label.models import SampleBarcode, SampleType, get_field_sample_sample_type
+from users.models import CustomUser
+from utility.enumerations import YesNo, MeasureModes, SamplingMethods, FilterTypes
+from utility.models import Project
+from utility.stats import invalidate_stats
+from .models import FieldSurvey, EnvMeasureType, EnvMeasure, FieldSample, FilterSample
+
+# values of a measure column that mean no measurement was taken
+EMPTY_MEASURE_VALUES = ['', 'NA', 'na', 'N/A', 'None']
+
+
+def parse_date_time(date_str, time_str):
+    # '2025-08-21' and '01:10:00 PM' or '13:10:00' into an aware datetime; None when either is missing or unreadable
+    if not date_str or not time_str:
+        return None
+    try:
+        date_obj = datetime.strptime(str(date_str).strip(), '%Y-%m-%d').date()
+        time_str = str(time_str).strip()
+        try:
+            time_obj = datetime.strptime(time_str, '%I:%M:%S %p').time()
+        except ValueError:
+            time_obj = datetime.strptime(time_str, '%H:%M:%S').time()
+        return timezone.make_aware(datetime.combine(date_obj, time_obj))
+    except (ValueError, AttributeError):
+        return None
+
+
+def parse_decimal(value):
+    if value is None or str(value).strip() == '':
+        return None
+    return Decimal(str(value).strip())
+
+
+def split_codes(value, separator=';'):
+    return [code.strip() for code in str(value or '').split(separator) if code.strip()]
+
+
+def is_date(value):
+    try:
+        datetime.strptime(str(value).strip(), '%Y-%m-%d')
+        return True
+    except ValueError:
+        return False
+
+
+def is_time(value):
+    for time_format in ['%I:%M:%S %p', '%H:%M:%S']:
+        try:
+            datetime.strptime(str(value).strip(), time_format)
+            return True
+        except ValueError:
+            pass
+    return False
+
+
+def is_datetime(value):
+    try:
+        FieldSurvey._meta.get_field('survey_datetime').to_python(value)
+        return True
+    except ValidationError:
+        return False
+
+
+def is_decimal(value):
+    try:
+        parse_decimal(value)
+        return True
+    except InvalidOperation:
+        return False
+
+
+def get_choice(choices, value):
+    # the choice's value from its value or label, case insensitively; None when it is neither
+    text = str(value).strip().lower()
+    for choice_value, label in choices.choices:
+        if choice_value and text in [str(choice_value).lower(), str(label).lower()]:
+            return choice_value
+    return None
+
+
+def is_choice(choices):
+    return lambda value: get_choice(choices, value) is not None
+
+
+########################################
+# SET-BASED SAMPLE IMPORT              #
+########################################
+class SampleImport:
+    # Imports the rows of a spreadsheet in two passes instead of a transaction and a dozen lookups per row.
+    # prepare() reads every row first and resolves each kind of referenced record (sites, users, projects,
+    # measure types, barcodes, sample types, existing samples) with one IN query, so each row is checked
+    # against dicts; rows that fail are reported as 'Row n: ...' in errors and write nothing. save() then
+    # bulk creates the surveys, measures, barcodes and samples of the remaining rows in one transaction.
+    # run(dry_run=True) validates a file without writing: it stops after prepare(), so the counts are of what
+    # would be created and the errors are those a real import would report.
+    # columns that must be in the file's header; without one of them no row is read
+    required_columns = []
+    # {column: (check of a single value, error message)}; each distinct value of a column is checked once
+    # before prepare() and rows with a bad value are left out of it
+    column_checks = {}
+    # most row numbers kept per column in column_errors
+    column_error_rows = 10
+
+    def __init__(self, rows, created_by, row_offset=0):
+        # row_offset is the number of rows before rows in the file, e.g., of an import job's earlier chunks
+        self.rows = [self.normalize_row(dict(row)) for row in rows]
+        self.created_by = created_by
+        self.row_offset = row_offset
+        self.batch_size = settings.SAMPLE_IMPORT_BATCH_SIZE
+        self.errors = []
+        # {column: {'column', 'error_count', 'rows', 'messages'}}, a summary of errors per column
+        self.column_errors = {}
+        self.missing_columns = []
+        self.invalid_rows = set()
+        self.created_count = 0
+        self.updated_count = 0
+        self.skipped_count = 0
+        self.now = timezone.now()
+        # records to create, filled by prepare()
+        self.new_surveys = []
+        self.new_survey_projects = set()
+        self.new_measures = []
+        self.new_barcodes = {}
+        self.new_samples = {}
+        self.new_filter_samples = {}
+
+    def normalize_row(self, row):
+        return row
+
+    def error(self, row_num, message, column=None):
+        self.errors.append('Row {row_num}: {message}'.format(row_num=row_num + self.row_offset, message=message))
+        if column:
+            self.column_error(column, message, row_num)
+
+    def column_error(self, column, message, row_num=None):
+        summary = self.column_errors.setdefault(column, {'column': column, 'error_count': 0, 'rows': [], 'messages': []})
+        summary['error_count'] += 1
+        if row_num is not None and len(summary['rows']) < self.column_error_rows:
+            summary['rows'].append(row_num + self.row_offset)
+        if message not in summary['messages'] and len(summary['messages']) < self.column_error_rows:
+            summary['messages'].append(message)
+
+    def get_column_errors(self):
+        return list(self.column_errors.values())
+
+    def check_columns(self):
+        # whole column checks of the header and of the distinct values of each checked column; returns False
+        # when a required column is missing
+        header = set(self.rows[0]) if self.rows else set()
+        self.missing_columns = [column for column in self.required_columns if self.rows and column not in header]
+        for column in self.missing_columns:
+            self.errors.append("Missing column '{column}'".format(column=column))
+            self.column_error(column, 'Missing column')
+        if self.missing_columns:
+            return False
+        for column, (check, message) in self.column_checks.items():
+            values = {row.get(column) for row in self.rows} - {None, ''}
+            invalid_values = {value for value in values if not check(value)}
+            if not invalid_values:
+                continue
+            for row_num, row in enumerate(self.rows, start=1):
+                if row.get(column) in invalid_values:
+                    self.error(row_num, message.format(column=column, value=row.get(column)), column=column)
+                    self.invalid_rows.add(row_num)
+        return True
+
+    def run(self, dry_run=False):
+        if self.check_columns():
+            self.prepare()
+            if not dry_run:
+                self.save()
+        return self
+
+    def validate(self):
+        return self.run(dry_run=True)
+
+    def prepare(self):
+        raise NotImplementedError
+
+    def get_barcodes(self, barcode_ids):
+        return SampleBarcode.objects.in_bulk([barcode_id for barcode_id in barcode_ids if barcode_id])
+
+    def get_sample_types(self, sample_type_texts):
+        # {code or label: SampleType}
+        sample_type_texts = [text for text in sample_type_texts if text]
+        sample_types = {}
+        for sample_type in SampleType.objects.filter(Q(sample_type_code__in=sample_type_texts) |
+                                                     Q(sample_type_label__in=sample_type_texts)):
+            sample_types.setdefault(sample_type.sample_type_code, sample_type)
+            sample_types.setdefault(sample_type.sample_type_label, sample_type)
+        return sample_types
+
+    def get_sample_pks(self, barcode_ids):
+        # {barcode id: FieldSample pk} of barcodes that already have a field sample
+        return dict(FieldSample.objects.filter(field_sample_barcode__in=[barcode_id for barcode_id in barcode_ids if barcode_id])
+                    .values_list('field_sample_barcode', 'pk'))
+
+    def add_barcode(self, barcode_id, **kwargs):
+        if barcode_id not in self.new_barcodes:
+            self.new_barcodes[barcode_id] = SampleBarcode(sample_barcode_id=barcode_id,
+                                                          barcode_slug=slugify(barcode_id),
+                                                          sample_year=self.now.year,
+                                                          created_by=self.created_by,
+                                                          **kwargs)
+
+    def add_survey(self, **kwargs):
+        field_survey = FieldSurvey(created_by=self.created_by, **kwargs)
+        self.new_surveys.append(field_survey)
+        return field_survey
+
+    def add_measure(self, field_survey, env_measure_type, value):
+        self.new_measures.append(EnvMeasure(survey_global_id=field_survey,
+                                            env_measure_type=env_measure_type,
+                                            env_measure_value=str(value).strip(),
+                                            created_by=self.created_by))
+
+    def add_sample(self, barcode_id, **kwargs):
+        # FieldSample.save() copies the barcode's slug, which bulk_create skips
+        field_sample = FieldSample(field_sample_barcode_id=barcode_id,
+                                   barcode_slug=slugify(barcode_id),
+                                   created_by=self.created_by,
+                                   **kwargs)
+        self.new_samples[barcode_id] = field_sample
+        return field_sample
+
+    @transaction.atomic
+    def save(self):
+        SampleBarcode.objects.bulk_create(self.new_barcodes.values(), batch_size=self.batch_size)
+        FieldSurvey.objects.bulk_create(self.new_surveys, batch_size=self.batch_size)
+        FieldSurvey.project_ids.through.objects.bulk_create(
+            [FieldSurvey.project_ids.through(fieldsurvey_id=survey_pk, project_id=project_pk)
+             for survey_pk, project_pk in self.new_survey_projects],
+            batch_size=self.batch_size, ignore_conflicts=True)
+        EnvMeasure.objects.bulk_create(self.new_measures, batch_size=self.batch_size)
+        FieldSample.objects.bulk_create(self.new_samples.values(), batch_size=self.batch_size)
+        # FieldSample.save() sets the sample type of a field sample's barcode
+        SampleBarcode.objects.filter(pk__in=list(self.new_samples)).update(sample_type=get_field_sample_sample_type())
+        FilterSample.objects.bulk_create(self.new_filter_samples.values(), batch_size=self.batch_size)
+        # bulk_create sends no post_save, so the dashboard stats counted from the new rows are dropped here
+        for model in [SampleBarcode, FieldSurvey, FieldSample, FilterSample]:
+            invalidate_stats(model._meta.label)
+        # and the cached fieldsurvey vector tiles, which would otherwise leave out the new surveys
+        if self.new_surveys:
+            transaction.on_commit(lambda: invalidate_tiles('fieldsurvey'))
+
+
+class FieldSampleImport(SampleImport):
+    # one survey with its measures and one field sample per row; a row whose barcode already has a field
+    # sample is counted as updated and leaves the existing sample as it is
+    # {column: EnvMeasureType.env_measure_type_code}
+    env_measure_columns = {
+        'env_measure_temp': 'temp',
+        'env_measure_salinity': 'salinity',
+        'env_measure_ph': 'ph',
+        'env_measure_turbidity': 'turbidity',
+        'env_measure_do': 'do'
+    }
+    required_columns = ['site_id', 'field_sample_barcode', 'sample_type']
+    column_checks = {
+        'survey_datetime': (is_datetime, "Invalid survey_datetime '{value}'"),
+        'env_measure_mode': (is_choice(MeasureModes), "Invalid {column} '{value}'"),
+        'sampling_method': (is_choice(SamplingMethods), "Invalid {column} '{value}'"),
+        'is_extracted': (is_choice(YesNo), "Invalid {column} '{value}'"),
+    }
+
+    def prepare(self):
+        rows = self.rows
+        sites = FieldSite.objects.in_bulk([row.get('site_id') for row in rows if row.get('site_id')], field_name='site_id')
+        emails = {row.get(column) for row in rows for column in ('username', 'supervisor') if row.get(column)}
+        users = CustomUser.objects.in_bulk(emails, field_name='email')
+        project_codes = {code for row in rows for code in split_codes(row.get('project_codes'))}
+        projects = Project.objects.in_bulk(project_codes, field_name='project_code')
+        env_measure_types = EnvMeasureType.objects.in_bulk(self.env_measure_columns.values(),
+                                                           field_name='env_measure_type_code')
+        barcode_ids = {str(row.get('field_sample_barcode')).strip() for row in rows if row.get('field_sample_barcode')}
+        barcodes = self.get_barcodes(barcode_ids)
+        sample_pks = self.get_sample_pks(barcode_ids)
+        sample_types = self.get_sample_types({row.get('sample_type') for row in rows})
+        survey_datetime_field = FieldSurvey._meta.get_field('survey_datetime')
+
+        for row_num, row in enumerate(rows, start=1):
+            if row_num in self.invalid_rows:
+                continue
+            site_id = row.get('site_id')
+            if not site_id:
+                self.error(row_num, 'Missing site_id', column='site_id')
+                continue
+            field_site = sites.get(site_id)
+            if not field_site:
+                self.error(row_num, "FieldSite '{site}' not found".format(site=site_id), column='site_id')
+                continue
+            if not row.get('field_sample_barcode'):
+                self.error(row_num, 'Missing field_sample_barcode', column='field_sample_barcode')
+                continue
+            barcode_id = str(row.get('field_sample_barcode')).strip()
+            sample_type = sample_types.get(row.get('sample_type'))
+            if not sample_type:
+                self.error(row_num, "SampleType '{sample_type}' not found".format(sample_type=row.get('sample_type')),
+                           column='sample_type')
+                continue
+            survey_datetime = survey_datetime_field.to_python(row.get('survey_datetime') or None) or self.now
+            if barcode_id in sample_pks or barcode_id in self.new_samples:
+                self.updated_count += 1
+                continue
+
+            field_survey = self.add_survey(site_id=field_site,
+                                           username=users.get(row.get('username')) or self.created_by,
+                                           supervisor=users.get(row.get('supervisor')),
+                                           survey_datetime=survey_datetime,
+                                           env_measure_mode=get_choice(MeasureModes, row.get('env_measure_mode')) or '')
+            for project_code in split_codes(row.get('project_codes')):
+                if project_code in projects:
+                    self.new_survey_projects.add((field_survey.pk, projects[project_code].pk))
+                else:
+                    self.error(row_num, "Project '{project}' not found".format(project=project_code),
+                               column='project_codes')
+            for column, code in self.env_measure_columns.items():
+                if row.get(column) and code in env_measure_types:
+                    self.add_measure(field_survey, env_measure_types[code], row.get(column))
+            if barcode_id not in barcodes:
+                self.add_barcode(barcode_id, site_id=field_site, purpose='Import')
+            self.add_sample(barcode_id,
+                            survey_global_id=field_survey,
+                            sample_type=sample_type,
+                            sampling_method=get_choice(SamplingMethods, row.get('sampling_method')) or '',
+                            is_extracted=get_choice(YesNo, row.get('is_extracted')) or YesNo.NO)
+            self.created_count += 1
+
+
+class FilterSampleImport(SampleImport):
+    # rows of the same site and survey date and start time share one survey, which gets the measures of the
+    # first row that creates it; each row adds a field sample with its filter sample
+    required_columns = ['barcode', 'site', 'date']
+    column_checks = {
+        'date': (is_date, "Invalid date '{value}', expected YYYY-MM-DD"),
+        'starttime': (is_time, "Invalid starttime '{value}', expected HH:MM:SS or HH:MM:SS AM"),
+        'filtertype': (is_choice(FilterTypes), "Invalid {column} '{value}'"),
+        'filtered (ml)': (is_decimal, "Invalid {column} '{value}', expected a number"),
+        'filteredvolume': (is_decimal, "Invalid {column} '{value}', expected a number"),
+        'filterpore': (is_decimal, "Invalid {column} '{value}', expected a number"),
+        'filtersize': (is_decimal, "Invalid {column} '{value}', expected a number"),
+        'is_extracted': (is_choice(YesNo), "Invalid {column} '{value}'"),
+    }
+
+    def normalize_row(self, row):
+        # column names are matched case insensitively
+        return {key.lower() if key else key: value for key, value in row.items()}
+
+    def get_env_measure_value(self, env_measure_type, row):
+        # the measure type's column by code or name, with spaces and underscores in the name interchangeable
+        code = env_measure_type.env_measure_type_code.lower()
+        name = env_measure_type.env_measure_type_name.lower()
+        for column in [code, name, name.replace(' ', '_'), name.replace('_', ' '), name.replace('_', '').replace(' ', '')]:
+            if column in row:
+                return row[column]
+        return None
+
+    def prepare(self):
+        rows = self.rows
+        site_texts = {row.get('site') for row in rows if row.get('site')}
+        field_sites = FieldSite.objects.filter(Q(site_id__in=site_texts) | Q(general_location_name__in=site_texts))
+        sites = {}
+        for field_site in field_sites:
+            sites.setdefault(field_site.site_id, field_site)
+            sites.setdefault(field_site.general_location_name, field_site)
+        project_texts = {row.get('project') for row in rows if row.get('project')}
+        projects = {}
+        for project in Project.objects.filter(Q(project_code__in=project_texts) | Q(project_label__in=project_texts)):
+            projects.setdefault(project.project_code, project)
+            projects.setdefault(project.project_label, project)
+        env_measure_types = list(EnvMeasureType.objects.all())
+        barcode_ids = {str(row.get('barcode')).strip() for row in rows if row.get('barcode')}
+        barcodes = self.get_barcodes(barcode_ids)
+        sample_pks = self.get_sample_pks(barcode_ids)
+        filtered_sample_pks = set(FilterSample.objects.filter(field_sample__in=list(sample_pks.values()))
+                                  .values_list('field_sample', flat=True))
+        sample_types = self.get_sample_types({row.get('sampletype') for row in rows})
+        sample_codes = {row.get('sample') or row.get('sample code') for row in rows}
+        taken_sample_codes = set(FieldSample.objects.filter(sample_code__in=[code for code in sample_codes if code])
+                                 .values_list('sample_code', flat=True))
+        survey_datetimes = {row_num: parse_date_time(row.get('date'), row.get('starttime'))
+                            for row_num, row in enumerate(rows, start=1)}
+        surveys = {(field_survey.site_id_id, field_survey.survey_datetime): field_survey
+                   for field_survey in FieldSurvey.objects.filter(
+                       site_id__in=[field_site.pk for field_site in field_sites],
+                       survey_datetime__in=[value for value in survey_datetimes.values() if value])}
+
+        for row_num, row in enumerate(rows, start=1):
+            if row_num in self.invalid_rows:
+                continue
+            if [column for column in self.required_columns if not row.get(column) or not str(row.get(column)).strip()]:
+                # incomplete row
+                self.skipped_count += 1
+                continue
+            site_text = row.get('site')
+            field_site = sites.get(site_text)
+            if not field_site:
+                self.error(row_num, "FieldSite '{site}' not found (tried site_id and general_location_name)".format(site=site_text),
+                           column='site')
+                continue
+            sample_type = sample_types.get(row.get('sampletype'))
+            if not sample_type:
+                self.error(row_num, "SampleType '{sample_type}' not found".format(sample_type=row.get('sampletype')),
+                           column='sampletype')
+                continue
+            barcode_id = str(row.get('barcode')).strip()
+            filter_values = {
+                'filter_vol': parse_decimal(row.get('filtered (ml)') or row.get('filteredvolume')),
+                'filter_pore': parse_decimal(row.get('filterpore')),
+                'filter_size': parse_decimal(row.get('filtersize')),
+                'filter_type': get_choice(FilterTypes, row.get('filtertype')) or '',
+                'filter_saturation': str(row.get('filtersaturation', row.get('saturation'))).strip().lower() == 'true',
+                'filter_notes': row.get('comment') or '',
+            }
+
+            if barcode_id in sample_pks:
+                # the barcode's field sample already exists; add its filter sample if it has none
+                sample_pk = sample_pks[barcode_id]
+                if sample_pk in filtered_sample_pks or sample_pk in self.new_filter_samples:
+                    self.updated_count += 1
+                else:
+                    self.new_filter_samples[sample_pk] = FilterSample(field_sample_id=sample_pk, created_by=self.created_by,
+                                                                      **filter_values)
+                    self.created_count += 1
+                continue
+            if barcode_id in self.new_samples:
+                self.updated_count += 1
+                continue
+            sample_code = row.get('sample') or row.get('sample code') or None
+            if sample_code and sample_code in taken_sample_codes:
+                self.error(row_num, "Sample code '{sample_code}' already exists".format(sample_code=sample_code),
+                           column='sample')
+                continue
+
+            survey_datetime = survey_datetimes[row_num]
+            survey_key = (field_site.pk, survey_datetime)
+            field_survey = surveys.get(survey_key) if survey_datetime else None
+            if field_survey is None:
+                field_survey = self.add_survey(site_id=field_site,
+                                               survey_datetime=survey_datetime or self.now,
+                                               survey_complete=YesNo.YES if row.get('endtime') else YesNo.NO)
+                if survey_datetime:
+                    surveys[survey_key] = field_survey
+                for env_measure_type in env_measure_types:
+                    value = self.get_env_measure_value(env_measure_type, row)
+                    if value and str(value).strip() not in EMPTY_MEASURE_VALUES:
+                        self.add_measure(field_survey, env_measure_type, value)
+            if row.get('project') in projects:
+                self.new_survey_projects.add((field_survey.pk, projects[row.get('project')].pk))
+            elif row.get('project'):
+                self.error(row_num, "Project '{project}' not found".format(project=row.get('project')), column='project')
+            if barcode_id not in barcodes:
+                self.add_barcode(barcode_id, sample_type=sample_type)
+            if sample_code:
+                taken_sample_codes.add(sample_code)
+            field_sample = self.add_sample(barcode_id,
+                                           sample_code=sample_code,
+                                           sample_datetime=survey_datetime or self.now,
+                                           survey_global_id=field_survey,
+                                           sample_type=sample_type,
+                                           is_extracted=get_choice(YesNo, row.get('is_extracted')) or YesNo.NO)
+            self.new_filter_samples[field_sample.pk] = FilterSample(field_sample=field_sample, created_by=self.created_by,
+                                                                    **filter_values)
+            self.created_count += 1
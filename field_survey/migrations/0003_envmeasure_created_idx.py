@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('field_survey', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='envmeasure',
+            index=models.Index(fields=['created_datetime', 'env_global_id'], name='envmeasure_created_idx'),
+        ),
+    ]
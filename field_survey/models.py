@@ -71,9 +71,9 @@ class FieldSurvey(DateTimeUserMixin):
     def mixs_project_name(self):
         # mixs_v5
         # Name of the project within which the sequencing was organized
-        prjs = self.project_ids.all()
-        prjs_list = prjs.values_list('project_label', flat=True)
-        return 'Maine-eDNA {project}'.format(project=list(prjs_list))
+        # read from project_ids.all() so a prefetch_related('project_ids') is used
+        prjs_list = [prj.project_label for prj in self.project_ids.all()]
+        return 'Maine-eDNA {project}'.format(project=prjs_list)
 
 
     @property
@@ -202,6 +202,8 @@ class EnvMeasure(DateTimeUserMixin):
         verbose_name_plural = 'Env Measurements'
         unique_together = [['survey_global_id', 'env_measure_datetime',
                             'env_measure_type', 'env_measure_value']]
+        # keyset pagination of the api, see utility.pagination.KeysetPagination
+        indexes = [models.Index(fields=['created_datetime', 'env_global_id'], name='envmeasure_created_idx')]
 
 
 class FieldSample(DateTimeUserMixin):
@@ -0,0 +1,61 @@
+# dashboard chart data, cached by utility.stats until a row it is counted from changes
+# https://simpleisbetterthancomplex.com/tutorial/2020/01/19/how-to-use-chart-js-with-django.html
+# https://stackoverflow.com/questions/31933239/using-annotate-or-extra-to-add-field-of-foreignkey-to-queryset-equivalent-of/31933276#31933276
+from django.db.models import F, Count, Q
+from utility.charts import return_queryset_lists, return_month_series_lists
+from utility.stats import register_stat
+from .models import FieldSurvey, FieldSample, FilterSample, SubCoreSample
+
+
+@register_stat('survey_count', ['field_survey.FieldSurvey'])
+def get_survey_count_stat():
+    labels, (data, ) = return_month_series_lists((FieldSurvey.objects.all(), 'created_datetime'))
+    return {'labels': labels, 'data': data, }
+
+
+@register_stat('survey_system_count', ['field_survey.FieldSurvey', 'field_site.FieldSite', 'field_site.System'])
+def get_survey_system_count_stat():
+    labels, data = return_queryset_lists(FieldSurvey.objects.exclude(Q(site_id__system__system_label__exact='') | Q(site_id__system__system_label__isnull=True)).annotate(label=F('site_id__system__system_label')).values('label').annotate(data=Count('pk')).order_by('-label'))
+    return {'labels': labels, 'data': data, }
+
+
+@register_stat('survey_site_count', ['field_survey.FieldSurvey', 'field_site.FieldSite'])
+def get_survey_site_count_stat():
+    labels, data = return_queryset_lists(FieldSurvey.objects.exclude(Q(site_id__site_id__exact='') | Q(site_id__site_id__isnull=True)).annotate(label=F('site_id__site_id')).values('label').annotate(data=Count('pk')).order_by('-label'))
+    return {'labels': labels, 'data': data, }
+
+
+# saving an Extraction flips FieldSample.is_extracted with update(), which sends no signal
+@register_stat('field_sample_count', ['field_survey.FieldSample', 'field_survey.FilterSample', 'field_survey.SubCoreSample',
+                                      'wet_lab.Extraction'])
+def get_field_sample_count_stat():
+    fieldsample_labels, fieldsample_data = return_queryset_lists(FieldSample.objects.annotate(label=F('is_extracted')).values('label').annotate(data=Count('pk')).order_by('-label'))
+    labels, data_array = return_month_series_lists((FilterSample.objects.all(), 'filter_datetime'),
+                                                   (SubCoreSample.objects.all(), 'subcore_datetime_start'))
+    return {
+        'fieldsample_labels': fieldsample_labels,
+        'fieldsample_data': fieldsample_data,
+        'count_labels': labels,
+        'filter_data': data_array[0],
+        'subcore_data': data_array[1],
+    }
+
+
+@register_stat('filter_type_count', ['field_survey.FilterSample'])
+def get_filter_type_count_stat():
+    labels, data = return_queryset_lists(FilterSample.objects.exclude(Q(filter_type__exact='') | Q(filter_type__isnull=True)).annotate(label=F('filter_type')).values('label').annotate(data=Count('pk')).order_by('-label'))
+    return {'labels': labels, 'data': data, }
+
+
+@register_stat('filter_system_count', ['field_survey.FilterSample', 'field_survey.FieldSample', 'sample_label.SampleBarcode',
+                                       'field_site.FieldSite', 'field_site.System'])
+def get_filter_system_count_stat():
+    labels, data = return_queryset_lists(FilterSample.objects.exclude(Q(field_sample__field_sample_barcode__site_id__system__system_label__exact='') | Q(field_sample__field_sample_barcode__site_id__system__system_label__isnull=True)).annotate(label=F('field_sample__field_sample_barcode__site_id__system__system_label')).values('label').annotate(data=Count('pk')).order_by('-label'))
+    return {'labels': labels, 'data': data, }
+
+
+@register_stat('filter_site_count', ['field_survey.FilterSample', 'field_survey.FieldSample', 'sample_label.SampleBarcode',
+                                     'field_site.FieldSite'])
+def get_filter_site_count_stat():
+    labels, data = return_queryset_lists(FilterSample.objects.exclude(Q(field_sample__field_sample_barcode__site_id__site_id__exact='') | Q(field_sample__field_sample_barcode__site_id__site_id__isnull=True)).annotate(label=F('field_sample__field_sample_barcode__site_id__site_id')).values('label').annotate(data=Count('pk')).order_by('-label'))
+    return {'labels': labels, 'data': data, }
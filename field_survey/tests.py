@@ -1,11 +1,14 @@
 from django.test import TestCase
 from .models import FieldSample, FieldSurvey
+from .imports import FieldSampleImport
 from sample_label.models import SampleMaterial, SampleBarcode
-from sample_label.tests import SampleBarcodeTestCase
+from sample_label.tests import SampleBarcodeTestCase, SampleTypeTestCase
 from field_site.tests import FieldSiteTestCase
 from field_site.models import FieldSite
+from field_site.tiles import get_tile_version
 from utility.enumerations import YesNo, CollectionTypes, TurbidTypes, PrecipTypes, WindSpeeds, CloudCovers
 from utility.models import get_default_user, Project
+from users.models import CustomUser
 from utility.tests import ProjectTestCase
 from django.utils import timezone
 
@@ -68,3 +71,53 @@ class FieldSampleTestCase(TestCase):
         # test if date is added correctly
         test_exists = FieldSample.objects.filter(sample_global_id='test_sample_global_id')[:1].get()
         self.assertIs(test_exists.was_added_recently(), True)
+
+
+class FieldSampleImportTestCase(TestCase):
+    def setUp(self):
+        field_site_test = FieldSiteTestCase()
+        sample_type_test = SampleTypeTestCase()
+        field_site_test.setUp()
+        sample_type_test.setUp()
+        self.user = CustomUser.objects.get(pk=get_default_user())
+        self.site_id = FieldSite.objects.filter()[:1].get().site_id
+
+    def test_import(self):
+        # rows with errors write nothing; a barcode repeated in the file is counted as updated
+        rows = [{'site_id': self.site_id, 'field_sample_barcode': 'eTST_L01_24w_0001', 'sample_type': 'Filter'},
+                {'site_id': 'missing', 'field_sample_barcode': 'eTST_L01_24w_0002', 'sample_type': 'Filter'},
+                {'site_id': self.site_id, 'field_sample_barcode': 'eTST_L01_24w_0003', 'sample_type': 'missing'},
+                {'site_id': self.site_id, 'field_sample_barcode': 'eTST_L01_24w_0001', 'sample_type': 'ft'}]
+        sample_import = FieldSampleImport(rows, self.user).run()
+        self.assertEqual(sample_import.created_count, 1)
+        self.assertEqual(sample_import.updated_count, 1)
+        self.assertEqual(sample_import.errors, ["Row 2: FieldSite 'missing' not found",
+                                                "Row 3: SampleType 'missing' not found"])
+        field_sample = FieldSample.objects.get(field_sample_barcode='eTST_L01_24w_0001')
+        self.assertEqual(field_sample.barcode_slug, 'etst_l01_24w_0001')
+        self.assertEqual(FieldSurvey.objects.filter(site_id__site_id=self.site_id).count(), 1)
+        self.assertFalse(SampleBarcode.objects.filter(pk='eTST_L01_24w_0003').exists())
+
+    def test_validate(self):
+        # a dry run writes nothing and sums up the errors of each column
+        rows = [{'site_id': self.site_id, 'field_sample_barcode': 'eTST_L01_24w_0001', 'sample_type': 'Filter',
+                 'is_extracted': 'maybe'},
+                {'site_id': 'missing', 'field_sample_barcode': 'eTST_L01_24w_0002', 'sample_type': 'Filter',
+                 'is_extracted': 'maybe'},
+                {'site_id': self.site_id, 'field_sample_barcode': 'eTST_L01_24w_0003', 'sample_type': 'Filter',
+                 'is_extracted': 'No'}]
+        sample_import = FieldSampleImport(rows, self.user).validate()
+        self.assertEqual(sample_import.created_count, 1)
+        self.assertEqual(sample_import.column_errors['is_extracted']['error_count'], 2)
+        self.assertEqual(sample_import.column_errors['is_extracted']['rows'], [1, 2])
+        self.assertFalse(FieldSample.objects.exists())
+        missing_import = FieldSampleImport([{'site_id': self.site_id}], self.user).validate()
+        self.assertEqual(missing_import.missing_columns, ['field_sample_barcode', 'sample_type'])
+
+    def test_invalidate_tiles(self):
+        # bulk_create sends no post_save, so the import drops the cached fieldsurvey tiles itself
+        version = get_tile_version('fieldsurvey')
+        rows = [{'site_id': self.site_id, 'field_sample_barcode': 'eTST_L01_24w_0001', 'sample_type': 'Filter'}]
+        with self.captureOnCommitCallbacks(execute=True):
+            FieldSampleImport(rows, self.user).run()
+        self.assertNotEqual(get_tile_version('fieldsurvey'), version)
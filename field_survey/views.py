@@ -1,10 +1,9 @@
 import csv
 
 from django.db import transaction
-from django.db.models import F, Count, Func, Value, CharField, Q
-from django.db.models.functions import TruncMonth
-from django.core.serializers import serialize
+from django.db.models import OuterRef
 from django.core.exceptions import PermissionDenied
+from django.contrib.postgres.expressions import ArraySubquery
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib import messages
@@ -15,15 +14,17 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.views import View
 from django.views.generic.edit import CreateView, UpdateView
-import json
 from django_filters import rest_framework as filters
 from django_tables2.views import SingleTableMixin
 from django_filters.views import FilterView
 from rest_framework import generics
 from rest_framework import viewsets
-from utility.charts import return_queryset_lists, return_zeros_lists, return_merged_zeros_lists
-from utility.views import export_context, CreatePopupMixin, UpdatePopupMixin
+from utility.stats import get_stat
+from utility.views import export_context, CreatePopupMixin, UpdatePopupMixin, Select2AutocompleteView, ImportJobMixin
 from utility.serializers import CharSerializerExportMixin
+from utility.pagination import KeysetPagination
+from utility.geojson import geojson_response
+from utility.models import Project
 from utility.enumerations import CollectionTypes
 from sample_label.models import SampleMaterial
 import field_survey.filters as fieldsurvey_filters
@@ -31,6 +32,7 @@ import field_survey.serializers as fieldsurvey_serializers
 from .models import FieldSurvey, FieldCrew, EnvMeasureType, EnvMeasure, \
     FieldSample, FilterSample, SubCoreSample
 from .resources import FieldSurveyAdminResource, FieldSampleAdminResource
+from .imports import FieldSampleImport, FilterSampleImport
 from .tables import FieldSurveyTable, FieldCrewTable, EnvMeasureTable, EnvMeasureTypeTable, \
     FieldSampleTable, FilterSampleTable, SubCoreSampleTable
 from .forms import FieldSurveyForm, FieldCrewForm, EnvMeasureForm, \
@@ -44,6 +46,24 @@ from import_export.forms import ImportForm
 ########################################
 # FRONTEND REQUESTS                    #
 ########################################
+class FieldSurveyAutocompleteView(Select2AutocompleteView):
+    model = FieldSurvey
+    text_field = 'survey_global_id'
+
+
+class FieldSampleAutocompleteView(Select2AutocompleteView):
+    model = FieldSample
+    text_field = 'barcode_slug'
+    search_fields = ['barcode_slug', 'field_sample_barcode__sample_barcode_id']
+
+
+def get_field_survey_geojson_properties():
+    return {'survey_global_id': 'survey_global_id',
+            'created_datetime': 'created_datetime',
+            'site_id': 'site_id',
+            'project_ids': ArraySubquery(Project.objects.filter(project_ids=OuterRef('pk')).order_by('pk').values('pk'))}
+
+
 @permission_required('field_survey.view_fieldsurvey', 
                      login_url='dashboard_login')
 @login_required(login_url='dashboard_login')
@@ -53,31 +73,10 @@ def get_field_survey_geom(request):
     # https://leafletjs.com/examples/geojson/
     # https://stackoverflow.com/questions/52025577/how-to-remove-certain-fields-when-doing-serialization-to-a-django-model
     # project = get_object_or_404(Project, pk=pk)
-    # We can't use serialize('geojson', ...) directly on FieldSurvey since geom is not a model field.
-    # Instead, serialize FieldSite and join FieldSurvey data in properties.
-    qs = FieldSurvey.objects.select_related('site_id').prefetch_related('project_ids')
-    features = []
-    for survey in qs:
-        geom = survey.site_id.geom if survey.site_id and survey.site_id.geom else None
-        geometry = geom.geojson if geom else None  # geometry as string
-        projects = list(survey.project_ids.values_list('pk', flat=True))
-        properties = {
-            "survey_global_id": str(survey.survey_global_id),
-            "created_datetime": survey.created_datetime.isoformat() if survey.created_datetime else None,
-            "site_id": survey.site_id.pk if survey.site_id else None,
-            "project_ids": projects,
-        }
-        feature = {
-            "type": "Feature",
-            "geometry": json.loads(geometry) if geometry else None,
-            "properties": properties
-        }
-        features.append(feature)
-    geojson = {
-        "type": "FeatureCollection",
-        "features": features
-    }
-    return JsonResponse(geojson)
+    # FieldSurvey.geom is the geom of its FieldSite, so the FeatureCollection is built in postgis from
+    # the joined site geom with the survey in properties
+    return geojson_response(request, FieldSurvey.objects.all(), get_field_survey_geojson_properties(),
+                            geometry_field='site_id__geom')
 
 
 def get_project_survey_geom(request, pk):
@@ -86,83 +85,44 @@ def get_project_survey_geom(request, pk):
     # https://leafletjs.com/examples/geojson/
     # https://stackoverflow.com/questions/52025577/how-to-remove-certain-fields-when-doing-serialization-to-a-django-model
     # project = get_object_or_404(Project, pk=pk)
-    qs = FieldSurvey.objects.only('survey_global_id', 'geom', 'site_id', 'project_ids').prefetch_related('project_ids', 'site_id').filter(project_ids=pk)
-    qs_json = serialize('geojson', qs, fields=('survey_global_id', 'geom', 'created_datetime', 'site_id', 'project_ids'))
-    return JsonResponse(json.loads(qs_json))
+    return geojson_response(request, FieldSurvey.objects.filter(project_ids=pk), get_field_survey_geojson_properties(),
+                            geometry_field='site_id__geom')
 
 
 @login_required(login_url='dashboard_login')
 def get_survey_count_chart(request):
-    # https://simpleisbetterthancomplex.com/tutorial/2020/01/19/how-to-use-chart-js-with-django.html
-    # https://stackoverflow.com/questions/38570258/how-to-get-django-queryset-results-with-formatted-datetime-field
-    # https://stackoverflow.com/questions/52354104/django-query-set-for-counting-records-each-month
-    # labels, data = return_queryset_lists(FieldSurvey.objects.annotate(survey_date=TruncMonth('created_datetime')).values('survey_date').order_by('survey_date').annotate(data=Count('pk')).annotate(label=Func(F('created_datetime'), Value('MM/YYYY'), function='to_char', output_field=CharField())))
-    labels, data = return_queryset_lists(FieldSurvey.objects.annotate(survey_date=TruncMonth('created_datetime')).values('survey_date').annotate(data=Count('pk')).order_by('survey_date').annotate(label=Func(F('survey_date'), Value('MM/YYYY'), function='to_char', output_field=CharField())))
-    labels, data = return_zeros_lists(labels, data)
-    return JsonResponse(data={'labels': labels, 'data': data, })
+    # chart data is read from the cache, see field_survey.stats
+    return JsonResponse(data=get_stat('survey_count'))
 
 
 @login_required(login_url='dashboard_login')
 def get_survey_system_count_chart(request):
-    # https://simpleisbetterthancomplex.com/tutorial/2020/01/19/how-to-use-chart-js-with-django.html
-    # https://stackoverflow.com/questions/31933239/using-annotate-or-extra-to-add-field-of-foreignkey-to-queryset-equivalent-of/31933276#31933276
-    labels, data = return_queryset_lists(FieldSurvey.objects.exclude(Q(site_id__system__system_label__exact='') | Q(site_id__system__system_label__isnull=True)).annotate(label=F('site_id__system__system_label')).values('label').annotate(data=Count('pk')).order_by('-label'))
-    # labels = ['Other' if x == '' else x for x in labels]
-    return JsonResponse(data={'labels': labels, 'data': data, })
+    return JsonResponse(data=get_stat('survey_system_count'))
 
 
 @login_required(login_url='dashboard_login')
 def get_survey_site_count_chart(request):
-    # https://simpleisbetterthancomplex.com/tutorial/2020/01/19/how-to-use-chart-js-with-django.html
-    labels, data = return_queryset_lists(FieldSurvey.objects.exclude(Q(site_id__site_id__exact='') | Q(site_id__site_id__isnull=True)).annotate(label=F('site_id__site_id')).values('label').annotate(data=Count('pk')).order_by('-label'))
-    # labels = ['eLP_O01' if x == '' else x for x in labels]
-    return JsonResponse(data={'labels': labels, 'data': data, })
+    return JsonResponse(data=get_stat('survey_site_count'))
 
 
 @login_required(login_url='dashboard_login')
 def get_field_sample_count_chart(request):
-    # https://simpleisbetterthancomplex.com/tutorial/2020/01/19/how-to-use-chart-js-with-django.html
-    # https://stackoverflow.com/questions/38570258/how-to-get-django-queryset-results-with-formatted-datetime-field
-    # https://stackoverflow.com/questions/52354104/django-query-set-for-counting-records-each-month
-    filter_labels, filter_data = return_queryset_lists(FilterSample.objects.annotate(filter_date=TruncMonth('filter_datetime')).values('filter_date').annotate(data=Count('pk')).annotate(label=Func(F('filter_datetime'), Value('MM/YYYY'), function='to_char', output_field=CharField())))
-    subcore_labels, subcore_data = return_queryset_lists(SubCoreSample.objects.annotate(subcore_date=TruncMonth('subcore_datetime_start')).values('subcore_date').annotate(data=Count('pk')).annotate(label=Func(F('subcore_datetime_start'), Value('MM/YYYY'), function='to_char', output_field=CharField())))
-    fieldsample_labels, fieldsample_data = return_queryset_lists(FieldSample.objects.annotate(label=F('is_extracted')).values('label').annotate(data=Count('pk')).order_by('-label'))
-    labels, data_array, = return_merged_zeros_lists([filter_labels, subcore_labels], [filter_data, subcore_data])
-    print(data_array)
-    return JsonResponse(data={
-        'fieldsample_labels': fieldsample_labels,
-        'fieldsample_data': fieldsample_data,
-        'count_labels': labels,
-        'filter_data': data_array[0],
-        'subcore_data': data_array[1],
-    })
+    return JsonResponse(data=get_stat('field_sample_count'))
 
 
 @login_required(login_url='dashboard_login')
 def get_filter_type_count_chart(request):
-    # https://simpleisbetterthancomplex.com/tutorial/2020/01/19/how-to-use-chart-js-with-django.html
-    # https://stackoverflow.com/questions/31933239/using-annotate-or-extra-to-add-field-of-foreignkey-to-queryset-equivalent-of/31933276#31933276
-    labels, data = return_queryset_lists(FilterSample.objects.exclude(Q(filter_type__exact='') | Q(filter_type__isnull=True)).annotate(label=F('filter_type')).values('label').annotate(data=Count('pk')).order_by('-label'))
-    # labels = ['other' if x == '' else x for x in labels]
-    return JsonResponse(data={'labels': labels, 'data': data, })
+    return JsonResponse(data=get_stat('filter_type_count'))
 
 
 @login_required(login_url='dashboard_login')
 def get_filter_system_count_chart(request):
-    # https://simpleisbetterthancomplex.com/tutorial/2020/01/19/how-to-use-chart-js-with-django.html
-    # https://stackoverflow.com/questions/31933239/using-annotate-or-extra-to-add-field-of-foreignkey-to-queryset-equivalent-of/31933276#31933276
-    labels, data = return_queryset_lists(FilterSample.objects.exclude(Q(field_sample__field_sample_barcode__site_id__system__system_label__exact='') | Q(field_sample__field_sample_barcode__site_id__system__system_label__isnull=True)).annotate(label=F('field_sample__field_sample_barcode__site_id__system__system_label')).values('label').annotate(data=Count('pk')).order_by('-label'))
-    # labels = ['Other' if x == '' else x for x in labels]
-    return JsonResponse(data={'labels': labels, 'data': data, })
+    return JsonResponse(data=get_stat('filter_system_count'))
 
 
 @login_required(login_url='dashboard_login')
 def get_filter_site_count_chart(request):
-    # https://simpleisbetterthancomplex.com/tutorial/2020/01/19/how-to-use-chart-js-with-django.html
-    # https://stackoverflow.com/questions/31933239/using-annotate-or-extra-to-add-field-of-foreignkey-to-queryset-equivalent-of/31933276#31933276
-    labels, data = return_queryset_lists(FilterSample.objects.exclude(Q(field_sample__field_sample_barcode__site_id__site_id__exact='') | Q(field_sample__field_sample_barcode__site_id__site_id__isnull=True)).annotate(label=F('field_sample__field_sample_barcode__site_id__site_id')).values('label').annotate(data=Count('pk')).order_by('-label'))
-    # labels = ['Other' if x == '' else x for x in labels]
-    return JsonResponse(data={'labels': labels, 'data': data, })
+    return JsonResponse(data=get_stat('filter_site_count'))
 
 
 ########################################
@@ -717,6 +677,7 @@ class FieldSampleUpdateView(LoginRequiredMixin,
 
 class FieldSampleImportView(LoginRequiredMixin, 
                             PermissionRequiredMixin, 
+                            ImportJobMixin,
                             View):
     """
     View for importing FieldSample data from CSV/Excel files with automatic creation
@@ -725,6 +686,7 @@ class FieldSampleImportView(LoginRequiredMixin,
     permission_required = 'field_survey.add_fieldsample'
     template_name = 'home/django-material-dashboard/model-import-fieldsurvey.html'
     formats = [CSV, XLS, XLSX]
+    import_class = FieldSampleImport
     
     def get(self, request):
         """Display the import form"""
@@ -734,6 +696,7 @@ class FieldSampleImportView(LoginRequiredMixin,
             'segment': 'import_fieldsample',
             'page_title': 'Import Field Sample',
             'form': form,
+            'dry_run_option': True,
         }
         print(f"Rendering template: {self.template_name}")
         print(f"Context: {context}")
@@ -749,174 +712,15 @@ class FieldSampleImportView(LoginRequiredMixin,
                 'segment': 'import_fieldsample',
                 'page_title': 'Import Field Sample',
                 'form': form,
+                'dry_run_option': True,
             }
             return render(request, self.template_name, context)
         
-        # Get the uploaded file and format
+        # the file is imported by celery in chunks; the job page shows its progress and row errors.
+        # 'Validate Only' queues a dry run, which reports the file's errors without writing anything
         import_file = form.cleaned_data['import_file']
-        input_format_index = int(form.cleaned_data['input_format'] or 0)
-        input_format = self.formats[input_format_index]()
-        
-        try:
-            # Read and parse the file using the selected format
-            data = import_file.read()
-            if isinstance(input_format, CSV):
-                data = data.decode('utf-8')
-            
-            dataset = input_format.create_dataset(data)
-            
-            # Process each row and create related objects
-            from field_site.models import FieldSite
-            from sample_label.models import SampleBarcode, SampleType
-            from utility.models import Project
-            from users.models import CustomUser
-            
-            created_count = 0
-            updated_count = 0
-            error_messages = []
-            
-            for row_num, row in enumerate(dataset.dict, start=1):
-                try:
-                    with transaction.atomic():
-                        # 1. Get or create FieldSite
-                        site_id_str = row.get('site_id')
-                        if site_id_str:
-                            field_site = FieldSite.objects.filter(site_id=site_id_str).first()
-                            if not field_site:
-                                error_messages.append(f"Row {row_num}: FieldSite '{site_id_str}' not found")
-                                continue
-                        else:
-                            error_messages.append(f"Row {row_num}: Missing site_id")
-                            continue
-                        
-                        # 2. Get users
-                        username_email = row.get('username')
-                        supervisor_email = row.get('supervisor')
-                        survey_datetime = row.get('survey_datetime')
-                        
-                        username = CustomUser.objects.filter(email=username_email).first() if username_email else request.user
-                        supervisor = CustomUser.objects.filter(email=supervisor_email).first() if supervisor_email else None
-                        
-                        # 3. Create FieldSurvey
-                        field_survey = FieldSurvey.objects.create(
-                            site_id=field_site,
-                            username=username or request.user,
-                            supervisor=supervisor,
-                            survey_datetime=survey_datetime or timezone.now(),
-                            created_by=request.user
-                        )
-                        
-                        # 4. Add projects to survey
-                        project_codes = row.get('project_codes', '')
-                        if project_codes:
-                            for proj_code in project_codes.split(';'):
-                                proj_code = proj_code.strip()
-                                if proj_code:
-                                    project = Project.objects.filter(project_code=proj_code).first()
-                                    if project:
-                                        field_survey.project_ids.add(project)
-                                    else:
-                                        error_messages.append(f"Row {row_num}: Project '{proj_code}' not found")
-                        
-                        # 5. Create EnvMeasure records
-                        env_measures = {
-                            'env_measure_temp': 'temp',
-                            'env_measure_salinity': 'salinity', 
-                            'env_measure_ph': 'ph',
-                            'env_measure_turbidity': 'turbidity',
-                            'env_measure_do': 'do'
-                        }
-                        
-                        for col_name, measure_code in env_measures.items():
-                            value = row.get(col_name)
-                            if value:
-                                env_type = EnvMeasureType.objects.filter(env_measure_type_code=measure_code).first()
-                                if env_type:
-                                    EnvMeasure.objects.create(
-                                        survey_global_id=field_survey,
-                                        env_measure_type=env_type,
-                                        env_measure_value=str(value),
-                                        created_by=request.user
-                                    )
-                        
-                        # 6. Get or create SampleBarcode
-                        barcode_id = row.get('field_sample_barcode')
-                        if barcode_id:
-                            sample_barcode, _ = SampleBarcode.objects.get_or_create(
-                                sample_barcode_id=barcode_id,
-                                defaults={
-                                    'site_id': field_site,
-                                    'sample_year': timezone.now().year,
-                                    'purpose': 'Import',
-                                    'created_by': request.user
-                                }
-                            )
-                        else:
-                            error_messages.append(f"Row {row_num}: Missing field_sample_barcode")
-                            continue
-                        
-                        # 7. Get SampleType
-                        sample_type_text = row.get('sample_type')
-                        sample_type = SampleType.objects.filter(sample_type_label=sample_type_text).first()
-                        if not sample_type and sample_type_text:
-                            sample_type = SampleType.objects.filter(sample_type_code=sample_type_text).first()
-                        if not sample_type:
-                            error_messages.append(f"Row {row_num}: SampleType '{sample_type_text}' not found")
-                            continue
-                        
-                        # 8. Create FieldSample
-                        field_sample, created = FieldSample.objects.get_or_create(
-                            field_sample_barcode=sample_barcode,
-                            defaults={
-                                'survey_global_id': field_survey,
-                                'sample_type': sample_type,
-                                'sampling_method': row.get('sampling_method', ''),
-                                'is_extracted': row.get('is_extracted', 'no'),
-                                'created_by': request.user
-                            }
-                        )
-                        
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                            
-                except Exception as e:
-                    import traceback
-                    error_messages.append(f"Row {row_num}: {str(e)}")
-                    error_messages.append(f"  Traceback: {traceback.format_exc()}")
-            
-            # Show results
-            if error_messages:
-                messages.warning(request, f'Import completed with {len(error_messages)} errors')
-                for msg in error_messages[:5]:
-                    messages.error(request, msg)
-                if len(error_messages) > 5:
-                    messages.warning(request, f'... and {len(error_messages) - 5} more errors')
-            
-            if created_count > 0 or updated_count > 0:
-                success_msg = f'Successfully imported {created_count} new records'
-                if updated_count > 0:
-                    success_msg += f', updated {updated_count} records'
-                messages.success(request, success_msg)
-                return redirect('view_fieldsample')
-            else:
-                messages.error(request, 'No records were imported')
-                context = {
-                    'segment': 'import_fieldsample',
-                    'page_title': 'Import Field Sample',
-                    'form': form,
-                }
-                return render(request, self.template_name, context)
-            
-        except Exception as e:
-            messages.error(request, f'Import failed: {str(e)}')
-            context = {
-                'segment': 'import_fieldsample',
-                'page_title': 'Import Field Sample',
-                'form': form,
-            }
-            return render(request, self.template_name, context)
+        input_format = self.formats[int(form.cleaned_data['input_format'] or 0)]()
+        return self.queue_import_job(import_file, input_format, dry_run='dry_run' in request.POST)
     
     def handle_no_permission(self):
         if self.raise_exception:
@@ -962,6 +766,7 @@ class FilterSampleFilterView(LoginRequiredMixin,
 
 class FilterSampleImportView(LoginRequiredMixin, 
                              PermissionRequiredMixin, 
+                             ImportJobMixin,
                              View):
     """
     View for importing FilterSample data from CSV/Excel files with automatic creation
@@ -970,6 +775,7 @@ class FilterSampleImportView(LoginRequiredMixin,
     permission_required = 'field_survey.add_filtersample'
     template_name = 'home/django-material-dashboard/model-import-fieldsurvey.html'
     formats = [CSV, XLS, XLSX]
+    import_class = FilterSampleImport
     
     def get(self, request):
         """Display the import form"""
@@ -978,6 +784,7 @@ class FilterSampleImportView(LoginRequiredMixin,
             'segment': 'import_filtersample',
             'page_title': 'Import Filter Sample',
             'form': form,
+            'dry_run_option': True,
         }
         return render(request, self.template_name, context)
     
@@ -991,281 +798,15 @@ class FilterSampleImportView(LoginRequiredMixin,
                 'segment': 'import_filtersample',
                 'page_title': 'Import Filter Sample',
                 'form': form,
+                'dry_run_option': True,
             }
             return render(request, self.template_name, context)
         
-        # Get the uploaded file and format
+        # the file is imported by celery in chunks; the job page shows its progress and row errors.
+        # 'Validate Only' queues a dry run, which reports the file's errors without writing anything
         import_file = form.cleaned_data['import_file']
-        input_format_index = int(form.cleaned_data['input_format'] or 0)
-        input_format = self.formats[input_format_index]()
-        
-        try:
-            # Read and parse the file
-            data = import_file.read()
-            if isinstance(input_format, CSV):
-                data = data.decode('utf-8')
-            
-            dataset = input_format.create_dataset(data)
-            
-            # Process each row
-            from field_site.models import FieldSite
-            from sample_label.models import SampleBarcode, SampleType
-            from utility.models import Project
-            from users.models import CustomUser
-            
-            created_count = 0
-            updated_count = 0
-            error_messages = []
-            skipped_count = 0
-            
-            for row_num, row in enumerate(dataset.dict, start=1):
-                try:
-                    with transaction.atomic():
-                        # Normalize all column names to lowercase for case-insensitive access
-                        row = {k.lower() if k else k: v for k, v in row.items()}
-                        
-                        # Skip rows that don't have minimum required data
-                        # Required: barcode, site, date
-                        required_fields = ['barcode', 'site', 'date']
-                        missing_required = [f for f in required_fields 
-                                          if not row.get(f) or not str(row.get(f)).strip()]
-                        
-                        if missing_required:
-                            # This is an incomplete row, skip it
-                            print(f"Skipping row {row_num}: Missing required fields {missing_required}")
-                            skipped_count += 1
-                            continue
-                        
-                        # Helper function to parse date
-                        from datetime import datetime as dt
-                        
-                        def parse_datetime(date_str, time_str):
-                            """Parse date and time strings into datetime object"""
-                            if not date_str or not time_str:
-                                return None
-                            try:
-                                # Date format: 2025-08-21
-                                date_obj = dt.strptime(str(date_str).strip(), '%Y-%m-%d').date()
-                                # Time format: 01:10:00 PM or 13:10:00
-                                time_str = str(time_str).strip()
-                                try:
-                                    time_obj = dt.strptime(time_str, '%I:%M:%S %p').time()
-                                except ValueError:
-                                    time_obj = dt.strptime(time_str, '%H:%M:%S').time()
-                                # Combine date and time
-                                combined_dt = dt.combine(date_obj, time_obj)
-                                return timezone.make_aware(combined_dt)
-                            except (ValueError, AttributeError) as e:
-                                return None
-                        
-                        # Get site - try multiple site id and site name
-                        site_txt_str = row.get('site')
-                        if site_txt_str and str(site_txt_str).strip():
-                            # Try to find by site_id OR general_location_name using Q objects
-                            field_site = FieldSite.objects.filter(
-                                Q(site_id=site_txt_str) | Q(general_location_name=site_txt_str)
-                            ).first()
-                            if not field_site:
-                                error_messages.append(
-                                    f"Row {row_num}: FieldSite '{site_txt_str}' not found \
-                                        (tried site_id and general_location_name)")
-                                continue
-                        else:
-                            # Better error message: show which fields have data
-                            non_empty = {k: v for k, v in row.items() if v and str(v).strip()}
-                            error_messages.append(
-                                f"Row {row_num}: Missing or empty 'site' column. \
-                                    Non-empty fields: {list(non_empty.keys())}")
-                            continue
-                        
-                        # Parse survey datetime from Date and StartTime columns
-                        # Note: Time format in CSV seems to be split into time and AM/PM
-                        date_str = row.get('date')
-                        start_time_str = row.get('starttime')
-                        end_time_str = row.get('endtime')
-                        
-                        # Survey datetime from Date and StartTime columns
-                        survey_datetime = parse_datetime(date_str, start_time_str) or timezone.now()
-                        
-                        # Sample datetime from Date column
-                        sample_datetime = parse_datetime(date_str, start_time_str) or timezone.now()
-                        
-                        # Create or get FieldSurvey - use get_or_create to avoid duplicates
-                        # Multiple samples from the same site/date should share the same survey
-                        field_survey, survey_created = FieldSurvey.objects.get_or_create(
-                                        site_id=field_site,
-                                        survey_datetime=survey_datetime,
-                                        defaults={
-                                            'survey_complete': True if end_time_str else False,
-                                            'created_by': request.user
-                                        }
-                                    )
-                        
-                        # Add projects
-                        project_txt = row.get('project', '')
-                        if project_txt:
-                            project = Project.objects \
-                                .filter(Q(project_code=project_txt) | 
-                                        Q(project_label=project_txt)) \
-                                .first()
-                            if project:
-                                field_survey.project_ids.add(project)
-                        
-                                                # Get SampleType (default to water sample)
-                        
-                        sample_type_text = row.get('sampletype')
-                        sample_type = SampleType.objects \
-                            .filter(Q(sample_type_code=sample_type_text) |
-                                    Q(sample_type_label=sample_type_text)) \
-                            .first()
-                        if not sample_type:
-                            error_messages.append(f"Row {row_num}: SampleType '{sample_type_text}' not found")
-                            continue
-                                                        
-                        # Get or create SampleBarcode from 'barcode' column or 'field_sample_barcode'
-                        barcode_id = row.get('barcode')
-                        if barcode_id:
-                            sample_barcode, _ = SampleBarcode.objects.get_or_create(
-                                sample_barcode_id=str(barcode_id).strip(),
-                                defaults={
-                                    'sample_type': sample_type,
-                                    'sample_year': timezone.now().year,
-                                    'created_by': request.user
-                                }
-                            )
-                        else:
-                            error_messages.append(f"Row {row_num}: Missing Barcode")
-                            continue
-                        
-                        # Get sample code from 'sample' column or 'sample_code'
-                        sample_code = row.get('sample') or row.get('sample code')
-
-                        # Create FieldSample
-                        field_sample, created = FieldSample.objects.get_or_create(
-                            field_sample_barcode=sample_barcode,
-                            defaults={
-                                'sample_code': sample_code,
-                                'sample_datetime': sample_datetime,
-                                'survey_global_id': field_survey,
-                                'sample_type': sample_type,
-                                'is_extracted': row.get('is_extracted', 'no'),
-                                'created_by': request.user
-                            }
-                        )
-                        
-                        # Create FilterSample
-                        filter_sample, created = FilterSample.objects.get_or_create(
-                            field_sample=field_sample,
-                            defaults={
-                                'filter_vol': row.get('filtered (ml)') or row.get('filteredvolume'),
-                                'filter_type': row.get('filtertype') or row.get('filtertype', ''),
-                                'filter_pore': row.get('filterpore'),
-                                'filter_size': row.get('filtersize'),
-                                'filter_saturation': str(row.get('filtersaturation',
-                                                                 row.get('saturation')))
-                                                    .strip().lower() == 'true',
-                                'filter_notes': row.get('comment'),
-                                'created_by': request.user
-                            }
-                        )
-                        
-                        # Create Environmental Measurements ONLY if this is a new survey
-                        # or if this row has different environmental data than what's stored
-                        if survey_created:
-                            # This is a new survey, create all environmental measurements
-                            from field_survey.models import EnvMeasure
-                            
-                            # Retrieve all existing EnvMeasureTypes from database
-                            all_env_types = EnvMeasureType.objects.all()
-                            
-                            # Match CSV columns to EnvMeasureType codes/names
-                            env_mappings = []
-                            for env_type in all_env_types:
-                                # Try to match column name with env_measure_type_code first, then env_measure_type_name
-                                # Also try with underscores replaced by spaces and vice versa for flexibility
-                                code_lower = env_type.env_measure_type_code.lower()
-                                name_lower = env_type.env_measure_type_name.lower()
-                                
-                                # Try multiple variations to match CSV columns - use 'in' check instead of or chain
-                                column_value = None
-                                if code_lower in row:
-                                    column_value = row[code_lower]
-                                elif name_lower in row:
-                                    column_value = row[name_lower]
-                                elif name_lower.replace(' ', '_') in row:
-                                    column_value = row[name_lower.replace(' ', '_')]
-                                elif name_lower.replace('_', ' ') in row:
-                                    column_value = row[name_lower.replace('_', ' ')]
-                                elif name_lower.replace('_', '').replace(' ', '') in row:
-                                    column_value = row[name_lower.replace('_', '').replace(' ', '')]
-                                
-                                if (column_value and 
-                                    str(column_value).strip() 
-                                    not in ['', 'NA', 'na', 'N/A', 'None']):
-                                    env_mappings.append((env_type, column_value))
-                            
-                            # Create environmental measurements for matched columns
-                            for env_type, measure_value in env_mappings:
-                                # Create EnvMeasure (only for new surveys)
-                                env_measure = EnvMeasure.objects.create(
-                                    survey_global_id=field_survey,
-                                    env_measure_type=env_type,
-                                    env_measure_value=str(measure_value).strip(),
-                                    created_by=request.user
-                                )
-                        else:
-                            print(f"Debug: Survey already exists, skipping EnvMeasure creation for row {row_num}")
-
-
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                            
-                except Exception as e:
-                    import traceback
-                    error_messages.append(f"Row {row_num}: {str(e)}")
-                    error_messages.append(f"  Traceback: {traceback.format_exc()}")
-            
-            # Show results
-            if error_messages:
-                messages.warning(request, f'Import completed with {len(error_messages)} errors')
-                for msg in error_messages[:5]:
-                    messages.error(request, msg)
-                if len(error_messages) > 5:
-                    messages.warning(request, f'... and {len(error_messages) - 5} more errors')
-            
-            if skipped_count > 0:
-                messages.info(request, f'Skipped {skipped_count} incomplete rows')
-            
-            if created_count > 0 or updated_count > 0:
-                success_msg = f'Successfully imported {created_count} new records'
-                if updated_count > 0:
-                    success_msg += f', updated {updated_count} records'
-                if skipped_count > 0:
-                    success_msg += f' (skipped {skipped_count} incomplete rows)'
-                messages.success(request, success_msg)
-                return redirect('view_filtersample')
-            else:
-                if skipped_count > 0:
-                    messages.warning(request, f'No records were imported (skipped {skipped_count} incomplete rows)')
-                else:
-                    messages.error(request, 'No records were imported')
-                context = {
-                    'segment': 'import_filtersample',
-                    'page_title': 'Import Filter Sample',
-                    'form': form,
-                }
-                return render(request, self.template_name, context)
-            
-        except Exception as e:
-            messages.error(request, f'Import failed: {str(e)}')
-            context = {
-                'segment': 'import_filtersample',
-                'page_title': 'Import Filter Sample',
-                'form': form,
-            }
-            return render(request, self.template_name, context)
+        input_format = self.formats[int(form.cleaned_data['input_format'] or 0)]()
+        return self.queue_import_job(import_file, input_format, dry_run='dry_run' in request.POST)
     
     def handle_no_permission(self):
         if self.raise_exception:
@@ -1486,6 +1027,7 @@ class EnvMeasureTypeViewSet(viewsets.ModelViewSet):
 class EnvMeasureViewSet(viewsets.ModelViewSet):
     serializer_class = fieldsurvey_serializers.EnvMeasureSerializer
     queryset = EnvMeasure.objects.prefetch_related('created_by', 'survey_global_id', 'env_measure_type', )
+    pagination_class = KeysetPagination
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = fieldsurvey_filters.EnvMeasureSerializerFilter
     swagger_tags = ['field survey']
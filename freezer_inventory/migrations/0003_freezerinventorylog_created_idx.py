@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('freezer_inventory', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='freezerinventorylog',
+            index=models.Index(fields=['created_datetime', 'id'], name='freezerinvlog_created_idx'),
+        ),
+    ]
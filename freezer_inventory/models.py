@@ -276,6 +276,8 @@ class FreezerInventoryLog(DateTimeUserMixin):
         app_label = 'freezer_inventory'
         verbose_name = 'Inventory Log'
         verbose_name_plural = 'Inventory Logs'
+        # keyset pagination of the api, see utility.pagination.KeysetPagination
+        indexes = [models.Index(fields=['created_datetime', 'id'], name='freezerinvlog_created_idx')]
 
 
 class FreezerInventoryReturnMetadata(DateTimeUserMixin):
@@ -4,19 +4,19 @@ from freezer_inventory.tasks import update_freezer, update_freezer_rack, update_
 from freezer_inventory.models import Freezer, FreezerRack, FreezerInventoryLog
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.db import transaction
+from utility.dispatch import queue_cascade
 
 
 @receiver(post_save, sender=Freezer, dispatch_uid='update_freezer')
 def update_freezer_post_save(sender, instance, **kwargs):
-    transaction.on_commit(update_freezer.s(instance.pk).delay)
+    queue_cascade(update_freezer, instance.pk)
 
 
 @receiver(post_save, sender=FreezerRack, dispatch_uid='update_freezer_rack')
 def update_freezer_rack_post_save(sender, instance, **kwargs):
-    transaction.on_commit(update_freezer_rack.s(instance.pk).delay)
+    queue_cascade(update_freezer_rack, instance.pk)
 
 
 @receiver(post_save, sender=FreezerInventoryLog, dispatch_uid='update_record_return_metadata')
 def update_record_return_metadata_post_save(sender, instance, **kwargs):
-    transaction.on_commit(update_record_return_metadata.s(instance.pk).delay)
+    queue_cascade(update_record_return_metadata, instance.pk)
@@ -2,7 +2,7 @@
 from celery import shared_task
 from .models import Freezer, FreezerBox, FreezerRack, FreezerInventoryLog, FreezerInventoryReturnMetadata
 from utility.enumerations import YesNo, CheckoutActions
-from django.core.exceptions import ObjectDoesNotExist
+from utility.dispatch import suppress_cascade_dispatch
 from celery.utils.log import get_task_logger
 logger = get_task_logger(__name__)
 
@@ -12,58 +12,62 @@ def update_queryset(queryset):
         item.save()
 
 
+def get_instance_pks(instance_pks):
+    # signals queue a list of pks per transaction; tasks queued before that change carry a single pk
+    if isinstance(instance_pks, int):
+        return [instance_pks]
+    return instance_pks
+
+
+def warn_missing(model, instance_pks, found_pks):
+    missing_pks = sorted(set(instance_pks) - set(found_pks))
+    if missing_pks:
+        # Abort for these rows
+        logger.warning('Saved %s objects were deleted before this task get a chance to be executed [ids = %s]' % (model.__name__, missing_pks))
+
+
 @shared_task
-def update_freezer(instance_pk):
-    try:
-        instance = Freezer.objects.get(pk=instance_pk)
-    except ObjectDoesNotExist:
-        # Abort
-        logger.warning('Saved object was deleted before this task get a chance to be executed [id = %d]' % instance_pk)
-    else:
-        # cascade update all proceeding model slug labels
-        rack_queryset = FreezerRack.objects.filter(freezer=instance.pk)
-        # create list of distinct pks from the queryset
-        distinct_pks = rack_queryset.values_list('pk', flat=True).distinct()
-        if rack_queryset:
+def update_freezer(instance_pks):
+    instance_pks = get_instance_pks(instance_pks)
+    freezer_pks = list(Freezer.objects.filter(pk__in=instance_pks).values_list('pk', flat=True))
+    warn_missing(Freezer, instance_pks, freezer_pks)
+    # cascade update all proceeding model slug labels
+    rack_queryset = FreezerRack.objects.filter(freezer__in=freezer_pks).select_related('freezer')
+    # create list of distinct pks from the queryset
+    distinct_pks = list(rack_queryset.values_list('pk', flat=True).distinct())
+    if distinct_pks:
+        # the boxes are updated here, so the racks' own update_freezer_rack tasks are not queued
+        with suppress_cascade_dispatch(dispatch=False):
             # loop through each rack and call the save() method
             update_queryset(rack_queryset)
-            for pk in distinct_pks:
-                # for each rack pk, create a queryset of freezerbox
-                box_queryset = FreezerBox.objects.filter(freezer_rack=pk)
-                # loop through each box and call the save() method
-                update_queryset(box_queryset)
+        # boxes are saved after their racks so they pick up the new rack slugs
+        box_queryset = FreezerBox.objects.filter(freezer_rack__in=distinct_pks).select_related('freezer_rack')
+        # loop through each box and call the save() method
+        update_queryset(box_queryset)
 
 
 @shared_task
-def update_freezer_rack(instance_pk):
-    try:
-        instance = FreezerRack.objects.get(pk=instance_pk)
-    except ObjectDoesNotExist:
-        # Abort
-        logger.warning('Saved object was deleted before this task get a chance to be executed [id = %d]' % instance_pk)
-    else:
-        # cascade update all proceeding model slug labels
-        box_queryset = FreezerBox.objects.filter(freezer_rack=instance.pk)
-        # create list of distinct pks from the queryset
-        if box_queryset:
-            # loop through each box and call the save() method
-            update_queryset(box_queryset)
+def update_freezer_rack(instance_pks):
+    instance_pks = get_instance_pks(instance_pks)
+    rack_pks = list(FreezerRack.objects.filter(pk__in=instance_pks).values_list('pk', flat=True))
+    warn_missing(FreezerRack, instance_pks, rack_pks)
+    # cascade update all proceeding model slug labels
+    box_queryset = FreezerBox.objects.filter(freezer_rack__in=rack_pks).select_related('freezer_rack')
+    # loop through each box and call the save() method
+    update_queryset(box_queryset)
 
 
 @shared_task
-def update_record_return_metadata(instance_pk):
-    try:
-        instance = FreezerInventoryLog.objects.get(pk=instance_pk)
-    except ObjectDoesNotExist:
-        # Abort
-        logger.warning('Saved object was deleted before this task get a chance to be executed [id = %d]' % instance_pk)
-    else:
-        if instance.freezer_log_action == CheckoutActions.RETURN:
-            return_metadata, created = FreezerInventoryReturnMetadata.objects.update_or_create(
-                freezer_log=instance,
-                defaults={
-                    'freezer_return_metadata_entered': YesNo.NO,
-                    'created_by': instance.created_by,
-                }
-            )
-            logger.info('Object created [response = %d]' % created)
+def update_record_return_metadata(instance_pks):
+    instance_pks = get_instance_pks(instance_pks)
+    log_queryset = FreezerInventoryLog.objects.filter(pk__in=instance_pks)
+    warn_missing(FreezerInventoryLog, instance_pks, log_queryset.values_list('pk', flat=True))
+    for instance in log_queryset.filter(freezer_log_action=CheckoutActions.RETURN).select_related('created_by'):
+        return_metadata, created = FreezerInventoryReturnMetadata.objects.update_or_create(
+            freezer_log=instance,
+            defaults={
+                'freezer_return_metadata_entered': YesNo.NO,
+                'created_by': instance.created_by,
+            }
+        )
+        logger.info('Object created [response = %d]' % created)
@@ -12,7 +12,8 @@ from django_tables2.views import SingleTableMixin
 from django_filters.views import FilterView
 from utility.enumerations import YesNo
 from utility.serializers import SerializerExportMixin
-from utility.views import export_context
+from utility.pagination import KeysetPagination
+from utility.views import export_context, Select2AutocompleteView
 import freezer_inventory.serializers as freezerinventory_serializers
 import freezer_inventory.filters as freezerinventory_filters
 from .models import ReturnAction, Freezer, FreezerRack, FreezerBox, FreezerInventory, \
@@ -27,6 +28,16 @@ from django.conf import settings
 ########################################
 # FRONTEND REQUESTS                    #
 ########################################
+class FreezerInventoryAutocompleteView(Select2AutocompleteView):
+    model = FreezerInventory
+    text_field = 'freezer_inventory_slug'
+
+
+class FreezerInventoryLogAutocompleteView(Select2AutocompleteView):
+    model = FreezerInventoryLog
+    text_field = 'freezer_log_slug'
+
+
 @login_required(login_url='dashboard_login')
 def freezer_inventory_return_metadata_table(request):
     return_metadata_table = UserFreezerInventoryReturnMetadataTable(FreezerInventoryReturnMetadata.objects.filter(created_by=request.user))
@@ -287,6 +298,7 @@ class FreezerInventoryViewSet(viewsets.ModelViewSet):
 class FreezerInventoryLogViewSet(viewsets.ModelViewSet):
     serializer_class = freezerinventory_serializers.FreezerInventoryLogSerializer
     queryset = FreezerInventoryLog.objects.prefetch_related('created_by', 'freezer_inventory')
+    pagination_class = KeysetPagination
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = freezerinventory_filters.FreezerInventoryLogSerializerFilter
     swagger_tags = ['freezer inventory']
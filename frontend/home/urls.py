@@ -237,10 +237,13 @@ urlpatterns = [
     path('dashboard/chart/filter/site_count/', fieldsurvey_views.get_filter_site_count_chart, name='chart_filtersitecount'),
     path('dashboard/chart/extraction/count/', wetlab_views.get_extraction_count_chart, name='chart_extractioncount'),
     path('dashboard/chart/runresult/count/', wetlab_views.get_run_result_count_chart, name='chart_runresultcount'),
+    path('dashboard/chart/taxon/rollup/', bioinfo_views.get_taxon_rollup_chart_data, name='chart_taxonrollup'),
     # AJAX GEOM
     path('main/geom/project_survey/<int:pk>/', fieldsurvey_views.get_project_survey_geom, name='geom_projectsurvey'),
     path('dashboard/geom/fieldsurvey/', fieldsurvey_views.get_field_survey_geom, name='geom_fieldsurvey'),
     path('dashboard/intersect/point/watershed/<float:lat>/<float:long>/<int:srid>/', fieldsite_views.get_point_intersect_watershed_geom, name='intersect_watershed'),
+    # VECTOR TILES
+    path('tiles/<slug:layer>/<int:z>/<int:x>/<int:y>.pbf', fieldsite_views.get_vector_tile, name='vector_tile'),
     # AJAX DEPENDENT OPTIONS
     path('dashboard/options/biome/second/', fieldsite_views.get_biome_second_options, name='options_biome_second'),
     path('dashboard/options/biome/third/', fieldsite_views.get_biome_third_options, name='options_biome_third'),
@@ -253,6 +256,10 @@ urlpatterns = [
     path('dashboard/options/feature/sixth/', fieldsite_views.get_feature_sixth_options, name='options_feature_sixth'),
     path('dashboard/options/feature/seventh/', fieldsite_views.get_feature_seventh_options, name='options_feature_seventh'),
     path('dashboard/options/project/', utility_views.get_project_options, name='options_project'),
+    path('dashboard/export/<uuid:pk>/', utility_views.export_job_status, name='detail_exportjob'),
+    path('dashboard/export/<uuid:pk>/download/', utility_views.export_job_download, name='download_exportjob'),
+    path('dashboard/import/<uuid:pk>/', utility_views.import_job_detail, name='detail_importjob'),
+    path('dashboard/import/<uuid:pk>/status/', utility_views.import_job_status, name='status_importjob'),
     path('dashboard/options/taxon/kingdom/', bioinfo_views.get_taxon_kingdom_options, name='options_taxon_kingdom'),
     path('dashboard/options/taxon/supergroup/', bioinfo_views.get_taxon_supergroup_options, name='options_taxon_supergroup'),
     path('dashboard/options/taxon/division/', bioinfo_views.get_taxon_phylum_division_options, name='options_taxon_division'),
@@ -261,6 +268,43 @@ urlpatterns = [
     path('dashboard/options/taxon/family/', bioinfo_views.get_taxon_family_options, name='options_taxon_family'),
     path('dashboard/options/taxon/genus/', bioinfo_views.get_taxon_genus_options, name='options_taxon_genus'),
     path('dashboard/options/taxon/species/', bioinfo_views.get_taxon_species_options, name='options_taxon_species'),
+    # AJAX AUTOCOMPLETE
+    path('dashboard/autocomplete/user/', user_views.CustomUserAutocompleteView.as_view(), name='autocomplete_user'),
+    path('dashboard/autocomplete/fieldsite/', fieldsite_views.FieldSiteAutocompleteView.as_view(), name='autocomplete_fieldsite'),
+    path('dashboard/autocomplete/fieldsurvey/', fieldsurvey_views.FieldSurveyAutocompleteView.as_view(), name='autocomplete_fieldsurvey'),
+    path('dashboard/autocomplete/fieldsample/', fieldsurvey_views.FieldSampleAutocompleteView.as_view(), name='autocomplete_fieldsample'),
+    path('dashboard/autocomplete/samplebarcode/', samplelabel_views.SampleBarcodeAutocompleteView.as_view(), name='autocomplete_samplebarcode'),
+    path('dashboard/autocomplete/extraction/', wetlab_views.ExtractionAutocompleteView.as_view(), name='autocomplete_extraction'),
+    path('dashboard/autocomplete/extraction/fieldsample/', wetlab_views.UnassignedFieldSampleAutocompleteView.as_view(), name='autocomplete_unassigned_fieldsample'),
+    path('dashboard/autocomplete/extraction/barcode/', wetlab_views.UnassignedSampleBarcodeAutocompleteView.as_view(), name='autocomplete_unassigned_samplebarcode'),
+    path('dashboard/autocomplete/pcrreplicate/', wetlab_views.UserPcrReplicateAutocompleteView.as_view(), name='autocomplete_user_pcrreplicate'),
+    path('dashboard/autocomplete/indexpair/', wetlab_views.UserIndexPairAutocompleteView.as_view(), name='autocomplete_user_indexpair'),
+    path('dashboard/autocomplete/freezerinventory/', freezerinventory_views.FreezerInventoryAutocompleteView.as_view(), name='autocomplete_freezerinventory'),
+    path('dashboard/autocomplete/freezerinventorylog/', freezerinventory_views.FreezerInventoryLogAutocompleteView.as_view(), name='autocomplete_freezerinventorylog'),
+    path('dashboard/autocomplete/qualitymetadata/', bioinfo_views.QualityMetadataAutocompleteView.as_view(), name='autocomplete_qualitymetadata'),
+    path('dashboard/autocomplete/denoiseclustermetadata/', bioinfo_views.DenoiseClusterMetadataAutocompleteView.as_view(), name='autocomplete_denoiseclustermetadata'),
+    path('dashboard/autocomplete/featureoutput/', bioinfo_views.FeatureOutputAutocompleteView.as_view(), name='autocomplete_featureoutput'),
+    path('dashboard/autocomplete/annotationmetadata/', bioinfo_views.AnnotationMetadataAutocompleteView.as_view(), name='autocomplete_annotationmetadata'),
+    path('dashboard/autocomplete/taxon/domain/', bioinfo_views.TaxonAutocompleteView.as_view(rank='domain'), name='autocomplete_taxon_domain'),
+    path('dashboard/autocomplete/taxon/kingdom/', bioinfo_views.TaxonAutocompleteView.as_view(rank='kingdom'), name='autocomplete_taxon_kingdom'),
+    path('dashboard/autocomplete/taxon/supergroup/', bioinfo_views.TaxonAutocompleteView.as_view(rank='supergroup'), name='autocomplete_taxon_supergroup'),
+    path('dashboard/autocomplete/taxon/phylum_division/', bioinfo_views.TaxonAutocompleteView.as_view(rank='phylum_division'), name='autocomplete_taxon_phylum_division'),
+    path('dashboard/autocomplete/taxon/class/', bioinfo_views.TaxonAutocompleteView.as_view(rank='class'), name='autocomplete_taxon_class'),
+    path('dashboard/autocomplete/taxon/order/', bioinfo_views.TaxonAutocompleteView.as_view(rank='order'), name='autocomplete_taxon_order'),
+    path('dashboard/autocomplete/taxon/family/', bioinfo_views.TaxonAutocompleteView.as_view(rank='family'), name='autocomplete_taxon_family'),
+    path('dashboard/autocomplete/taxon/genus/', bioinfo_views.TaxonAutocompleteView.as_view(rank='genus'), name='autocomplete_taxon_genus'),
+    path('dashboard/autocomplete/taxon/species/', bioinfo_views.TaxonAutocompleteView.as_view(rank='species'), name='autocomplete_taxon_species'),
+    path('dashboard/autocomplete/annotation/taxon/', bioinfo_views.AnnotationTaxonAutocompleteView.as_view(rank='taxon'), name='autocomplete_annotation_taxon'),
+    path('dashboard/autocomplete/annotation/common_name/', bioinfo_views.AnnotationTaxonAutocompleteView.as_view(rank='common_name'), name='autocomplete_annotation_common_name'),
+    path('dashboard/autocomplete/annotation/domain/', bioinfo_views.AnnotationTaxonAutocompleteView.as_view(rank='domain'), name='autocomplete_annotation_domain'),
+    path('dashboard/autocomplete/annotation/kingdom/', bioinfo_views.AnnotationTaxonAutocompleteView.as_view(rank='kingdom'), name='autocomplete_annotation_kingdom'),
+    path('dashboard/autocomplete/annotation/supergroup/', bioinfo_views.AnnotationTaxonAutocompleteView.as_view(rank='supergroup'), name='autocomplete_annotation_supergroup'),
+    path('dashboard/autocomplete/annotation/phylum_division/', bioinfo_views.AnnotationTaxonAutocompleteView.as_view(rank='phylum_division'), name='autocomplete_annotation_phylum_division'),
+    path('dashboard/autocomplete/annotation/class/', bioinfo_views.AnnotationTaxonAutocompleteView.as_view(rank='class'), name='autocomplete_annotation_class'),
+    path('dashboard/autocomplete/annotation/order/', bioinfo_views.AnnotationTaxonAutocompleteView.as_view(rank='order'), name='autocomplete_annotation_order'),
+    path('dashboard/autocomplete/annotation/family/', bioinfo_views.AnnotationTaxonAutocompleteView.as_view(rank='family'), name='autocomplete_annotation_family'),
+    path('dashboard/autocomplete/annotation/genus/', bioinfo_views.AnnotationTaxonAutocompleteView.as_view(rank='genus'), name='autocomplete_annotation_genus'),
+    path('dashboard/autocomplete/annotation/species/', bioinfo_views.AnnotationTaxonAutocompleteView.as_view(rank='species'), name='autocomplete_annotation_species'),
     # Matches any html file - https://stackoverflow.com/questions/59907011/matching-either-pattern-with-re-path-in-django-3-0
     re_path(r'^[main]+/.*\.*', views.main_pages, name='main_pages'),
     re_path(r'^[dashboard]+/.*\.*', views.dashboard_pages, name='dashboard_pages'),
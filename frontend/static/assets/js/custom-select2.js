@@ -2,4 +2,16 @@
 $(document).ready(function() {
     $('.js-example-basic-single').select2();
     $('.js-example-basic-multiple').select2();
-});
\ No newline at end of file
+    // options are paged from the data-ajax--url autocomplete view while typing
+    $('.js-select2-autocomplete').select2({
+        allowClear: true,
+        placeholder: '---------',
+        ajax: {
+            dataType: 'json',
+            delay: 250,
+            data: function(params) {
+                return {term: params.term || '', page: params.page || 1};
+            }
+        }
+    });
+});
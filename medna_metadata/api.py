@@ -139,6 +139,7 @@ router.register(r'bioinformatics/denoisecluster_method', bioinfo_views.DenoiseCl
 router.register(r'bioinformatics/denoisecluster_metadata', bioinfo_views.DenoiseClusterMetadataViewSet, 'denoisecluster_metadata')
 router.register(r'bioinformatics/feature', bioinfo_views.FeatureOutputViewSet, 'feature')
 router.register(r'bioinformatics/feature_read', bioinfo_views.FeatureReadViewSet, 'feature_read')
+router.register(r'bioinformatics/feature_table', bioinfo_views.FeatureTableImportViewSet, 'feature_table')
 router.register(r'bioinformatics/refdb', bioinfo_views.ReferenceDatabaseViewSet, 'refdb')
 router.register(r'bioinformatics/domain', bioinfo_views.TaxonDomainViewSet, 'domain')
 router.register(r'bioinformatics/kingdom', bioinfo_views.TaxonKingdomViewSet, 'kingdom')
@@ -151,6 +152,9 @@ router.register(r'bioinformatics/species', bioinfo_views.TaxonSpeciesViewSet, 's
 router.register(r'bioinformatics/annotation_method', bioinfo_views.AnnotationMethodViewSet, 'annotation_method')
 router.register(r'bioinformatics/annotation_metadata', bioinfo_views.AnnotationMetadataViewSet, 'annotation_metadata')
 router.register(r'bioinformatics/taxon_annotation', bioinfo_views.TaxonomicAnnotationViewSet, 'taxon_annotation')
+router.register(r'bioinformatics/taxonomy_table', bioinfo_views.TaxonomyImportViewSet, 'taxonomy_table')
+router.register(r'bioinformatics/taxon_abundance', bioinfo_views.TaxonAbundanceViewSet, 'taxon_abundance')
+router.register(r'bioinformatics/taxon_rollup', bioinfo_views.TaxonRollupViewSet, 'taxon_rollup')
 # mixs
 router.register(r'mixs/water', wetlab_views.MixsWaterReadOnlyViewSet, 'mixs_water')
 router.register(r'mixs/sediment', wetlab_views.MixsSedimentReadOnlyViewSet, 'mixs_sediment')
@@ -37,6 +37,11 @@ app.conf.beat_schedule = {
         'task': 'db-backup',
         'schedule': crontab(hour=4, minute=30),  # Everyday at 04:30
     },
+    # recomputes the cached dashboard chart data, including counts of rows written without signals, e.g., bulk_create
+    'refresh-dashboard-stats': {
+        'task': 'refresh-dashboard-stats',
+        'schedule': crontab(minute=0),  # Every hour
+    },
 }
 
 app.conf.timezone = settings.TIME_ZONE
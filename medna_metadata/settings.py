@@ -227,14 +227,34 @@ MIDDLEWARE = [
 # The cache system requires a small amount of setup.
 # Namely, you have to tell it where your cached data should live – whether in a database, on the filesystem or directly in memory.
 # Django can store its cached data in your database. This works best if you’ve got a fast, well-indexed database server.
-# Default in global_settings.py is django.core.cache.backends.locmem.LocMemCache
-# to create the cache table, `python manage.py createcachetable` must be ran.
-# CACHES = {
-#     'default': {
-#         'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
-#         'LOCATION': 'django_cache',
-#     }
-# }
+# The default is the database cache, which the web and celery processes share, so cache entries dropped or refreshed by
+# one, e.g., dashboard stats after a sample import job, are seen by all; its tables are created by
+# `python manage.py createcachetable` (docker/web/start.sh). django.core.cache.backends.redis.RedisCache with a
+# redis:// url as CACHE_LOCATION (requires the redis package) is shared as well.
+# django.core.cache.backends.locmem.LocMemCache, the default in global_settings.py, is kept per process, so it only suits
+# a single process, e.g., runserver without celery.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache')
+CACHE_LOCATION = os.environ.get('CACHE_LOCATION', 'django_cache')
+# the database, file and local-memory caches cull a third of their entries (CULL_FREQUENCY) whenever a set finds
+# MAX_ENTRIES; redis evicts by its own maxmemory policy and rejects the option
+CACHE_CULLS = CACHE_BACKEND in ['django.core.cache.backends.db.DatabaseCache',
+                                'django.core.cache.backends.filebased.FileBasedCache',
+                                'django.core.cache.backends.locmem.LocMemCache', ]
+CACHES = {
+    # dashboard stats, taxon rollups, tile versions and celery task coalescing keys
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 10000))} if CACHE_CULLS else {},
+    },
+    # vector tiles and select2 option pages, which a map pan or a search adds many of at once; kept in their own table
+    # so culling them never evicts the entries of the default cache
+    'views': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('VIEWS_CACHE_LOCATION', CACHE_LOCATION + '_views' if CACHE_CULLS else CACHE_LOCATION),
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('VIEWS_CACHE_MAX_ENTRIES', 50000))} if CACHE_CULLS else {},
+    },
+}
 
 ########################################
 # AUTHENTICATION                       #
@@ -616,6 +636,17 @@ PHONENUMBER_DEFAULT_REGION = 'US'
 # safer as a failure during import won’t import only part of the data set.
 IMPORT_EXPORT_USE_TRANSACTIONS = True
 
+########################################
+# SLUG CASCADE CONFIG                  #
+########################################
+# denormalized taxon_*_slug columns are rewritten in pk windows of this many rows per rank, each window
+# committing on its own so that renaming a domain or kingdom never locks the whole species table at once
+TAXON_CASCADE_BATCH_SIZE = int(os.environ.get('TAXON_CASCADE_BATCH_SIZE', 5000))
+# post_save cascades (ENVO, taxon and freezer slugs) are collected per transaction and sent as one task per model.
+# with a window (seconds), a root saved again within the window is not queued twice and each task waits out the
+# window before running; 0 sends the task as soon as the transaction commits
+CASCADE_DISPATCH_WINDOW = int(os.environ.get('CASCADE_DISPATCH_WINDOW', 0))
+
 ########################################
 # DJANGO-TABLES2 CONFIG                #
 ########################################
@@ -662,12 +693,67 @@ LEAFLET_CONFIG = dict({
 # (v 1.512) (http://purl.bioontology.org/ontology/GAZ)
 MIXS_COUNTRY = 'USA'
 MIN_SAMPLE_YEAR = 1988
+# sample barcodes of a label request are upserted in chunks of this many rows
+SAMPLE_BARCODE_BATCH_SIZE = int(os.environ.get('SAMPLE_BARCODE_BATCH_SIZE', 1000))
 
 ########################################
 # CUSTOM EXPORT FORMATS                #
 ########################################
 # EXPORT_FORMATS = ['csv', 'xlsx']
 EXPORT_FORMATS = ['csv', 'xml', 'json']
+# csv, json and xml exports are read and serialized this many rows at a time
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+# exports of more rows than this are written by a celery export job to private media storage instead of inside
+# the request; 0 only uses export jobs when requested with ?_export_async=1
+EXPORT_ASYNC_THRESHOLD = int(os.environ.get('EXPORT_ASYNC_THRESHOLD', 50000))
+# ENA XML exports are split into sample.xml, sample_2.xml, ... of at most this many samples each
+ENA_SAMPLES_PER_FILE = int(os.environ.get('ENA_SAMPLES_PER_FILE', 5000))
+
+########################################
+# AUTOCOMPLETE CONFIG                  #
+########################################
+# options per page of the select2 autocomplete filters (utility.views.Select2AutocompleteView)
+SELECT2_PAGE_SIZE = int(os.environ.get('SELECT2_PAGE_SIZE', 25))
+# seconds a page of wet lab form options is cached per user; choices a form no longer accepts, e.g., a field sample
+# extracted in the meantime, are still rejected when the form is validated
+SELECT2_CACHE_TIMEOUT = int(os.environ.get('SELECT2_CACHE_TIMEOUT', 60))
+
+########################################
+# FEATURE TABLE IMPORT CONFIG          #
+########################################
+# features and reads of a feature table (load_feature_table command and api) are bulk created this many rows at a time
+FEATURE_TABLE_BATCH_SIZE = int(os.environ.get('FEATURE_TABLE_BATCH_SIZE', 5000))
+
+########################################
+# SAMPLE IMPORT CONFIG                 #
+########################################
+# surveys, measures, barcodes and samples of a field or filter sample import (field_survey.imports) are bulk created
+# this many rows at a time
+SAMPLE_IMPORT_BATCH_SIZE = int(os.environ.get('SAMPLE_IMPORT_BATCH_SIZE', 1000))
+# rows of an import job (utility.views.ImportJobMixin) that are imported and committed together; the job's progress
+# is saved after each chunk
+IMPORT_JOB_CHUNK_SIZE = int(os.environ.get('IMPORT_JOB_CHUNK_SIZE', 2000))
+
+########################################
+# TAXON ROLLUP CONFIG                  #
+########################################
+# seconds a rank rollup of a denoise/cluster run stays cached; rollups also miss whenever the run's taxon abundance is
+# rebuilt after its reads or annotations change, since the latest refresh is part of their cache key
+TAXON_ROLLUP_CACHE_TIMEOUT = int(os.environ.get('TAXON_ROLLUP_CACHE_TIMEOUT', 86400))
+
+########################################
+# DASHBOARD STATS CONFIG               #
+########################################
+# seconds the data of a dashboard chart (utility.stats) stays cached; a chart's data is also dropped whenever a row it
+# is counted from is saved or deleted, and recomputed hourly by the refresh-dashboard-stats celery beat task
+STATS_CACHE_TIMEOUT = int(os.environ.get('STATS_CACHE_TIMEOUT', 86400))
+
+########################################
+# VECTOR TILE CONFIG                   #
+########################################
+# seconds a vector tile (field_site.tiles) stays cached; a layer's tiles are also dropped whenever a row it is drawn
+# from is saved or deleted
+TILE_CACHE_TIMEOUT = int(os.environ.get('TILE_CACHE_TIMEOUT', 604800))
 
 ########################################
 # CUSTOM ADMIN APP ORDERING CONFIG     #
@@ -2,7 +2,7 @@ from django import forms
 from django_filters import rest_framework as filters
 from .models import SampleLabelRequest, SampleType, SampleMaterial, year_choices, SampleBarcode
 from field_site.models import FieldSite
-from utility.widgets import CustomSelect2Multiple, CustomSelect2
+from utility.widgets import CustomSelect2Multiple, CustomSelect2, Select2Autocomplete
 
 
 # Create your filters here.
@@ -14,7 +14,7 @@ class SampleLabelRequestFilter(filters.FilterSet):
     sample_year = filters.MultipleChoiceFilter(choices=year_choices, widget=CustomSelect2Multiple)
     sample_material = filters.ModelChoiceFilter(queryset=SampleMaterial.objects.all(), widget=CustomSelect2)
     sample_type = filters.ModelChoiceFilter(queryset=SampleType.objects.all(), widget=CustomSelect2)
-    site_id = filters.ModelChoiceFilter(queryset=FieldSite.objects.all(), widget=CustomSelect2)
+    site_id = filters.ModelChoiceFilter(queryset=FieldSite.objects.all(), widget=Select2Autocomplete(url='autocomplete_fieldsite'))
 
     class Meta:
         model = SampleLabelRequest
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_sample_label_sequences(apps, schema_editor):
+    # start each prefix's counter at the largest label number already handed out
+    SampleLabelRequest = apps.get_model('sample_label', 'SampleLabelRequest')
+    SampleLabelSequence = apps.get_model('sample_label', 'SampleLabelSequence')
+    largest = SampleLabelRequest.objects.values('sample_label_prefix').annotate(
+        last_sample_label_num=Max('max_sample_label_num')).order_by()
+    SampleLabelSequence.objects.bulk_create([SampleLabelSequence(**row) for row in largest])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sample_label', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SampleLabelSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sample_label_prefix', models.CharField(max_length=12, unique=True, verbose_name='Sample Label Prefix')),
+                ('last_sample_label_num', models.IntegerField(default=0, verbose_name='Last Sample Label Number')),
+            ],
+            options={
+                'verbose_name': 'Sample Label Sequence',
+                'verbose_name_plural': 'Sample Label Sequences',
+            },
+        ),
+        migrations.RunPython(seed_sample_label_sequences, migrations.RunPython.noop),
+    ]
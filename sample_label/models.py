@@ -6,6 +6,7 @@ from django.contrib.gis.db import models
 from utility.models import DateTimeUserMixin, slug_date_format
 from django.core.validators import MinValueValidator
 from django.conf import settings
+from django.db import connection
 from django.utils.text import slugify
 from django.utils import timezone
 from utility.enumerations import YesNo
@@ -71,6 +72,38 @@ def update_barcode_sample_type(old_barcode, sample_barcode, sample_type):
         SampleBarcode.objects.filter(pk=sample_barcode.pk).update(sample_type=sample_type)
 
 
+def allocate_sample_label_nums(sample_label_prefix, req_sample_label_num):
+    # reserve the next req_sample_label_num label numbers for the prefix and return (min, max)
+    # a single INSERT ... ON CONFLICT DO UPDATE ... RETURNING on the prefix's counter row, so concurrent requests for
+    # the same prefix are handed contiguous, non-overlapping ranges; the row stays locked until the caller's
+    # transaction commits, and a rollback gives the range back
+    qn = connection.ops.quote_name
+    table = qn(SampleLabelSequence._meta.db_table)
+    prefix_column = qn(SampleLabelSequence._meta.get_field('sample_label_prefix').column)
+    last_column = qn(SampleLabelSequence._meta.get_field('last_sample_label_num').column)
+    sql = 'INSERT INTO {table} AS s ({prefix}, {last}) VALUES (%s, %s) ' \
+          'ON CONFLICT ({prefix}) DO UPDATE SET {last} = s.{last} + EXCLUDED.{last} ' \
+          'RETURNING {last}'.format(table=table, prefix=prefix_column, last=last_column)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [sample_label_prefix, req_sample_label_num])
+        max_sample_label_num = cursor.fetchone()[0]
+    return max_sample_label_num - req_sample_label_num + 1, max_sample_label_num
+
+
+class SampleLabelSequence(models.Model):
+    # last label number handed out per sample_label_prefix, e.g., 'eAL_L01_21w'; see allocate_sample_label_nums
+    sample_label_prefix = models.CharField('Sample Label Prefix', max_length=12, unique=True)
+    last_sample_label_num = models.IntegerField('Last Sample Label Number', default=0)
+
+    def __str__(self):
+        return '{prefix}: {num}'.format(prefix=self.sample_label_prefix, num=self.last_sample_label_num)
+
+    class Meta:
+        app_label = 'sample_label'
+        verbose_name = 'Sample Label Sequence'
+        verbose_name_plural = 'Sample Label Sequences'
+
+
 class SampleType(DateTimeUserMixin):
     # ex: Extraction
     # ws: Water Sample
@@ -135,20 +168,10 @@ class SampleLabelRequest(DateTimeUserMixin):
             self.sample_label_prefix = '{site}_{twosigits_year}{sample_material}'.format(site=self.site_id.site_id,
                                                                                          twosigits_year=last_twosigits_year,
                                                                                          sample_material=self.sample_material.sample_material_code)
-            # Retrieve a list of `Site` instances, group them by the sample_label_prefix and sort them by
-            # the `site_num` field and get the largest entry - Returns the next default value for the `site_num` field
-            largest = SampleLabelRequest.objects.only('sample_label_prefix', 'max_sample_label_num').filter(
-                sample_label_prefix=self.sample_label_prefix).order_by('max_sample_label_num').last()
-            if not largest:
-                # largest is `None` if `Site` has no instances
-                # in which case we return the start value of 1
-                self.min_sample_label_num = 1
-                self.max_sample_label_num = self.req_sample_label_num
-            else:
-                # If an instance of `Site` is returned, we get it's
-                # `site_num` attribute and increment it by 1
-                self.min_sample_label_num = largest.max_sample_label_num + 1
-                self.max_sample_label_num = largest.max_sample_label_num + self.req_sample_label_num
+            # reserve the next req_sample_label_num numbers from the prefix's counter, e.g., 31 to 60 when 30 labels
+            # were already handed out; concurrent requests for the same prefix never share a number
+            self.min_sample_label_num, self.max_sample_label_num = allocate_sample_label_nums(self.sample_label_prefix,
+                                                                                              self.req_sample_label_num)
             # add leading zeros to site_num, e.g., 1 to 01
             min_num_leading_zeros = str(self.min_sample_label_num).zfill(4)
             max_num_leading_zeros = str(self.max_sample_label_num).zfill(4)
@@ -152,6 +152,10 @@ class SampleLabelRequestSerializerTableExport(TableExport):
 
 
 class SampleLabelRequestSerializerExportMixin(SerializerExportMixin):
+    # one row per printed label, built by SampleLabelRequestSerializerTableExport
+    stream_export = False
+    async_export = False
+
     def create_export(self, export_format):
         exporter = SampleLabelRequestSerializerTableExport(
             export_format=export_format,
@@ -2,61 +2,64 @@
 # from medna_metadata.celery import app
 # from celery import Task
 from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.utils.text import slugify
 from sample_label.models import SampleBarcode, SampleLabelRequest
 from django.core.exceptions import ObjectDoesNotExist
 from celery.utils.log import get_task_logger
-import numpy as np
 
 
 logger = get_task_logger(__name__)
 
+# columns copied from the request onto each barcode; existing barcodes in the range are overwritten with these,
+# the same as the defaults of the former update_or_create loop, less sample_material, which SampleBarcode does not have
+SAMPLE_BARCODE_UPDATE_FIELDS = ['sample_label_request', 'barcode_slug', 'site_id', 'sample_type', 'sample_year',
+                                'purpose', 'created_by', 'modified_datetime']
+
+
+def get_sample_barcode_ids(instance):
+    # every label id in the request's range, e.g., 'eAL_L01_21w_0001' ... 'eAL_L01_21w_0030'
+    # add leading zeros to the label number, e.g., 1 to 0001
+    return ['{labelprefix}_{sitenum}'.format(labelprefix=instance.sample_label_prefix, sitenum=str(num).zfill(4))
+            for num in range(instance.min_sample_label_num, instance.max_sample_label_num + 1)]
+
+
+def materialize_sample_barcodes(instance, batch_size=None):
+    # enter each label of the request into SampleBarcode - request only has a single row with the requested
+    # number and min/max; this table is necessary for joining proceeding tables
+    # rows and slugs are built in memory and upserted with INSERT ... ON CONFLICT in chunks of batch_size, inside a
+    # single transaction; returns (created, updated)
+    if batch_size is None:
+        batch_size = settings.SAMPLE_BARCODE_BATCH_SIZE
+    sample_barcode_ids = get_sample_barcode_ids(instance)
+    sample_barcodes = [SampleBarcode(sample_barcode_id=sample_barcode_id,
+                                     barcode_slug=slugify(sample_barcode_id),
+                                     sample_label_request=instance,
+                                     site_id=instance.site_id,
+                                     sample_type=instance.sample_type,
+                                     sample_year=instance.sample_year,
+                                     purpose=instance.purpose,
+                                     created_by=instance.created_by) for sample_barcode_id in sample_barcode_ids]
+    with transaction.atomic():
+        updated = SampleBarcode.objects.filter(sample_barcode_id__in=sample_barcode_ids).count()
+        SampleBarcode.objects.bulk_create(sample_barcodes,
+                                          batch_size=batch_size,
+                                          update_conflicts=True,
+                                          unique_fields=['sample_barcode_id'],
+                                          update_fields=SAMPLE_BARCODE_UPDATE_FIELDS)
+    return len(sample_barcodes) - updated, updated
+
 
 # @app.task(queue='elastic')
 @shared_task
 def sample_label_request_post_save_task(instance_pk):
     try:
-        instance = SampleLabelRequest.objects.get(pk=instance_pk)
+        instance = SampleLabelRequest.objects.select_related('site_id', 'sample_type', 'created_by').get(pk=instance_pk)
     except ObjectDoesNotExist:
         # Abort
         logger.warning('Saved object was deleted before this task get a chance to be executed [id = %d]' % instance_pk)
     else:
-        if instance.min_sample_label_id == instance.max_sample_label_id:
-            # only one label request, so min and max label id will be the same; only need to enter
-            # one new label into SampleBarcode
-            sample_barcode_id = instance.min_sample_label_id
-            SampleBarcode.objects.update_or_create(
-                sample_barcode_id=sample_barcode_id,
-                defaults={
-                    'sample_label_request': instance,
-                    'site_id': instance.site_id,
-                    'sample_material': instance.sample_material,
-                    'sample_type': instance.sample_type,
-                    'sample_year': instance.sample_year,
-                    'purpose': instance.purpose,
-                    'created_by': instance.created_by,
-                }
-            )
-        else:
-            # more than one label requested, so need to interate to insert into SampleBarcode
-            # arrange does not include max value, hence max+1
-            for num in np.arange(instance.min_sample_label_num, instance.max_sample_label_num + 1, 1):
-                # add leading zeros to site_num, e.g., 1 to 01
-                num_leading_zeros = str(num).zfill(4)
-
-                # format site_id, e.g., 'eAL_L01'
-                sample_barcode_id = '{labelprefix}_{sitenum}'.format(labelprefix=instance.sample_label_prefix,
-                                                                     sitenum=num_leading_zeros)
-                # enter each new label into SampleBarcode - request only has a single row with the requested
-                # number and min/max; this table is necessary for joining proceeding tables
-                SampleBarcode.objects.update_or_create(
-                    sample_barcode_id=sample_barcode_id,
-                    defaults={
-                        'sample_label_request': instance,
-                        'site_id': instance.site_id,
-                        'sample_material': instance.sample_material,
-                        'sample_type': instance.sample_type,
-                        'sample_year': instance.sample_year,
-                        'purpose': instance.purpose,
-                        'created_by': instance.created_by,
-                    }
-                )
+        created, updated = materialize_sample_barcodes(instance)
+        logger.info('Sample barcodes for %s: %d created, %d updated' % (instance.sample_label_request_slug, created, updated))
+        return {'created': created, 'updated': updated}
@@ -1,7 +1,11 @@
-from django.test import TestCase
-from .models import SampleMaterial, SampleBarcode, SampleLabelRequest, SampleType
+import threading
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils.text import slugify
+from .models import SampleMaterial, SampleBarcode, SampleLabelRequest, SampleType, allocate_sample_label_nums
 from field_site.models import FieldSite
 from field_site.tests import FieldSiteTestCase
+from .tasks import materialize_sample_barcodes
 # Create your tests here.
 
 
@@ -67,6 +71,50 @@ class SampleLabelRequestTestCase(TestCase):
         self.assertIs(test1.was_added_recently(), True)
         self.assertIs(test2.was_added_recently(), True)
 
+    def test_sample_label_ranges(self):
+        # the second request for the same prefix continues after the first
+        test1 = SampleLabelRequest.objects.filter(purpose='SampleLabelTest1')[:1].get()
+        test2 = SampleLabelRequest.objects.filter(purpose='SampleLabelTest2')[:1].get()
+        self.assertEqual((test1.min_sample_label_num, test1.max_sample_label_num), (1, 30))
+        self.assertEqual((test2.min_sample_label_num, test2.max_sample_label_num), (31, 60))
+
+    def test_materialize_sample_barcodes(self):
+        # all 30 labels are inserted, and a second run only updates them
+        test1 = SampleLabelRequest.objects.filter(purpose='SampleLabelTest1')[:1].get()
+        self.assertEqual(materialize_sample_barcodes(test1, batch_size=7), (30, 0))
+        self.assertEqual(materialize_sample_barcodes(test1, batch_size=7), (0, 30))
+        barcode = SampleBarcode.objects.get(sample_barcode_id=test1.max_sample_label_id)
+        self.assertEqual(barcode.barcode_slug, slugify(test1.max_sample_label_id))
+        self.assertEqual(barcode.sample_label_request, test1)
+
+
+class SampleLabelSequenceTestCase(TransactionTestCase):
+    def test_parallel_allocation(self):
+        # many technicians requesting labels for the same prefix at once get contiguous, non-overlapping ranges
+        ranges = []
+        errors = []
+
+        def request_labels(req_sample_label_num):
+            try:
+                for i in range(5):
+                    with transaction.atomic():
+                        ranges.append(allocate_sample_label_nums('eAL_L01_21w', req_sample_label_num))
+            except Exception as err:
+                errors.append(err)
+            finally:
+                # each thread has its own database connection
+                connection.close()
+
+        threads = [threading.Thread(target=request_labels, args=(num % 3 + 1,)) for num in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(ranges), 50)
+        label_nums = sorted(num for min_num, max_num in ranges for num in range(min_num, max_num + 1))
+        self.assertEqual(label_nums, list(range(1, len(label_nums) + 1)))
+
 
 class SampleBarcodeTestCase(TestCase):
     # fixtures = ['sample_label_samplelabel.json']
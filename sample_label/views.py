@@ -19,11 +19,19 @@ from .serializers import SampleMaterialSerializer, SampleLabelRequestSerializer,
     SampleBarcodeSerializer, SampleTypeSerializer, SampleLabelRequestSerializerExportMixin
 import sample_label.filters as samplelabel_filters
 from .forms import SampleLabelRequestCreateForm, SampleLabelRequestUpdateForm
-from utility.views import export_context
+from utility.views import export_context, Select2AutocompleteView
 from django.conf import settings
 
 
 # Create your views here.
+########################################
+# FRONTEND REQUESTS                    #
+########################################
+class SampleBarcodeAutocompleteView(Select2AutocompleteView):
+    model = SampleBarcode
+    text_field = 'sample_barcode_id'
+
+
 ########################################
 # FRONTEND VIEWS                       #
 ########################################
@@ -7,6 +7,7 @@ import allauth.account.views as allauth_views
 # from dj_rest_auth.registration.views import SocialLoginView
 from rest_framework.authentication import TokenAuthentication
 from django_filters import rest_framework as filters
+from utility.views import Select2AutocompleteView
 import dj_rest_auth.registration.views as djrestauth_views
 from rest_framework import viewsets
 from .serializers import CustomUserSerializer
@@ -16,6 +17,17 @@ import users.filters as user_filters
 
 
 # Create your views here.
+########################################
+# FRONTEND REQUESTS                    #
+########################################
+class CustomUserAutocompleteView(Select2AutocompleteView):
+    # created_by, username and supervisor filters; any signed in user may filter by user
+    model = CustomUser
+    text_field = 'email'
+    search_fields = ['email', 'agol_username']
+    permission_required = ()
+
+
 ########################################
 # FRONTEND VIEWS                       #
 ########################################
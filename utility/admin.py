@@ -32,6 +32,38 @@ class PeriodicTaskRunAdmin(ImportExportActionModelAdmin):
 admin.site.register(utility_models.PeriodicTaskRun, PeriodicTaskRunAdmin)
 
 
+class ExportJobAdmin(admin.ModelAdmin):
+    # export jobs are created by the export buttons of the filter views and run by celery in tasks.py
+    list_display = ('__str__', 'export_row_count', 'created_by', 'created_datetime', 'finished_datetime')
+    list_filter = ('job_status', 'export_format')
+    readonly_fields = ('export_view', 'export_format', 'export_params', 'export_key', 'export_datafile',
+                       'export_row_count', 'job_status', 'job_error', 'created_by', 'created_datetime',
+                       'finished_datetime')
+
+    def has_add_permission(self, request, obj=None):
+        # disable add because this model is populated by export jobs in tasks.py with celery
+        return False
+
+
+admin.site.register(utility_models.ExportJob, ExportJobAdmin)
+
+
+class ImportJobAdmin(admin.ModelAdmin):
+    # import jobs are created by the dashboard import views and run by celery in tasks.py
+    list_display = ('__str__', 'import_row_count', 'import_rows_done', 'created_by', 'created_datetime', 'finished_datetime')
+    list_filter = ('job_status', 'import_view', 'import_dry_run')
+    readonly_fields = ('import_view', 'import_format', 'import_dry_run', 'import_datafile', 'import_row_count',
+                       'import_rows_done', 'import_created_count', 'import_updated_count', 'import_skipped_count',
+                       'import_errors', 'import_column_errors', 'job_status', 'job_error', 'created_by', 'created_datetime', 'finished_datetime')
+
+    def has_add_permission(self, request, obj=None):
+        # disable add because this model is populated by the import views and import jobs in tasks.py with celery
+        return False
+
+
+admin.site.register(utility_models.ImportJob, ImportJobAdmin)
+
+
 class FundAdmin(ImportExportActionModelAdmin):
     # formerly Project in field_site.models
     # below are import_export configs
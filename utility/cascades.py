@@ -0,0 +1,116 @@
+from collections import OrderedDict
+from django.db import connection, transaction
+from django.db.models import Min, Max
+
+
+########################################
+# SET-BASED SLUG CASCADES              #
+########################################
+class SlugCascade:
+    # A chain of models where each tier has a FK to the tier above it and keeps a denormalized copy of
+    # every ancestor slug, e.g., EnvoBiomeThird.biome_first_tier_slug and EnvoBiomeThird.biome_second_tier_slug.
+    # The denormalized columns share the name of the ancestor's own slug field, so every descendant tier can be
+    # rebuilt from its parent with one UPDATE ... FROM statement instead of calling save() on each row.
+    # tiers is an ordered list of (model, slug_field, parent_field) from the root down; parent_field is None
+    # for the root tier.
+    def __init__(self, name, tiers):
+        self.name = name
+        self.tiers = tiers
+
+    def tier_index(self, model):
+        for index, (tier_model, slug_field, parent_field) in enumerate(self.tiers):
+            if tier_model is model:
+                return index
+        raise ValueError('{model} is not a tier of the {name} cascade'.format(model=model.__name__, name=self.name))
+
+    def subtree_queryset(self, index, root_index, root_pks):
+        # pks of every row in tier[index] that descends from root_pks in tier[root_index]; the querysets are
+        # nested lazily so the database resolves the whole subtree in a single statement
+        model, slug_field, parent_field = self.tiers[index]
+        if index == root_index:
+            return model.objects.filter(pk__in=root_pks).values('pk')
+        parent_pks = self.subtree_queryset(index - 1, root_index, root_pks)
+        return model.objects.filter(**{parent_field + '__in': parent_pks}).values('pk')
+
+    def tier_update_sql(self, index):
+        # UPDATE child SET <ancestor slugs> = parent.<ancestor slugs> FROM parent WHERE child.fk = parent.pk
+        # rows that already match are skipped so the cascade is idempotent and rowcount only reports real changes
+        qn = connection.ops.quote_name
+        model, slug_field, parent_field = self.tiers[index]
+        parent_model = self.tiers[index - 1][0]
+        ancestor_fields = [tier_slug_field for tier_model, tier_slug_field, tier_parent_field in self.tiers[:index]]
+        child_columns = [qn(model._meta.get_field(field).column) for field in ancestor_fields]
+        parent_columns = [qn(parent_model._meta.get_field(field).column) for field in ancestor_fields]
+        assignments = ', '.join('{child} = p.{parent}'.format(child=child, parent=parent)
+                                for child, parent in zip(child_columns, parent_columns))
+        changed = ' OR '.join('c.{child} IS DISTINCT FROM p.{parent}'.format(child=child, parent=parent)
+                              for child, parent in zip(child_columns, parent_columns))
+        return 'UPDATE {child_table} AS c SET {assignments} ' \
+               'FROM {parent_table} AS p ' \
+               'WHERE c.{fk_column} = p.{parent_pk} AND ({changed})'.format(
+                   child_table=qn(model._meta.db_table),
+                   parent_table=qn(parent_model._meta.db_table),
+                   assignments=assignments,
+                   fk_column=qn(model._meta.get_field(parent_field).column),
+                   parent_pk=qn(parent_model._meta.pk.column),
+                   changed=changed)
+
+    def tier_bounds(self, index, root_index, root_pks):
+        # smallest and largest pk of the rows in tier[index] that belong to the subtree
+        model = self.tiers[index][0]
+        queryset = model.objects.all()
+        if root_pks is not None:
+            parent_field = self.tiers[index][2]
+            queryset = queryset.filter(**{parent_field + '__in': self.subtree_queryset(index - 1, root_index, root_pks)})
+        bounds = queryset.aggregate(min_pk=Min('pk'), max_pk=Max('pk'))
+        return bounds['min_pk'], bounds['max_pk']
+
+    def update_tier(self, index, root_index, root_pks, pk_range=None):
+        qn = connection.ops.quote_name
+        model = self.tiers[index][0]
+        parent_model = self.tiers[index - 1][0]
+        sql = self.tier_update_sql(index)
+        params = []
+        if root_pks is not None:
+            subtree_sql, subtree_params = self.subtree_queryset(index - 1, root_index, root_pks).query.sql_with_params()
+            sql = '{sql} AND p.{parent_pk} IN ({subtree})'.format(sql=sql, parent_pk=qn(parent_model._meta.pk.column), subtree=subtree_sql)
+            params.extend(subtree_params)
+        if pk_range is not None:
+            sql = '{sql} AND c.{pk} BETWEEN %s AND %s'.format(sql=sql, pk=qn(model._meta.pk.column))
+            params.extend(pk_range)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def propagate(self, root_model=None, root_pks=None, batch_size=None):
+        # recompute the denormalized slug columns of every tier below root_model, restricted to the subtrees
+        # rooted at root_pks; with no root_model the whole hierarchy is rebuilt. Tiers are updated top-down so
+        # each tier reads the already corrected values of its parent.
+        # without batch_size everything runs in one transaction; with batch_size each tier is updated in pk
+        # windows of batch_size rows that commit on their own, so row locks on large tiers are held briefly.
+        # rows that already match are skipped, so an interrupted batched run can simply be run again.
+        # returns an OrderedDict of {model label: rows changed}
+        if root_model is None:
+            root_index = 0
+            root_pks = None
+        else:
+            root_index = self.tier_index(root_model)
+            if root_pks is not None:
+                root_pks = list(root_pks)
+        counts = OrderedDict()
+        if batch_size is None:
+            with transaction.atomic():
+                for index in range(root_index + 1, len(self.tiers)):
+                    counts[self.tiers[index][0]._meta.label] = self.update_tier(index, root_index, root_pks)
+            return counts
+        for index in range(root_index + 1, len(self.tiers)):
+            label = self.tiers[index][0]._meta.label
+            counts[label] = 0
+            min_pk, max_pk = self.tier_bounds(index, root_index, root_pks)
+            if min_pk is None:
+                continue
+            for batch_start in range(min_pk, max_pk + 1, batch_size):
+                with transaction.atomic():
+                    counts[label] += self.update_tier(index, root_index, root_pks,
+                                                      pk_range=(batch_start, batch_start + batch_size - 1))
+        return counts
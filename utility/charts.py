@@ -1,3 +1,7 @@
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
 from django.http import JsonResponse
 
 
@@ -41,91 +45,46 @@ def return_queryset_lists(queryset):
     return labels, data
 
 
-def fill_month_zeros(labels, data, colname):
-    import pandas as pd
-    if len(data) == 0:
-        df2 = pd.DataFrame(columns=['label', colname])
-        df2['label'] = pd.to_datetime(df2['label'], format='%m/%Y')
-        df2['label'] = df2['label'].dt.to_period('M')
-        df_merge = df2.set_index('label')
-    else:
-        # convert labels and data array into one dataframe
-        # https://stackoverflow.com/questions/46379095/convert-two-numpy-array-to-dataframe
-        df = pd.DataFrame({'label': labels, colname: data}, columns=['label', colname])
-        # convert label to date type
-        df['label'] = pd.to_datetime(df['label'], format='%m/%Y')
-        # convert date column to monthly period type
-        # https://stackoverflow.com/questions/45304531/extracting-the-first-day-of-month-of-a-datetime-type-column-in-pandas
-        df['label'] = df['label'].dt.to_period('M')
-        # set index column to label and sort by label
-        df2 = df.set_index('label').sort_index()
-        # if there are duplicate dates in the array, collapse them by group
-        df_merge = df2.groupby(level=0).sum()
-        # create period_range that starts with earliest date and ends with latest date in input labels
-        # and reindexes by the range
-        # https://stackoverflow.com/questions/17343726/pandas-add-data-for-missing-months
-        df_merge = df_merge.reindex(pd.period_range(df2.index[0], df2.index[-1], freq='M'))
-        # fill NaN with 0, ultimately filling missing months with 0 value
-        df_merge = df_merge.fillna(0.0)
-    return df_merge
+def month_series_sql(series):
+    # one query for several monthly counts: the months from the earliest to the latest month of any series
+    # come from generate_series, and each series' counts per TruncMonth are left joined onto them, so months
+    # without rows are counted as 0 by postgres. series is a list of (queryset, datetime field name) pairs
+    # https://www.postgresql.org/docs/current/functions-srf.html
+    count_sqls = []
+    params = []
+    for index, (queryset, field_name) in enumerate(series):
+        try:
+            sql, count_params = queryset.filter(**{'{field}__isnull'.format(field=field_name): False}) \
+                .annotate(chart_month=TruncMonth(field_name)).order_by().values('chart_month') \
+                .annotate(chart_count=Count('pk')).query.sql_with_params()
+        except EmptyResultSet:
+            # e.g., .none(); the series is all zeros
+            continue
+        count_sqls.append('SELECT c.chart_month, {index} AS chart_series, c.chart_count FROM ({sql}) c'.format(index=index, sql=sql))
+        params.extend(count_params)
+    if not count_sqls:
+        return None, ()
+    data_sql = ', '.join('COALESCE(SUM(counts.chart_count) FILTER (WHERE counts.chart_series = {index}), 0)::integer'.format(index=index)
+                         for index in range(len(series)))
+    series_sql = 'WITH counts AS ({count_sql}), ' \
+                 'months AS (SELECT generate_series(MIN(chart_month), MAX(chart_month), interval \'1 month\') AS chart_month FROM counts) ' \
+                 'SELECT to_char(months.chart_month, \'YYYY-MM\'), {data_sql} ' \
+                 'FROM months LEFT JOIN counts ON counts.chart_month = months.chart_month ' \
+                 'GROUP BY months.chart_month ORDER BY months.chart_month'.format(count_sql=' UNION ALL '.join(count_sqls),
+                                                                                  data_sql=data_sql)
+    return series_sql, tuple(params)
 
 
-def return_zeros_lists(labels, data, colname='data'):
-    df = fill_month_zeros(labels, data, colname)
-    df['label'] = df.index
-    labels = df['label'].astype(str).tolist()
-    data = df[colname].tolist()
-    return labels, data
-
-
-def return_merged_zeros_lists(labels_array, data_array):
-    import pandas as pd
-    dfs = []
-    if len(labels_array) != len(data_array):
-        raise Exception('Length of labels array does not match data array')
-    # add dfs to an array
-    for i in range(len(data_array)):
-        colname = 'data_' + str(i)
-        df = fill_month_zeros(labels_array[i], data_array[i], colname)
-        dfs.append(df)
-    # merge dfs in array into one df
-    df_merge = pd.concat(dfs, axis=0)
-    # fill NaN with zeros
-    df_merge = df_merge.fillna(0.0)
-    # if there are duplicate dates in the array, collapse them by group, e.g.,
-    #          data_0  data_1      data_0  data_1
-    # 2022-04     1.0     NaN  =>  2022-04     1.0     1.0
-    # 2022-04     NaN     1.0
-    df_merge = df_merge.groupby(level=0).sum()
-    # if the merged df is empty, fillna will throw an error, so return empty arrays.
-    if df_merge.empty:
-        df_merge['label'] = df_merge.index
-        labels = df_merge['label'].astype(str).tolist()
-        # convert all data columns to list and append them to array
-        data_array = []
-        data_cols = [col for col in df_merge if col.startswith('data')]
-        for col in data_cols:
-            data = df_merge[col].tolist()
-            data_array.append(data)
-        return labels, data_array
-    else:
-        # fill any NaN with zero
-        df_merge = df_merge.fillna(0.0)
-        # sort merged dfs
-        df_merge = df_merge.sort_index()
-        # reindex and fill in any missing months
-        df_merge = df_merge.reindex(pd.period_range(df_merge.index[0], df_merge.index[-1], freq='M'))
-        # fill any NaN with zero
-        df_merge = df_merge.fillna(0.0)
-        # convert index to list
-        # https://stackoverflow.com/questions/20461165/how-to-convert-index-of-a-pandas-dataframe-into-a-column
-        df_merge['label'] = df_merge.index
-        # pull out labels column as list
-        labels = df_merge['label'].astype(str).tolist()
-        # convert all data columns to list and append them to array
-        data_array = []
-        data_cols = [col for col in df_merge if col.startswith('data')]
-        for col in data_cols:
-            data = df_merge[col].tolist()
-            data_array.append(data)
-        return labels, data_array
+def return_month_series_lists(*series):
+    # labels as 'YYYY-MM' and a list of monthly counts per series, with a 0 for each month without rows, e.g.,
+    # labels, (filter_data, subcore_data) = return_month_series_lists((FilterSample.objects.all(), 'filter_datetime'),
+    #                                                                 (SubCoreSample.objects.all(), 'subcore_datetime_start'))
+    sql, params = month_series_sql(series)
+    if sql is None:
+        return [], [[] for _ in series]
+    with connections[series[0][0].db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    labels = [row[0] for row in rows]
+    data_array = [[row[index + 1] for row in rows] for index in range(len(series))]
+    return labels, data_array
@@ -0,0 +1,107 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# pks collected per thread; a bulk import saves rows from a single thread inside a single transaction
+_local = threading.local()
+
+
+########################################
+# COALESCED CASCADE DISPATCH           #
+########################################
+class CascadeBatch:
+    # pending cascade jobs, {(task name, leading task args): set(pks)}. Each job is sent once as
+    # task.delay(*args, sorted pks), so 5,000 rows saved in one import become one task per model instead of 5,000
+    def __init__(self):
+        self.tasks = {}
+        self.jobs = OrderedDict()
+
+    def add(self, task, pk, args=()):
+        self.tasks[task.name] = task
+        self.jobs.setdefault((task.name, tuple(args)), set()).add(pk)
+
+    def merge(self, batch):
+        for (task_name, args), pks in batch.jobs.items():
+            for pk in pks:
+                self.add(batch.tasks[task_name], pk, args)
+
+    def flush(self):
+        jobs, self.jobs = self.jobs, OrderedDict()
+        for (task_name, args), pks in jobs.items():
+            send_cascade(self.tasks[task_name], args, sorted(pks))
+
+
+def send_cascade(task, args, pks):
+    # with CASCADE_DISPATCH_WINDOW, a root that was already sent within the last window seconds is skipped and every
+    # job waits out the window before running, so repeated edits of the same row in quick succession collapse into
+    # one cascade that reads the latest committed values. The window is only shared across processes when CACHES
+    # points at a shared backend.
+    window = settings.CASCADE_DISPATCH_WINDOW
+    if not window:
+        task.delay(*args, pks)
+        return
+    key_prefix = 'cascade_dispatch:{task}:{args}'.format(task=task.name, args=':'.join(str(arg) for arg in args))
+    pks = [pk for pk in pks if cache.add('{prefix}:{pk}'.format(prefix=key_prefix, pk=pk), True, timeout=window)]
+    if pks:
+        task.apply_async(args=list(args) + [pks], countdown=window)
+
+
+def _suppressed_batches():
+    if not hasattr(_local, 'suppressed'):
+        _local.suppressed = []
+    return _local.suppressed
+
+
+def _transaction_batch(using):
+    # one batch per outermost transaction, flushed by a single on_commit callback. On rollback Django drops the
+    # callback, so a batch whose callback is no longer registered belongs to a discarded transaction and is replaced.
+    connection = transaction.get_connection(using)
+    batches = getattr(_local, 'transactions', None)
+    if batches is None:
+        batches = _local.transactions = {}
+    batch = batches.get(using)
+    if batch is not None and any(entry[1] == batch.flush for entry in connection.run_on_commit):
+        return batch
+    batch = batches[using] = CascadeBatch()
+    transaction.on_commit(batch.flush, using=using)
+    return batch
+
+
+def queue_cascade(task, pk, args=(), using=None):
+    # record that the subtree rooted at pk needs task(*args, [pk, ...]); called from post_save receivers.
+    # Outside of a transaction the job is sent right away, as before. Inside a transaction, pks are collected and
+    # sent as one deduplicated job per task and args on commit. Inside suppress_cascade_dispatch() they are held
+    # until the block exits.
+    suppressed = _suppressed_batches()
+    if suppressed:
+        suppressed[-1].add(task, pk, args)
+    elif transaction.get_connection(using).in_atomic_block:
+        _transaction_batch(using).add(task, pk, args)
+    else:
+        send_cascade(task, tuple(args), [pk])
+
+
+@contextmanager
+def suppress_cascade_dispatch(dispatch=True, using=None):
+    # hold back cascade tasks for every row saved inside the block, e.g., in a bulk load or management command
+    # with dispatch=True the collected jobs are queued once when the block exits cleanly (and sent on commit if
+    # the block is inside a transaction); with dispatch=False they are dropped and the caller is responsible for
+    # running the cascade itself, e.g., cascade_envo_slugs(EnvoBiomeFirst) after loading the whole ontology
+    suppressed = _suppressed_batches()
+    batch = CascadeBatch()
+    suppressed.append(batch)
+    try:
+        yield batch
+    finally:
+        suppressed.pop()
+    if not dispatch:
+        return
+    if suppressed:
+        suppressed[-1].merge(batch)
+    elif transaction.get_connection(using).in_atomic_block:
+        _transaction_batch(using).merge(batch)
+    else:
+        batch.flush()
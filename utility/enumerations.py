@@ -45,6 +45,13 @@ class ContactUsTypes(models.TextChoices):
     __empty__ = _('(Unknown)')
 
 
+class JobStatuses(models.TextChoices):
+    PENDING = 'pending', _('Pending')
+    RUNNING = 'running', _('Running')
+    SUCCESS = 'success', _('Success')
+    FAILURE = 'failure', _('Failure')
+
+
 # UNITS CHOICES
 class TempUnits(models.TextChoices):
     F = 'fahrenheit', _('Fahrenheit')
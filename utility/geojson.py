@@ -0,0 +1,44 @@
+import hashlib
+from django.db import connections
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+
+def geojson_feature_collection_sql(queryset, properties, geometry_field='geom', srid=4326):
+    # wrap queryset in a select that builds the whole FeatureCollection in postgis with ST_AsGeoJSON and
+    # json_agg, so the database returns one json string instead of rows to serialize in python.
+    # properties maps a property name to a field name or an expression, e.g., an ArraySubquery
+    # https://postgis.net/docs/ST_AsGeoJSON.html
+    columns = {'geojson_id': F('pk'), 'geojson_geometry': F(geometry_field)}
+    columns.update({'geojson_p{index}'.format(index=index): F(value) if isinstance(value, str) else value
+                    for index, value in enumerate(properties.values())})
+    sql, params = queryset.order_by().values(**columns).query.sql_with_params()
+    property_sql = ', '.join('%s, t.geojson_p{index}'.format(index=index) for index in range(len(properties)))
+    collection_sql = "SELECT json_build_object('type', 'FeatureCollection', 'features', " \
+                     "COALESCE(json_agg(json_build_object(" \
+                     "'type', 'Feature', " \
+                     "'id', t.geojson_id, " \
+                     "'geometry', ST_AsGeoJSON(ST_Transform(t.geojson_geometry, {srid}))::json, " \
+                     "'properties', json_build_object({property_sql})) ORDER BY t.geojson_id), '[]'::json))::text " \
+                     "FROM ({sql}) t".format(srid=int(srid), property_sql=property_sql, sql=sql)
+    return collection_sql, tuple(properties.keys()) + tuple(params)
+
+
+def get_geojson_feature_collection(queryset, properties, geometry_field='geom', srid=4326):
+    sql, params = geojson_feature_collection_sql(queryset, properties, geometry_field, srid)
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone()[0]
+
+
+def geojson_response(request, queryset, properties, geometry_field='geom', srid=4326):
+    # the FeatureCollection from postgis is written out as is; the ETag lets the map answer
+    # a reload with 304 Not Modified instead of sending the collection again
+    content = get_geojson_feature_collection(queryset, properties, geometry_field, srid).encode('utf-8')
+    etag = '"{digest}"'.format(digest=hashlib.md5(content).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    return response
@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand, CommandError
+from utility.stats import DASHBOARD_STATS, refresh_stats
+
+
+class Command(BaseCommand):
+    help = 'Computes the dashboard chart data and stores it in the cache, e.g., after a deploy or a bulk load'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='stats to refresh, e.g., survey_count; all when omitted')
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(DASHBOARD_STATS)
+        if unknown:
+            raise CommandError('Unknown stat "{names}", choose from {choices}'.format(names=', '.join(sorted(unknown)),
+                                                                                    choices=', '.join(sorted(DASHBOARD_STATS))))
+        names = refresh_stats(options['names'])
+        self.stdout.write(self.style.SUCCESS('Cached {count} dashboard stats: {names}'.format(count=len(names),
+                                                                                             names=', '.join(names))))
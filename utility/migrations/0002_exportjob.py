@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.db import migrations, models
+import medna_metadata.storage_backends
+import utility.models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('utility', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('modified_datetime', models.DateTimeField(auto_now=True, null=True, verbose_name='Modified DateTime')),
+                ('created_datetime', models.DateTimeField(auto_now_add=True, verbose_name='Created DateTime')),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('export_view', models.CharField(max_length=255, verbose_name='Export View')),
+                ('export_format', models.CharField(max_length=50, verbose_name='Export Format')),
+                ('export_params', models.JSONField(blank=True, default=dict, verbose_name='Export Filter Params')),
+                ('export_key', models.CharField(db_index=True, max_length=64, verbose_name='Export Key')),
+                ('export_datafile', models.FileField(blank=True, max_length=255, storage=medna_metadata.storage_backends.select_private_media_storage, upload_to=utility.models.set_export_subdir, verbose_name='Export Datafile')),
+                ('export_row_count', models.PositiveIntegerField(blank=True, null=True, verbose_name='Export Row Count')),
+                ('job_status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('success', 'Success'), ('failure', 'Failure')], default='pending', max_length=50, verbose_name='Job Status')),
+                ('job_error', models.TextField(blank=True, verbose_name='Job Error')),
+                ('finished_datetime', models.DateTimeField(blank=True, null=True, verbose_name='Finished DateTime')),
+                ('created_by', models.ForeignKey(default=utility.models.get_default_user, on_delete=models.SET(utility.models.get_sentinel_user), to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Export Job',
+                'verbose_name_plural': 'Export Jobs',
+            },
+        ),
+    ]
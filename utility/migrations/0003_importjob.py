@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.db import migrations, models
+import medna_metadata.storage_backends
+import utility.models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('utility', '0002_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('modified_datetime', models.DateTimeField(auto_now=True, null=True, verbose_name='Modified DateTime')),
+                ('created_datetime', models.DateTimeField(auto_now_add=True, verbose_name='Created DateTime')),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('import_view', models.CharField(max_length=255, verbose_name='Import View')),
+                ('import_format', models.CharField(max_length=50, verbose_name='Import Format')),
+                ('import_datafile', models.FileField(max_length=255, storage=medna_metadata.storage_backends.select_private_media_storage, upload_to=utility.models.set_import_subdir, verbose_name='Import Datafile')),
+                ('import_row_count', models.PositiveIntegerField(blank=True, null=True, verbose_name='Import Row Count')),
+                ('import_rows_done', models.PositiveIntegerField(default=0, verbose_name='Import Rows Done')),
+                ('import_created_count', models.PositiveIntegerField(default=0, verbose_name='Import Created Count')),
+                ('import_updated_count', models.PositiveIntegerField(default=0, verbose_name='Import Updated Count')),
+                ('import_skipped_count', models.PositiveIntegerField(default=0, verbose_name='Import Skipped Count')),
+                ('import_errors', models.JSONField(blank=True, default=list, verbose_name='Import Row Errors')),
+                ('job_status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('success', 'Success'), ('failure', 'Failure')], default='pending', max_length=50, verbose_name='Job Status')),
+                ('job_error', models.TextField(blank=True, verbose_name='Job Error')),
+                ('finished_datetime', models.DateTimeField(blank=True, null=True, verbose_name='Finished DateTime')),
+                ('created_by', models.ForeignKey(default=utility.models.get_default_user, on_delete=models.SET(utility.models.get_sentinel_user), to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Import Job',
+                'verbose_name_plural': 'Import Jobs',
+            },
+        ),
+    ]
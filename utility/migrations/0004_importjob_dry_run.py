@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('utility', '0003_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='import_dry_run',
+            field=models.BooleanField(default=False, verbose_name='Import Dry Run'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='import_column_errors',
+            field=models.JSONField(blank=True, default=list, verbose_name='Import Column Errors'),
+        ),
+    ]
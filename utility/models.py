@@ -2,12 +2,13 @@ from django.contrib.auth import get_user_model
 from django.contrib.gis.db import models
 from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
+from django.urls import reverse
 from django.utils import timezone
 import datetime
 import uuid
 import os
 from phonenumber_field.modelfields import PhoneNumberField
-from utility.enumerations import YesNo, SopTypes, DefinedTermTypes, ModuleTypes, ContactUsTypes
+from utility.enumerations import YesNo, SopTypes, DefinedTermTypes, ModuleTypes, ContactUsTypes, JobStatuses
 # custom private media S3 backend storage
 from medna_metadata.storage_backends import select_private_media_storage
 
@@ -56,6 +57,16 @@ def set_error_log_subdir(instance, filename):
     return f"error_logs/{filename_version}"
 
 
+def set_export_subdir(instance, filename):
+    # returns subdir exports for given filename
+    return f"exports/{instance.uuid}/{filename}"
+
+
+def set_import_subdir(instance, filename):
+    # returns subdir imports for given filename
+    return f"imports/{instance.uuid}/{filename}"
+
+
 # Create your models here.
 class DateTimeUserMixin(models.Model):
     # these are django fields for when the record was created and by whom
@@ -412,3 +423,106 @@ class CustomUserCss(DateTimeUserMixin):
         app_label = 'utility'
         verbose_name = 'Custom User CSS'
         verbose_name_plural = 'Custom User CSS'
+
+
+class ExportJob(DateTimeUserMixin):
+    # a FilterView export run by celery (see utility.tasks.run_export_job) and written to private media storage;
+    # export_key fingerprints the view, format, filter params and the state of the filtered rows, so a finished
+    # export is handed out again until the rows change
+    uuid = models.UUIDField(primary_key=True, editable=False, default=uuid.uuid4)
+    export_view = models.CharField('Export View', max_length=255)
+    export_format = models.CharField('Export Format', max_length=50)
+    export_params = models.JSONField('Export Filter Params', default=dict, blank=True)
+    export_key = models.CharField('Export Key', max_length=64, db_index=True)
+    export_datafile = models.FileField('Export Datafile', blank=True, max_length=255, storage=select_private_media_storage, upload_to=set_export_subdir)
+    export_row_count = models.PositiveIntegerField('Export Row Count', null=True, blank=True)
+    job_status = models.CharField('Job Status', max_length=50, choices=JobStatuses.choices, default=JobStatuses.PENDING)
+    job_error = models.TextField('Job Error', blank=True)
+    finished_datetime = models.DateTimeField('Finished DateTime', blank=True, null=True)
+
+    @property
+    def export_filename(self):
+        return os.path.basename(self.export_datafile.name)
+
+    def get_status(self):
+        # body of the export job status endpoint
+        status = {'uuid': str(self.uuid),
+                  'export_view': self.export_view,
+                  'export_format': self.export_format,
+                  'job_status': self.job_status,
+                  'export_row_count': self.export_row_count,
+                  'job_error': self.job_error,
+                  'created_datetime': self.created_datetime,
+                  'finished_datetime': self.finished_datetime,
+                  'status_url': reverse('detail_exportjob', kwargs={'pk': self.uuid}),
+                  'download_url': None}
+        if self.job_status == JobStatuses.SUCCESS:
+            status['download_url'] = reverse('download_exportjob', kwargs={'pk': self.uuid})
+        return status
+
+    def __str__(self):
+        return '{view} [{format}]: {status}'.format(view=self.export_view, format=self.export_format, status=self.job_status)
+
+    class Meta:
+        app_label = 'utility'
+        verbose_name = 'Export Job'
+        verbose_name_plural = 'Export Jobs'
+
+
+class ImportJob(DateTimeUserMixin):
+    # a spreadsheet uploaded to an import view (see utility.views.ImportJobMixin), kept in private media storage
+    # and imported by celery (see utility.tasks.run_import_job) a chunk of rows at a time; the counts and row
+    # errors are saved after every chunk so the job page can show progress while it runs; a dry run only
+    # validates the file, and its counts are of the records an import would create
+    uuid = models.UUIDField(primary_key=True, editable=False, default=uuid.uuid4)
+    import_view = models.CharField('Import View', max_length=255)
+    import_format = models.CharField('Import Format', max_length=50)
+    import_dry_run = models.BooleanField('Import Dry Run', default=False)
+    import_datafile = models.FileField('Import Datafile', max_length=255, storage=select_private_media_storage, upload_to=set_import_subdir)
+    import_row_count = models.PositiveIntegerField('Import Row Count', null=True, blank=True)
+    import_rows_done = models.PositiveIntegerField('Import Rows Done', default=0)
+    import_created_count = models.PositiveIntegerField('Import Created Count', default=0)
+    import_updated_count = models.PositiveIntegerField('Import Updated Count', default=0)
+    import_skipped_count = models.PositiveIntegerField('Import Skipped Count', default=0)
+    import_errors = models.JSONField('Import Row Errors', default=list, blank=True)
+    import_column_errors = models.JSONField('Import Column Errors', default=list, blank=True)
+    job_status = models.CharField('Job Status', max_length=50, choices=JobStatuses.choices, default=JobStatuses.PENDING)
+    job_error = models.TextField('Job Error', blank=True)
+    finished_datetime = models.DateTimeField('Finished DateTime', blank=True, null=True)
+
+    @property
+    def import_filename(self):
+        return os.path.basename(self.import_datafile.name)
+
+    @property
+    def is_finished(self):
+        return self.job_status in [JobStatuses.SUCCESS, JobStatuses.FAILURE]
+
+    def get_status(self):
+        # body of the import job status endpoint
+        return {'uuid': str(self.uuid),
+                'import_view': self.import_view,
+                'import_format': self.import_format,
+                'import_dry_run': self.import_dry_run,
+                'import_filename': self.import_filename,
+                'job_status': self.job_status,
+                'import_row_count': self.import_row_count,
+                'import_rows_done': self.import_rows_done,
+                'import_created_count': self.import_created_count,
+                'import_updated_count': self.import_updated_count,
+                'import_skipped_count': self.import_skipped_count,
+                'import_error_count': len(self.import_errors),
+                'import_column_errors': self.import_column_errors,
+                'job_error': self.job_error,
+                'created_datetime': self.created_datetime,
+                'finished_datetime': self.finished_datetime,
+                'status_url': reverse('status_importjob', kwargs={'pk': self.uuid}),
+                'detail_url': reverse('detail_importjob', kwargs={'pk': self.uuid})}
+
+    def __str__(self):
+        return '{view} [{filename}]: {status}'.format(view=self.import_view, filename=self.import_filename, status=self.job_status)
+
+    class Meta:
+        app_label = 'utility'
+        verbose_name = 'Import Job'
+        verbose_name_plural = 'Import Jobs'
@@ -1,5 +1,14 @@
+import base64
+import binascii
+import json
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import BooleanField, DateTimeField, F, Func, Value
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 # https://www.django-rest-framework.org/api-guide/pagination/#example
@@ -13,3 +22,120 @@ class CustomPagination(PageNumberPagination):
             'count': self.page.paginator.count,
             'results': data
         })
+
+
+def get_estimated_count(queryset):
+    # the planner's row estimate of a queryset from EXPLAIN instead of a COUNT(*) over it;
+    # None on databases other than postgres
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class RowComparison(Func):
+    # (a, b) > (x, y) as a single row comparison, which postgres answers with one range scan of an (a, b) index,
+    # where the equivalent a > x OR (a = x AND b > y) is not matched to the index
+    # https://www.postgresql.org/docs/current/functions-comparisons.html#ROW-WISE-COMPARISON
+    output_field = BooleanField()
+
+    def __init__(self, lhs, operator, rhs):
+        super().__init__(*lhs, *rhs)
+        self.operator = operator
+        self.row_size = len(lhs)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sqls = []
+        params = []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            sqls.append(sql)
+            params.extend(expression_params)
+        return '({lhs}) {operator} ({rhs})'.format(lhs=', '.join(sqls[:self.row_size]), operator=self.operator,
+                                                   rhs=', '.join(sqls[self.row_size:])), params
+
+
+class KeysetPagination(CustomPagination):
+    # CustomPagination unless a request opts in with ?cursor= (empty for the first page); pages then walk the
+    # (created_datetime, pk) index in ascending order with WHERE (created_datetime, pk) > (last row) instead of
+    # OFFSET, and count is null, or the planner's estimate with ?count=estimate, instead of a COUNT(*)
+    # https://use-the-index-luke.com/no-offset
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    keyset_field = 'created_datetime'
+    keyset = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        self.keyset = True
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request.query_params[self.cursor_query_param])
+        reverse = cursor is not None and cursor['reverse']
+        ordering = ['-{field}'.format(field=self.keyset_field), '-pk'] if reverse else [self.keyset_field, 'pk']
+        page_queryset = queryset.order_by(*ordering)
+        if cursor is not None:
+            pk_field = queryset.model._meta.pk
+            try:
+                pk = pk_field.to_python(cursor['pk'])
+            except ValidationError:
+                raise NotFound('Invalid cursor')
+            page_queryset = page_queryset.filter(RowComparison(
+                [F(self.keyset_field), F('pk')], '<' if reverse else '>',
+                [Value(cursor['position'], output_field=DateTimeField()), Value(pk, output_field=pk_field)]))
+        rows = list(page_queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+        self.next_cursor = self.previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                self.next_cursor = self.encode_cursor(rows[-1], reverse=False)
+            if (has_more and reverse) or (cursor is not None and not reverse):
+                self.previous_cursor = self.encode_cursor(rows[0], reverse=True)
+        self.estimated_count = None
+        if request.query_params.get(self.count_query_param) == 'estimate':
+            self.estimated_count = get_estimated_count(queryset)
+        return rows
+
+    def encode_cursor(self, row, reverse):
+        position = getattr(row, self.keyset_field).isoformat()
+        value = json.dumps([position, str(row.pk), int(reverse)]).encode('utf-8')
+        return base64.urlsafe_b64encode(value).decode('ascii')
+
+    def decode_cursor(self, value):
+        if not value:
+            return None
+        try:
+            position, pk, reverse = json.loads(base64.urlsafe_b64decode(value.encode('ascii')))
+            position = parse_datetime(position)
+        except (TypeError, ValueError, UnicodeEncodeError, binascii.Error):
+            raise NotFound('Invalid cursor')
+        if position is None:
+            raise NotFound('Invalid cursor')
+        return {'position': position, 'pk': pk, 'reverse': bool(reverse)}
+
+    def get_cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'links': {
+                'next': self.get_cursor_link(self.next_cursor),
+                'previous': self.get_cursor_link(self.previous_cursor)
+            },
+            'count': self.estimated_count,
+            'results': data
+        })
@@ -1,13 +1,24 @@
+import csv
+import hashlib
+import json
+from collections import OrderedDict
+from io import StringIO
 from tablib import Dataset
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet, Count, Max
+from django.http import StreamingHttpResponse, JsonResponse
+from django.utils.xmlutils import SimplerXMLGenerator
 from django_tables2.export import ExportMixin
 from django_tables2.export.export import TableExport
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework import serializers
-from .models import ProcessLocation, Publication, StandardOperatingProcedure, Project, Fund, DefaultSiteCss, CustomUserCss, ContactUs, MetadataTemplateFile, DefinedTerm
+from .models import ProcessLocation, Publication, StandardOperatingProcedure, Project, Fund, DefaultSiteCss, CustomUserCss, ContactUs, MetadataTemplateFile, DefinedTerm, ExportJob
 from rest_framework.validators import UniqueValidator
 from django.shortcuts import get_object_or_404
 from rest_framework.throttling import UserRateThrottle
 from users.models import CustomUser
-from utility.enumerations import YesNo, SopTypes, DefinedTermTypes, ModuleTypes, ContactUsTypes
+from utility.enumerations import YesNo, SopTypes, DefinedTermTypes, ModuleTypes, ContactUsTypes, JobStatuses
 
 
 class EagerLoadingMixin:
@@ -315,7 +326,7 @@ class CustomUserCssSerializer(serializers.ModelSerializer):
 # These mixed together equates to filtered views with downloadable data FROM the
 # backend dbase rather than the view of the table in HTML.
 class SerializerTableExport(TableExport):
-    def __init__(self, export_format, table, serializer=None, renderer_class=None):
+    def __init__(self, export_format, table, serializer=None, renderer_class=None, exclude_columns=None):
         self.format = export_format
         self.renderer_class = renderer_class
         
@@ -336,11 +347,12 @@ class SerializerTableExport(TableExport):
         # Only build Dataset if not using custom renderer
         # Custom renderers (like ENAXMLRenderer) handle their own data structure
         if not self.renderer_class:
+            exclude_columns = exclude_columns or ()
             self.dataset = Dataset()
             if len(serializer_data) > 0:
-                self.dataset.headers = serializer_data[0].keys()
+                self.dataset.headers = [key for key in serializer_data[0].keys() if key not in exclude_columns]
             for row in serializer_data:
-                self.dataset.append(row.values())
+                self.dataset.append([value for key, value in row.items() if key not in exclude_columns])
         else:
             # Create empty dataset for custom renderers to avoid errors
             self.dataset = Dataset()
@@ -382,16 +394,273 @@ class SerializerTableExport(TableExport):
         return super().response(filename=filename, **kwargs)
 
 
-class SerializerExportMixin(ExportMixin):
-    # export_action_param = 'action'
+class StreamingSerializerExport:
+    # csv, json and xml exports that are written while the queryset is read, instead of building the serialized
+    # list and a tablib Dataset of the whole table first. Rows are fetched with iterator(chunk_size) and serialized
+    # one chunk at a time, so gunicorn memory stays flat regardless of the number of rows exported.
+    # a renderer_class with render_stream(rows), e.g., StreamingENAXMLRenderer, writes any other format from the
+    # same rows.
+    FORMATS = {
+        'csv': 'text/csv; charset=utf-8',
+        'json': 'application/json',
+        'xml': 'application/xml; charset=utf-8',
+    }
+
+    def __init__(self, export_format, table, serializer=None, exclude_columns=None, chunk_size=None, renderer_class=None):
+        if renderer_class is None and not self.is_valid_format(export_format):
+            raise TypeError(
+                'Export format "{}" is not supported.'.format(export_format)
+            )
+        if serializer is None:
+            raise TypeError('Serializer should be provided for table {}'.format(table))
+        self.format = export_format
+        self.renderer_class = renderer_class
+        self.serializer = serializer
+        self.exclude_columns = exclude_columns or ()
+        self.chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+        # table.data.data is the filtered queryset in the table's sort order
+        self.data = table.data.data
+        self.row_count = 0
 
-    def create_export(self, export_format):
+    @classmethod
+    def is_valid_format(cls, export_format):
+        return export_format in cls.FORMATS
+
+    @staticmethod
+    def is_streaming_renderer(renderer_class):
+        return hasattr(renderer_class, 'render_stream')
+
+    def serialize_chunk(self, chunk):
+        self.row_count += len(chunk)
+        for row in self.serializer(chunk, many=True).data:
+            yield OrderedDict((key, value) for key, value in row.items() if key not in self.exclude_columns)
+
+    def rows(self):
+        data = self.data
+        if isinstance(data, QuerySet):
+            if hasattr(self.serializer, 'setup_eager_loading'):
+                # the view's get_queryset may already hold the same Prefetch objects, which would raise when
+                # prefetched twice, so the serializer's lookups replace them
+                data = self.serializer.setup_eager_loading(data.prefetch_related(None))
+            # prefetch_related is applied per chunk when chunk_size is given
+            data = data.iterator(chunk_size=self.chunk_size)
+        chunk = []
+        for obj in data:
+            chunk.append(obj)
+            if len(chunk) == self.chunk_size:
+                yield from self.serialize_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield from self.serialize_chunk(chunk)
+
+    def export_csv(self):
+        # csv.writer returns whatever the buffer's write() returns, so each row is yielded as soon as it is written
+        class Echo:
+            def write(self, value):
+                return value
+        writer = csv.writer(Echo())
+        headers = None
+        for row in self.rows():
+            if headers is None:
+                headers = list(row.keys())
+                yield writer.writerow(headers)
+            yield writer.writerow(row.values())
+
+    def export_json(self):
+        yield '['
+        separator = ''
+        for row in self.rows():
+            yield separator + json.dumps(row, cls=JSONEncoder)
+            separator = ','
+        yield ']'
+
+    def _to_xml(self, xml, value):
+        # same layout as rest_framework_xml's XMLRenderer
+        if isinstance(value, (list, tuple)):
+            for item in value:
+                xml.startElement('list-item', {})
+                self._to_xml(xml, item)
+                xml.endElement('list-item')
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                xml.startElement(key, {})
+                self._to_xml(xml, item)
+                xml.endElement(key)
+        elif value is not None:
+            xml.characters(str(value))
+
+    def export_xml(self):
+        stream = StringIO()
+        xml = SimplerXMLGenerator(stream, 'utf-8')
+        xml.startDocument()
+        xml.startElement('root', {})
+        for count, row in enumerate(self.rows(), start=1):
+            xml.startElement('list-item', {})
+            self._to_xml(xml, row)
+            xml.endElement('list-item')
+            if count % self.chunk_size == 0:
+                yield stream.getvalue()
+                stream.seek(0)
+                stream.truncate()
+        xml.endElement('root')
+        xml.endDocument()
+        yield stream.getvalue()
+
+    def export(self):
+        if self.renderer_class is not None:
+            return self.renderer_class().render_stream(self.rows())
+        return getattr(self, 'export_{}'.format(self.format))()
+
+    @property
+    def content_type(self):
+        if self.renderer_class is not None:
+            return self.renderer_class.media_type
+        return self.FORMATS[self.format]
+
+    def response(self, filename=None):
+        response = StreamingHttpResponse(self.export(), content_type=self.content_type)
+        if filename is not None:
+            response['Content-Disposition'] = 'attachment; filename="{}"'.format(filename)
+        return response
+
+
+def get_export_version(queryset):
+    # row count and latest modified_datetime of the filtered rows; an export job is reused until either changes.
+    # edits to related tables that only show up through the serializer are not picked up.
+    aggregates = {'row_count': Count('pk')}
+    if 'modified_datetime' in [field.name for field in queryset.model._meta.get_fields()]:
+        aggregates['last_modified'] = Max('modified_datetime')
+    version = queryset.order_by().aggregate(**aggregates)
+    return {key: str(value) for key, value in version.items()}
+
+
+class ExportJobMixin:
+    # exports that are requested with ?_export_async=1, or that cover more than EXPORT_ASYNC_THRESHOLD rows, are
+    # written by the run_export_job celery task to private media storage instead of inside the request; the
+    # response is the job status, with a download link once the file is ready
+    export_async_param = '_export_async'
+    async_export = True
+
+    def is_export_format(self, export_format):
+        return (export_format in getattr(self, 'renderer_classes', {}) or
+                StreamingSerializerExport.is_valid_format(export_format) or
+                self.export_class.is_valid_format(export_format))
+
+    def use_export_job(self, export_format):
+        if not self.async_export or not self.is_export_format(export_format):
+            return False
+        if self.request.GET.get(self.export_async_param):
+            return True
+        threshold = settings.EXPORT_ASYNC_THRESHOLD
+        return bool(threshold) and self.get_table_data().count() > threshold
+
+    def prepare_export(self):
+        # set up the filterset and object_list as FilterView.get() does; used when the view is rebuilt by an
+        # export job outside of the request cycle
+        if hasattr(self, 'get_filterset_class'):
+            self.filterset = self.get_filterset(self.get_filterset_class())
+            if not self.filterset.is_bound or self.filterset.is_valid() or not self.get_strict():
+                self.object_list = self.filterset.qs
+            else:
+                self.object_list = self.filterset.queryset.none()
+
+    def get_export_params(self):
+        params = self.request.GET.copy()
+        for param in [self.export_trigger_param, self.export_async_param]:
+            params.pop(param, None)
+        return {key: params.getlist(key) for key in sorted(params.keys())}
+
+    def queue_export_job(self, export_format):
+        # reuse a pending, running or finished job for the same view, format, filter and data; otherwise start one
+        from utility.tasks import run_export_job
+        export_view = self.request.resolver_match.url_name
+        export_params = self.get_export_params()
+        fingerprint = json.dumps([export_view, export_format, export_params, get_export_version(self.get_table_data())],
+                                 sort_keys=True)
+        export_key = hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+        export_job = ExportJob.objects.filter(export_key=export_key).exclude(
+            job_status=JobStatuses.FAILURE).order_by('-created_datetime').first()
+        if export_job is None:
+            export_job = ExportJob.objects.create(export_view=export_view,
+                                                  export_format=export_format,
+                                                  export_params=export_params,
+                                                  export_key=export_key,
+                                                  created_by=self.request.user)
+            transaction.on_commit(run_export_job.s(str(export_job.pk)).delay)
+        return JsonResponse(export_job.get_status(), status=202)
+
+    def write_export(self, export_format, export_file):
+        # write the export to the binary file object export_file; returns (filename, number of rows)
+        table = self.get_table(**self.get_table_kwargs())
+        renderer_class = getattr(self, 'renderer_classes', {}).get(export_format)
+        if renderer_class is None and StreamingSerializerExport.is_valid_format(export_format):
+            exporter = StreamingSerializerExport(
+                export_format=export_format,
+                table=table,
+                serializer=self.serializer_class,
+                exclude_columns=self.exclude_columns,
+            )
+            for chunk in exporter.export():
+                export_file.write(chunk.encode('utf-8'))
+            return self.get_export_filename(export_format), exporter.row_count
+        if StreamingSerializerExport.is_streaming_renderer(renderer_class):
+            exporter = StreamingSerializerExport(
+                export_format=export_format,
+                table=table,
+                serializer=self.serializer_class,
+                exclude_columns=self.exclude_columns,
+                renderer_class=renderer_class,
+            )
+            for chunk in exporter.export():
+                export_file.write(chunk)
+            return '{}.{}'.format(self.export_name, renderer_class.format), exporter.row_count
         exporter = SerializerTableExport(
             export_format=export_format,
-            table=self.get_table(**self.get_table_kwargs()),
+            table=table,
             serializer=self.serializer_class,
+            renderer_class=renderer_class,
             exclude_columns=self.exclude_columns,
         )
+        content = exporter.export()
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        export_file.write(content)
+        if renderer_class is not None:
+            filename = '{}.{}'.format(self.export_name, getattr(renderer_class, 'format', 'dat'))
+        else:
+            filename = self.get_export_filename(export_format)
+        return filename, len(exporter.serializer_data)
+
+
+class SerializerExportMixin(ExportJobMixin, ExportMixin):
+    # export_action_param = 'action'
+    # csv, json and xml exports are streamed in chunks; set to False to build the whole export in memory
+    stream_export = True
+
+    def render_to_response(self, context, **kwargs):
+        export_format = self.request.GET.get(self.export_trigger_param, None)
+        if self.use_export_job(export_format):
+            return self.queue_export_job(export_format)
+        if self.stream_export and StreamingSerializerExport.is_valid_format(export_format):
+            return self.create_export(export_format)
+        return super().render_to_response(context, **kwargs)
+
+    def create_export(self, export_format):
+        table = self.get_table(**self.get_table_kwargs())
+        if self.stream_export and StreamingSerializerExport.is_valid_format(export_format):
+            exporter = StreamingSerializerExport(
+                export_format=export_format,
+                table=table,
+                serializer=self.serializer_class,
+                exclude_columns=self.exclude_columns,
+            )
+        else:
+            exporter = SerializerTableExport(
+                export_format=export_format,
+                table=table,
+                serializer=self.serializer_class,
+                exclude_columns=self.exclude_columns,
+            )
         return exporter.response(filename=self.get_export_filename(export_format))
 
     def get_serializer(self, table):
@@ -410,13 +679,19 @@ class SerializerExportMixin(ExportMixin):
         return super().get_table_data()
 
 
-class CharSerializerExportMixin(ExportMixin):
+class CharSerializerExportMixin(ExportJobMixin, ExportMixin):
     # export_action_param = 'action'
+    # csv, json and xml exports are streamed in chunks; set to False to build the whole export in memory
+    stream_export = True
 
     def render_to_response(self, context, **kwargs):
         """Override to handle custom export formats"""
         export_format = self.request.GET.get(self.export_trigger_param, None)
-        
+
+        # Large or explicitly asynchronous exports are written by a celery job
+        if self.use_export_job(export_format):
+            return self.queue_export_job(export_format)
+
         # Check if it's a custom format with renderer
         if export_format and hasattr(self, 'renderer_classes') and export_format in self.renderer_classes:
             return self.create_export(export_format)
@@ -424,6 +699,10 @@ class CharSerializerExportMixin(ExportMixin):
         # Check if it's a standard format
         if self.export_class.is_valid_format(export_format):
             return self.create_export(export_format)
+
+        # Check if it's a streamed format
+        if self.stream_export and StreamingSerializerExport.is_valid_format(export_format):
+            return self.create_export(export_format)
         
         # Not an export request, render normally
         return super().render_to_response(context, **kwargs)
@@ -445,7 +724,28 @@ class CharSerializerExportMixin(ExportMixin):
         # Get table with filtered data
         # Don't pass data in kwargs since get_table_kwargs() already includes it
         table = self.get_table(**self.get_table_kwargs())
-        
+
+        # Stream csv, json and xml in chunks rather than serializing the whole table at once
+        if renderer_class is None and self.stream_export and StreamingSerializerExport.is_valid_format(export_format):
+            exporter = StreamingSerializerExport(
+                export_format=export_format,
+                table=table,
+                serializer=self.serializer_class,
+                exclude_columns=self.exclude_columns,
+            )
+            return exporter.response(filename=self.get_export_filename(export_format))
+
+        # Renderers that can write from an iterator, e.g., the ENA zip, are streamed from the same chunked rows
+        if self.stream_export and StreamingSerializerExport.is_streaming_renderer(renderer_class):
+            exporter = StreamingSerializerExport(
+                export_format=export_format,
+                table=table,
+                serializer=self.serializer_class,
+                exclude_columns=self.exclude_columns,
+                renderer_class=renderer_class,
+            )
+            return exporter.response(filename='{}.{}'.format(self.get_export_filename(export_format), renderer_class.format))
+
         exporter = SerializerTableExport(
             export_format=export_format,
             table=table,
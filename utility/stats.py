@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+# {name: {'function': returns the chart's json data, 'models': labels of the models it is counted from}}
+DASHBOARD_STATS = {}
+
+
+def get_stat_key(name):
+    return 'dashboard_stat:{name}'.format(name=name)
+
+
+def invalidate_stats(model_label):
+    # drop the cached stats counted from the model once the transaction commits, so the next read does not
+    # cache counts from before the write
+    keys = [get_stat_key(name) for name, config in DASHBOARD_STATS.items() if model_label in config['models']]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_stats_post_save(sender, **kwargs):
+    invalidate_stats(sender._meta.label)
+
+
+def register_stat(name, models):
+    # decorator of a function computing a dashboard chart's data, which is then kept in the cache until a row of
+    # one of models ('app_label.ModelName') is saved or deleted, or refresh_stats() recomputes it
+    def decorator(function):
+        DASHBOARD_STATS[name] = {'function': function, 'models': models}
+        for model_label in models:
+            post_save.connect(invalidate_stats_post_save, sender=model_label,
+                              dispatch_uid='invalidate_stats_save_{model}'.format(model=model_label))
+            post_delete.connect(invalidate_stats_post_save, sender=model_label,
+                                dispatch_uid='invalidate_stats_delete_{model}'.format(model=model_label))
+        return function
+    return decorator
+
+
+def refresh_stat(name):
+    stat = DASHBOARD_STATS[name]['function']()
+    cache.set(get_stat_key(name), stat, settings.STATS_CACHE_TIMEOUT)
+    return stat
+
+
+def refresh_stats(names=None):
+    # recompute and cache every stat, or those named; e.g., by the refresh-dashboard-stats beat task or the
+    # warm_dashboard_stats command
+    names = names or list(DASHBOARD_STATS)
+    for name in names:
+        refresh_stat(name)
+    return names
+
+
+def get_stat(name):
+    stat = cache.get(get_stat_key(name))
+    if stat is None:
+        stat = refresh_stat(name)
+    return stat
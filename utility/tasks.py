@@ -3,8 +3,14 @@ from medna_metadata.celery import app
 from medna_metadata.tasks import BaseTaskWithRetry
 from django.conf import settings
 from django.core.management import call_command
+from django.core.files import File
+from django.http import HttpRequest, QueryDict
+from django.urls import resolve, reverse
 from celery import shared_task
-from utility.models import PeriodicTaskRun
+from utility.models import PeriodicTaskRun, ExportJob, ImportJob
+from utility.enumerations import JobStatuses
+from utility.stats import refresh_stats
+import tempfile
 from django.utils import timezone
 from celery.utils.log import get_task_logger
 logger = get_task_logger(__name__)
@@ -25,3 +31,82 @@ def db_backup(self):
     except Exception as err:
         logger.warning('Could not be backed up: %s' % timezone.now())
         logger.warning(err, exc_info=True)
+
+
+@app.task(bind=True, base=BaseTaskWithRetry, name='refresh-dashboard-stats')
+def refresh_dashboard_stats(self):
+    try:
+        names = refresh_stats()
+        PeriodicTaskRun.objects.update_or_create(task=self.name, defaults={'task_datetime': timezone.now()})
+        logger.info('Refreshed %d dashboard stats: %s' % (len(names), timezone.now()))
+    except Exception as err:
+        logger.warning('Could not refresh dashboard stats: %s' % timezone.now())
+        logger.warning(err, exc_info=True)
+
+
+def get_export_view(export_job):
+    # rebuild the FilterView the export was requested from, with the same user and filter params
+    match = resolve(reverse(export_job.export_view))
+    request = HttpRequest()
+    request.method = 'GET'
+    request.user = export_job.created_by
+    request.GET = QueryDict(mutable=True)
+    for key, values in export_job.export_params.items():
+        request.GET.setlist(key, values)
+    request.resolver_match = match
+    view = match.func.view_class(**match.func.view_initkwargs)
+    view.setup(request, *match.args, **match.kwargs)
+    view.prepare_export()
+    return view
+
+
+@shared_task
+def run_export_job(export_job_pk):
+    try:
+        export_job = ExportJob.objects.select_related('created_by').get(pk=export_job_pk)
+    except ExportJob.DoesNotExist:
+        # Abort
+        logger.warning('Export job was deleted before this task get a chance to be executed [id = %s]' % export_job_pk)
+        return
+    export_job.job_status = JobStatuses.RUNNING
+    export_job.save(update_fields=['job_status', 'modified_datetime'])
+    try:
+        view = get_export_view(export_job)
+        with tempfile.TemporaryFile() as export_file:
+            filename, row_count = view.write_export(export_job.export_format, export_file)
+            export_job.export_datafile.save(filename, File(export_file), save=False)
+        export_job.export_row_count = row_count
+        export_job.job_status = JobStatuses.SUCCESS
+        logger.info('Export job %s: %d rows written to %s' % (export_job_pk, row_count, export_job.export_datafile.name))
+    except Exception as err:
+        export_job.job_status = JobStatuses.FAILURE
+        export_job.job_error = str(err)
+        logger.warning('Export job %s failed' % export_job_pk)
+        logger.warning(err, exc_info=True)
+    export_job.finished_datetime = timezone.now()
+    export_job.save()
+
+
+@shared_task
+def run_import_job(import_job_pk):
+    try:
+        import_job = ImportJob.objects.select_related('created_by').get(pk=import_job_pk)
+    except ImportJob.DoesNotExist:
+        # Abort
+        logger.warning('Import job was deleted before this task get a chance to be executed [id = %s]' % import_job_pk)
+        return
+    import_job.job_status = JobStatuses.RUNNING
+    import_job.save(update_fields=['job_status', 'modified_datetime'])
+    try:
+        # the import view the file was uploaded to reads and imports it, see utility.views.ImportJobMixin
+        view = resolve(reverse(import_job.import_view)).func.view_class()
+        view.run_import(import_job)
+        import_job.job_status = JobStatuses.SUCCESS
+        logger.info('Import job %s: %d rows read from %s' % (import_job_pk, import_job.import_row_count, import_job.import_datafile.name))
+    except Exception as err:
+        import_job.job_status = JobStatuses.FAILURE
+        import_job.job_error = str(err)
+        logger.warning('Import job %s failed' % import_job_pk)
+        logger.warning(err, exc_info=True)
+    import_job.finished_datetime = timezone.now()
+    import_job.save()
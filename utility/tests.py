@@ -1,8 +1,23 @@
-from django.test import TestCase
-from .models import ContactUs, Fund, Project, Publication, ProcessLocation, StandardOperatingProcedure, DefaultSiteCss, CustomUserCss, DefinedTerm
-from utility.enumerations import SopTypes, DefinedTermTypes
+import json
+from urllib.parse import parse_qs, urlparse
+from django import forms
+from django.contrib.auth.models import Permission
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, RequestFactory
+from django.urls import reverse
+from django_tables2 import Table
+from rest_framework.request import Request
+from .models import ExportJob, ImportJob, ContactUs, Fund, Project, Publication, ProcessLocation, StandardOperatingProcedure, DefaultSiteCss, CustomUserCss, DefinedTerm
+from utility.enumerations import SopTypes, DefinedTermTypes, JobStatuses
 from users.tests import UsersManagersTests
 from users.models import CustomUser
+from utility.serializers import FundSerializer, StreamingSerializerExport
+from utility.pagination import KeysetPagination
+from utility.charts import return_month_series_lists
+from utility.stats import DASHBOARD_STATS, register_stat, get_stat, get_stat_key
+from django.core.cache import cache
+from utility.views import Select2AutocompleteView
+from utility.widgets import Select2Autocomplete
 # from django.contrib.auth import get_user_model
 
 
@@ -19,6 +34,197 @@ class FundTestCase(TestCase):
         self.assertIs(medna.was_added_recently(), True)
 
 
+class StreamingSerializerExportTestCase(TestCase):
+    def setUp(self):
+        fund_test = FundTestCase()
+        fund_test.setUp()
+        Fund.objects.get_or_create(fund_code='n', defaults={'fund_label': 'NSF', 'fund_description': 'test description'})
+
+    def test_stream_csv(self):
+        # chunk_size smaller than the table, so rows are serialized over several chunks
+        table = Table(Fund.objects.order_by('fund_code'))
+        exporter = StreamingSerializerExport('csv', table, serializer=FundSerializer, exclude_columns=('id', ), chunk_size=1)
+        lines = ''.join(exporter.export()).splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('fund_code,fund_label'))
+        self.assertTrue(lines[1].startswith('e,Maine-eDNA'))
+
+    def test_stream_json(self):
+        table = Table(Fund.objects.order_by('fund_code'))
+        exporter = StreamingSerializerExport('json', table, serializer=FundSerializer, chunk_size=1)
+        rows = json.loads(''.join(exporter.export()))
+        self.assertEqual([row['fund_code'] for row in rows], ['e', 'n'])
+
+
+class Select2AutocompleteTestCase(TestCase):
+    def setUp(self):
+        fund_test = FundTestCase()
+        fund_test.setUp()
+        Fund.objects.get_or_create(fund_code='n', defaults={'fund_label': 'NSF', 'fund_description': 'test description'})
+        self.user = CustomUser.objects.create_superuser(email='super@user.com', password='foo')
+
+    def test_autocomplete_pages(self):
+        view = Select2AutocompleteView.as_view(model=Fund, text_field='fund_label', paginate_by=1)
+        request = RequestFactory().get('/', {'term': '', 'page': 1})
+        request.user = self.user
+        data = json.loads(view(request).content)
+        self.assertEqual([result['text'] for result in data['results']], ['Maine-eDNA'])
+        self.assertTrue(data['pagination']['more'])
+        request = RequestFactory().get('/', {'term': 'ns', 'page': 1})
+        request.user = self.user
+        data = json.loads(view(request).content)
+        self.assertEqual([result['text'] for result in data['results']], ['NSF'])
+        self.assertFalse(data['pagination']['more'])
+
+    def test_widget_renders_selected(self):
+        # only the selected option is rendered, the rest are paged from the autocomplete url
+        field = forms.ModelChoiceField(queryset=Fund.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'))
+        html = field.widget.render('fund', Fund.objects.get(fund_code='n').pk)
+        self.assertIn('NSF', html)
+        self.assertNotIn('Maine-eDNA', html)
+        self.assertIn('data-ajax--url', html)
+
+
+class MonthSeriesTestCase(TestCase):
+    def setUp(self):
+        fund_test = FundTestCase()
+        fund_test.setUp()
+
+    def test_return_month_series_lists(self):
+        # one label per month with a count per series; an empty series is all zeros
+        labels, data_array = return_month_series_lists((Fund.objects.all(), 'created_datetime'),
+                                                       (Fund.objects.none(), 'created_datetime'))
+        self.assertEqual(len(labels), 1)
+        self.assertEqual(data_array, [[1], [0]])
+        self.assertEqual(return_month_series_lists((Fund.objects.none(), 'created_datetime')), ([], [[]]))
+
+
+class DashboardStatsTestCase(TestCase):
+    def setUp(self):
+        self.stat_calls = []
+        register_stat('test_fund_count', ['utility.Fund'])(self.get_fund_count)
+        cache.delete(get_stat_key('test_fund_count'))
+
+    def tearDown(self):
+        DASHBOARD_STATS.pop('test_fund_count')
+
+    def get_fund_count(self):
+        self.stat_calls.append(1)
+        return {'data': Fund.objects.count()}
+
+    def test_get_stat(self):
+        # computed once, then read from the cache until a fund is saved
+        self.assertEqual(get_stat('test_fund_count'), {'data': 0})
+        self.assertEqual(get_stat('test_fund_count'), {'data': 0})
+        self.assertEqual(len(self.stat_calls), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            FundTestCase().setUp()
+        self.assertEqual(get_stat('test_fund_count'), {'data': 1})
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        fund_test = FundTestCase()
+        fund_test.setUp()
+        Fund.objects.get_or_create(fund_code='n', defaults={'fund_label': 'NSF', 'fund_description': 'test description'})
+
+    def get_page(self, params):
+        paginator = KeysetPagination()
+        paginator.page_size = 1
+        request = Request(RequestFactory().get('/', params))
+        rows = paginator.paginate_queryset(Fund.objects.all(), request)
+        return rows, paginator.get_paginated_response([row.fund_code for row in rows]).data
+
+    def test_cursor_walk(self):
+        # pages follow the created_datetime, pk index and link to each other by cursor
+        rows, data = self.get_page({'cursor': ''})
+        self.assertEqual(len(rows), 1)
+        self.assertIsNone(data['count'])
+        self.assertIsNone(data['links']['previous'])
+        next_cursor = parse_qs(urlparse(data['links']['next']).query)['cursor'][0]
+        next_rows, next_data = self.get_page({'cursor': next_cursor})
+        self.assertEqual(len(next_rows), 1)
+        self.assertNotEqual(next_rows[0].pk, rows[0].pk)
+        self.assertIsNone(next_data['links']['next'])
+        previous_cursor = parse_qs(urlparse(next_data['links']['previous']).query)['cursor'][0]
+        previous_rows, previous_data = self.get_page({'cursor': previous_cursor})
+        self.assertEqual([row.pk for row in previous_rows], [row.pk for row in rows])
+
+    def test_page_number_fallback(self):
+        # without ?cursor= the viewsets keep their page number pagination and exact count
+        rows, data = self.get_page({})
+        self.assertEqual(data['count'], 2)
+
+
+class ExportJobTestCase(TestCase):
+    def setUp(self):
+        ExportJob.objects.create(export_view='view_fieldsite', export_format='csv', export_key='test')
+
+    def test_get_status(self):
+        # the download link is only handed out once the file is written
+        export_job = ExportJob.objects.get(export_key='test')
+        self.assertIsNone(export_job.get_status()['download_url'])
+        export_job.job_status = JobStatuses.SUCCESS
+        self.assertTrue(export_job.get_status()['download_url'].endswith('/download/'))
+
+    def test_reuse(self):
+        # the same export of the same rows is handed the job already queued for it; another filter gets its own
+        user = CustomUser.objects.create_superuser(email='super@user.com', password='foo')
+        self.client.force_login(user)
+        url = reverse('view_fieldsite') + '?_export=csv&_export_async=1'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.client.get(url).json()['uuid'], response.json()['uuid'])
+        self.assertNotEqual(self.client.get(url + '&site_id=missing').json()['uuid'], response.json()['uuid'])
+        self.assertEqual(ExportJob.objects.filter(export_view='view_fieldsite', created_by=user).count(), 2)
+
+    def test_download_permission(self):
+        # an export may only be downloaded by users with the permission of the view it was exported from
+        export_job = ExportJob.objects.get(export_key='test')
+        download_url = reverse('download_exportjob', kwargs={'pk': export_job.pk})
+        user = CustomUser.objects.create_user(email='other@user.com', password='foo')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(download_url).status_code, 403)
+        user.user_permissions.add(Permission.objects.get(content_type__app_label='field_site', codename='view_fieldsite'))
+        self.client.force_login(CustomUser.objects.get(pk=user.pk))
+        # past the permission check, a job that is not finished has nothing to download
+        self.assertEqual(self.client.get(download_url).status_code, 404)
+
+
+class ImportJobTestCase(TestCase):
+    def setUp(self):
+        ImportJob.objects.create(import_view='import_fieldsample', import_format='CSV',
+                                 import_datafile='imports/test/fieldsample.csv')
+
+    def test_get_status(self):
+        # progress is reported while the job runs; row errors are counted in the status
+        import_job = ImportJob.objects.get(import_view='import_fieldsample')
+        import_job.import_row_count = 4
+        import_job.import_rows_done = 2
+        import_job.import_errors = ["Row 1: FieldSite 'missing' not found"]
+        status = import_job.get_status()
+        self.assertEqual(status['import_filename'], 'fieldsample.csv')
+        self.assertEqual(status['import_error_count'], 1)
+        self.assertFalse(import_job.is_finished)
+        self.assertTrue(status['detail_url'].startswith('/'))
+
+    def test_upload(self):
+        # an upload to an import view whose permission_required is a string is queued, and its job page and
+        # status can be read by the uploader but not by a user without the permission
+        user = CustomUser.objects.create_superuser(email='super@user.com', password='foo')
+        self.client.force_login(user)
+        import_file = SimpleUploadedFile('fieldsample.csv', b'site_id,field_sample_barcode,sample_type\n',
+                                         content_type='text/csv')
+        response = self.client.post(reverse('import_fieldsample'), {'input_format': '0', 'import_file': import_file})
+        import_job = ImportJob.objects.get(import_view='import_fieldsample', created_by=user)
+        self.assertRedirects(response, reverse('detail_importjob', kwargs={'pk': import_job.pk}), fetch_redirect_response=False)
+        self.assertEqual(self.client.get(reverse('detail_importjob', kwargs={'pk': import_job.pk})).status_code, 200)
+        response = self.client.get(reverse('status_importjob', kwargs={'pk': import_job.pk}))
+        self.assertEqual(response.json()['job_status'], JobStatuses.PENDING)
+        self.client.force_login(CustomUser.objects.create_user(email='other@user.com', password='foo'))
+        self.assertEqual(self.client.get(reverse('status_importjob', kwargs={'pk': import_job.pk})).status_code, 403)
+
+
 class ProjectTestCase(TestCase):
     # formerly Project in field_site.models
     def setUp(self):
@@ -1,8 +1,11 @@
 import django
-from django.db.models import F, BLANK_CHOICE_DASH
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F, Q, BLANK_CHOICE_DASH
 from django.urls import reverse
-from django.shortcuts import redirect
-from django.views.generic import DetailView
+from django.shortcuts import redirect, render
+from django.views.generic import DetailView, View
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.contrib.admin.options import IS_POPUP_VAR
@@ -11,19 +14,23 @@ from django.core.exceptions import PermissionDenied
 from django.views.generic.base import TemplateView
 from django.views.generic.edit import CreateView, UpdateView
 from django.template.response import SimpleTemplateResponse
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse, Http404
+from django.urls import resolve
 from django.utils import timezone
 try:
     from django.utils.encoding import force_text
 except ImportError:
     from django.utils.encoding import force_str as force_text
+import hashlib
 import json
+import os
 import sys
 from django_filters import rest_framework as filters
 from rest_framework import viewsets
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from import_export.formats.base_formats import CSV, XLS, XLSX
 from .charts import return_select2_options
 import utility.models as utility_models
 from utility.forms import PublicationForm, StandardOperatingProcedureForm, DefinedTermForm, \
@@ -144,6 +151,197 @@ def get_project_options(request):
     return JsonResponse(data={'results': qs_json})
 
 
+class Select2AutocompleteView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    # ajax backend of utility.widgets.Select2Autocomplete; ?term=<search>&page=<n> returns one page of
+    # {'results': [{'id': ..., 'text': ...}], 'pagination': {'more': bool}} matched by icontains on search_fields
+    # one extra row is read to tell if there is a next page, so no COUNT runs on large tables
+    # configured per model in urls.py, e.g., Select2AutocompleteView.as_view(model=Extraction, text_field='barcode_slug')
+    model = None
+    # label column; with id_field=text_field the distinct values of a column are listed, e.g., ta_genus
+    text_field = None
+    id_field = 'pk'
+    search_fields = None
+    # defaults to text_field, id_field
+    ordering = None
+    # defaults to the view permission of the model
+    permission_required = None
+    paginate_by = settings.SELECT2_PAGE_SIZE
+    # seconds a page is cached per user and search term; 0 always queries
+    cache_timeout = 0
+
+    def get_permission_required(self):
+        if self.permission_required is None:
+            return ('{app_label}.view_{model_name}'.format(app_label=self.model._meta.app_label,
+                                                          model_name=self.model._meta.model_name), )
+        return super().get_permission_required()
+
+    def get_base_queryset(self):
+        # override to scope the options, e.g., to rows without an extraction or created by request.user
+        return self.model.objects.all()
+
+    def get_queryset(self):
+        queryset = self.get_base_queryset()
+        term = self.request.GET.get('term', '').strip()
+        if term:
+            query = Q()
+            for search_field in self.search_fields or [self.text_field]:
+                query |= Q(**{'{field}__icontains'.format(field=search_field): term})
+            queryset = queryset.filter(query)
+        if self.id_field == self.text_field:
+            return queryset.exclude(**{self.text_field: ''}).values_list(self.text_field, flat=True).distinct().order_by(self.text_field)
+        return queryset.values_list(self.id_field, self.text_field).order_by(*(self.ordering or [self.text_field, self.id_field]))
+
+    def get_page(self, page):
+        offset = (page - 1) * self.paginate_by
+        rows = list(self.get_queryset()[offset:offset + self.paginate_by + 1])
+        if self.id_field == self.text_field:
+            rows = [(row, row) for row in rows]
+        return {'results': [{'id': pk, 'text': text} for pk, text in rows[:self.paginate_by]],
+                'pagination': {'more': len(rows) > self.paginate_by}}
+
+    def get(self, request, *args, **kwargs):
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        if not self.cache_timeout:
+            return JsonResponse(data=self.get_page(page))
+        key = 'select2:{path}:{user}:{page}:{term}'.format(
+            path=request.path, user=request.user.pk, page=page,
+            term=hashlib.md5(request.GET.get('term', '').strip().encode('utf-8')).hexdigest())
+        data = caches['views'].get(key)
+        if data is None:
+            data = self.get_page(page)
+            caches['views'].set(key, data, self.cache_timeout)
+        return JsonResponse(data=data)
+
+
+def get_view_permissions(view_class):
+    # permission_required of a view as a tuple, as PermissionRequiredMixin.get_permission_required reads it;
+    # has_perms() rejects a single permission string
+    permission_required = getattr(view_class, 'permission_required', None) or ()
+    if isinstance(permission_required, str):
+        return (permission_required, )
+    return tuple(permission_required)
+
+
+def get_export_job_or_404(request, pk):
+    # export files may only be read by users who may open the view they were exported from
+    export_job = get_object_or_404(utility_models.ExportJob, pk=pk)
+    export_view = resolve(reverse(export_job.export_view)).func.view_class
+    if not request.user.has_perms(get_view_permissions(export_view)):
+        raise PermissionDenied
+    return export_job
+
+
+@login_required(login_url='dashboard_login')
+def export_job_status(request, pk):
+    export_job = get_export_job_or_404(request, pk)
+    return JsonResponse(data=export_job.get_status())
+
+
+@login_required(login_url='dashboard_login')
+def export_job_download(request, pk):
+    export_job = get_export_job_or_404(request, pk)
+    if export_job.job_status != utility_enums.JobStatuses.SUCCESS:
+        raise Http404('Export is not ready')
+    return FileResponse(export_job.export_datafile.open('rb'), as_attachment=True, filename=export_job.export_filename)
+
+
+class ImportJobMixin:
+    # import views whose uploads are imported by the run_import_job celery task instead of inside the request;
+    # import_class reads a chunk of rows for a user, e.g., field_survey.imports.FieldSampleImport, and the
+    # browser is sent to the job page, which follows the job's progress until its row errors can be listed.
+    # a dry run validates the file with import_class's run(dry_run=True) and writes nothing
+    import_class = None
+    formats = [CSV, XLS, XLSX]
+
+    def queue_import_job(self, import_file, input_format, dry_run=False):
+        from utility.tasks import run_import_job
+        import_job = utility_models.ImportJob(import_view=self.request.resolver_match.url_name,
+                                              import_format=type(input_format).__name__,
+                                              import_dry_run=dry_run,
+                                              created_by=self.request.user)
+        import_job.import_datafile.save(os.path.basename(import_file.name), import_file, save=False)
+        import_job.save()
+        transaction.on_commit(run_import_job.s(str(import_job.pk)).delay)
+        return redirect('detail_importjob', pk=import_job.pk)
+
+    def read_import_rows(self, import_job):
+        input_format = {import_format.__name__: import_format for import_format in self.formats}[import_job.import_format]()
+        with import_job.import_datafile.open('rb') as import_file:
+            data = import_file.read()
+        if isinstance(input_format, CSV):
+            data = data.decode('utf-8')
+        return input_format.create_dataset(data).dict
+
+    def run_import(self, import_job):
+        # each chunk is imported and committed on its own, then the job's counts and row errors are saved.
+        # a dry run reads the whole file as one chunk, since rows of a later chunk may depend on rows of an
+        # earlier one that it does not write
+        rows = self.read_import_rows(import_job)
+        import_job.import_row_count = len(rows)
+        import_job.save(update_fields=['import_row_count', 'modified_datetime'])
+        chunk_size = max(len(rows), 1) if import_job.import_dry_run else settings.IMPORT_JOB_CHUNK_SIZE
+        for offset in range(0, len(rows), chunk_size):
+            chunk_import = self.import_class(rows[offset:offset + chunk_size], import_job.created_by,
+                                             row_offset=offset).run(dry_run=import_job.import_dry_run)
+            import_job.import_rows_done = min(offset + chunk_size, len(rows))
+            import_job.import_created_count += chunk_import.created_count
+            import_job.import_updated_count += chunk_import.updated_count
+            import_job.import_skipped_count += chunk_import.skipped_count
+            import_job.import_errors = import_job.import_errors + chunk_import.errors
+            import_job.import_column_errors = merge_column_errors(import_job.import_column_errors,
+                                                                  chunk_import.get_column_errors())
+            import_job.save(update_fields=['import_rows_done', 'import_created_count', 'import_updated_count',
+                                           'import_skipped_count', 'import_errors', 'import_column_errors',
+                                           'modified_datetime'])
+            if chunk_import.missing_columns:
+                # every chunk has the same header
+                break
+        return import_job
+
+
+def merge_column_errors(column_errors, other_column_errors, max_rows=10):
+    # per column error summaries of two chunks of a file as one, with the first max_rows row numbers and messages
+    merged = {summary['column']: dict(summary) for summary in column_errors}
+    for summary in other_column_errors:
+        if summary['column'] not in merged:
+            merged[summary['column']] = dict(summary)
+            continue
+        merged_summary = merged[summary['column']]
+        merged_summary['error_count'] += summary['error_count']
+        merged_summary['rows'] = (merged_summary['rows'] + summary['rows'])[:max_rows]
+        merged_summary['messages'] = (merged_summary['messages'] +
+                                      [message for message in summary['messages'] if message not in merged_summary['messages']])[:max_rows]
+    return list(merged.values())
+
+
+def get_import_job_or_404(request, pk):
+    # import jobs may only be read by users who may use the view they were uploaded to
+    import_job = get_object_or_404(utility_models.ImportJob, pk=pk)
+    import_view = resolve(reverse(import_job.import_view)).func.view_class
+    if not request.user.has_perms(get_view_permissions(import_view)):
+        raise PermissionDenied
+    return import_job
+
+
+@login_required(login_url='dashboard_login')
+def import_job_status(request, pk):
+    import_job = get_import_job_or_404(request, pk)
+    return JsonResponse(data=import_job.get_status())
+
+
+@login_required(login_url='dashboard_login')
+def import_job_detail(request, pk):
+    import_job = get_import_job_or_404(request, pk)
+    context = {'segment': import_job.import_view,
+               'page_title': 'Import Job',
+               'import_job': import_job,
+               'import_status': import_job.get_status()}
+    return render(request, 'home/django-material-dashboard/model-detail-importjob.html', context)
+
+
 @login_required(login_url='dashboard_login')
 def contact_us_list(request):
     contactus_list = utility_models.ContactUs.objects.only('id', 'full_name', 'contact_email', 'contact_context', 'contact_type', 'replied', 'replied_context', 'replied_datetime')
@@ -4,7 +4,8 @@ from django.contrib.admin.views.main import IS_POPUP_VAR
 from django.contrib.admin.widgets import AdminDateWidget, AdminTimeWidget, AdminSplitDateTime, RelatedFieldWidgetWrapper
 from django.template.loader import render_to_string
 from django.template import loader
-from django.urls import reverse_lazy
+from django.core.exceptions import ValidationError
+from django.urls import reverse, reverse_lazy
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext as _
 # from django.template.loader import render_to_string
@@ -54,6 +55,49 @@ class CustomSelect2Multiple(forms.SelectMultiple):
         super(CustomSelect2Multiple, self).__init__(*args, **kwargs)
 
 
+class Select2AutocompleteMixin:
+    # options are paged from utility.views.Select2AutocompleteView at url while typing; only the selected
+    # options are rendered, so page weight does not grow with the table behind the filter
+    def __init__(self, url, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.url = url
+        self.attrs['class'] = 'js-select2-autocomplete form-control'
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-ajax--url'] = reverse(self.url)
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [str(v) for v in value if v not in (None, '')]
+        field = getattr(self.choices, 'field', None)
+        if field is None:
+            # plain values, e.g., a CharFilter over a column's distinct values
+            choices = [('', '---------')] + [(v, v) for v in selected]
+        else:
+            choices = [('', field.empty_label)] if getattr(field, 'empty_label', None) is not None else []
+            if selected:
+                try:
+                    objs = self.choices.queryset.filter(**{'{key}__in'.format(key=field.to_field_name or 'pk'): selected})
+                    choices += [self.choices.choice(obj) for obj in objs]
+                except (ValueError, ValidationError):
+                    # invalid submitted value; the form reports it
+                    pass
+        original_choices, self.choices = self.choices, choices
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = original_choices
+
+
+class Select2Autocomplete(Select2AutocompleteMixin, CustomSelect2):
+    pass
+
+
+class Select2AutocompleteMultiple(Select2AutocompleteMixin, CustomSelect2Multiple):
+    pass
+
+
 class CustomAdminDateWidget(AdminDateWidget):
     # https://stackoverflow.com/questions/61077802/how-to-use-a-datepicker-in-a-modelform-in-django/69108038#69108038
     class Media:
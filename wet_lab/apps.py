@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class WetLabConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'wet_lab'
+
+    def ready(self):
+        import wet_lab.stats
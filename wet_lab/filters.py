@@ -1,6 +1,6 @@
 from django import forms
 from django_filters import rest_framework as filters
-from utility.widgets import CustomSelect2Multiple, CustomSelect2
+from utility.widgets import CustomSelect2Multiple, CustomSelect2, Select2Autocomplete
 from utility.enumerations import PcrTypes, LibPrepKits, LibPrepTypes, LibLayouts, YesNo, InvestigationTypes, SeqMethods, SamplingMethods
 from utility.models import ProcessLocation, Project
 from users.models import CustomUser
@@ -17,7 +17,7 @@ from .models import PrimerPair, IndexPair, IndexRemovalMethod, SizeSelectionMeth
 # FRONTEND FILTERS                   #
 ########################################
 class ExtractionFilter(filters.FilterSet):
-    barcode_slug = filters.ModelChoiceFilter(queryset=Extraction.objects.all(), widget=CustomSelect2)
+    barcode_slug = filters.ModelChoiceFilter(queryset=Extraction.objects.all(), widget=Select2Autocomplete(url='autocomplete_extraction'))
     extraction_method = filters.ModelChoiceFilter(field_name='extraction_method__extraction_method_slug', queryset=ExtractionMethod.objects.all(), widget=CustomSelect2)
     extraction_control = filters.CharFilter(field_name='extraction_control', lookup_expr='iexact')
     extraction_datetime = filters.DateFilter(input_formats=['%Y-%m-%d', '%d-%m-%Y'], lookup_expr='icontains', widget=forms.SelectDateWidget(attrs={'class': 'form-control', }))
@@ -38,12 +38,12 @@ def get_pcr_experiment_name_choices(model=Pcr, field='pcr_experiment_name'):
 
 
 class PcrFilter(filters.FilterSet):
-    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=CustomSelect2)
+    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'))
     pcr_experiment_name = filters.ChoiceFilter(choices=get_pcr_experiment_name_choices, widget=CustomSelect2)
     pcr_type = filters.ChoiceFilter(field_name='pcr_type', choices=PcrTypes.choices, widget=CustomSelect2)
     pcr_datetime = filters.DateFilter(input_formats=['%Y-%m-%d', '%d-%m-%Y'], lookup_expr='icontains', widget=forms.SelectDateWidget(attrs={'class': 'form-control', }))
     process_location = filters.ModelChoiceFilter(field_name='process_location__process_location_name', queryset=ProcessLocation.objects.all(), widget=CustomSelect2)
-    extraction = filters.ModelChoiceFilter(field_name='extraction__barcode_slug', queryset=Extraction.objects.all(), widget=CustomSelect2)
+    extraction = filters.ModelChoiceFilter(field_name='extraction__barcode_slug', queryset=Extraction.objects.all(), widget=Select2Autocomplete(url='autocomplete_extraction'))
     primer_set = filters.ModelChoiceFilter(field_name='primer_set__primer_slug', queryset=PrimerPair.objects.all(), widget=CustomSelect2)
 
     class Meta:
@@ -62,11 +62,11 @@ def get_lib_prep_experiment_name_choices(model=LibraryPrep, field='lib_prep_expe
 
 
 class LibraryPrepFilter(filters.FilterSet):
-    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=CustomSelect2)
+    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'))
     lib_prep_experiment_name = filters.ChoiceFilter(choices=get_lib_prep_experiment_name_choices, widget=CustomSelect2)
     lib_prep_datetime = filters.DateFilter(input_formats=['%Y-%m-%d', '%d-%m-%Y'], lookup_expr='icontains', widget=forms.SelectDateWidget(attrs={'class': 'form-control', }))
     process_location = filters.ModelChoiceFilter(field_name='process_location__process_location_name', queryset=ProcessLocation.objects.all(), widget=CustomSelect2)
-    extraction = filters.ModelChoiceFilter(field_name='extraction__barcode_slug', queryset=Extraction.objects.all(), widget=CustomSelect2)
+    extraction = filters.ModelChoiceFilter(field_name='extraction__barcode_slug', queryset=Extraction.objects.all(), widget=Select2Autocomplete(url='autocomplete_extraction'))
     primer_set = filters.ModelChoiceFilter(field_name='primer_set__primer_slug', queryset=PrimerPair.objects.all(), widget=CustomSelect2)
     size_selection_method = filters.ModelChoiceFilter(field_name='size_selection_method__size_selection_method_slug', queryset=LibraryPrep.objects.all(), widget=CustomSelect2)
     index_removal_method = filters.ModelChoiceFilter(field_name='index_removal_method__index_removal_method_slug', queryset=LibraryPrep.objects.all(), widget=CustomSelect2)
@@ -95,11 +95,11 @@ def get_pooled_lib_label_choices(model=PooledLibrary, field='pooled_lib_label'):
 
 
 class PooledLibraryFilter(filters.FilterSet):
-    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=CustomSelect2)
+    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'))
     pooled_lib_label = filters.ChoiceFilter(choices=get_pooled_lib_label_choices, widget=CustomSelect2)
     pooled_lib_datetime = filters.DateFilter(input_formats=['%Y-%m-%d', '%d-%m-%Y'], lookup_expr='icontains', widget=forms.SelectDateWidget(attrs={'class': 'form-control', }))
     process_location = filters.ModelChoiceFilter(field_name='process_location__process_location_name', queryset=ProcessLocation.objects.all(), widget=CustomSelect2)
-    barcode_slug = filters.ModelChoiceFilter(field_name='barcode_slug', queryset=CustomUser.objects.all(), widget=CustomSelect2)
+    barcode_slug = filters.ModelChoiceFilter(field_name='barcode_slug', queryset=CustomUser.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'))
     library_prep = filters.ModelChoiceFilter(field_name='library_prep__lib_prep_slug', queryset=LibraryPrep.objects.all(), widget=CustomSelect2)
 
     class Meta:
@@ -118,7 +118,7 @@ def get_run_prep_label_choices(model=RunPrep, field='run_prep_label'):
 
 
 class RunPrepFilter(filters.FilterSet):
-    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=CustomSelect2)
+    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'))
     run_prep_label = filters.ChoiceFilter(choices=get_run_prep_label_choices, widget=CustomSelect2)
     run_prep_datetime = filters.DateFilter(input_formats=['%Y-%m-%d', '%d-%m-%Y'], lookup_expr='icontains', widget=forms.SelectDateWidget(attrs={'class': 'form-control', }))
     pooled_library = filters.ModelChoiceFilter(field_name='pooled_library__pooled_lib_slug', queryset=LibraryPrep.objects.all(), widget=CustomSelect2)
@@ -158,7 +158,7 @@ def get_run_instrument_choices(model=RunResult, field='run_instrument'):
 
 
 class RunResultFilter(filters.FilterSet):
-    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=CustomSelect2)
+    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'))
     run_experiment_name = filters.ChoiceFilter(choices=get_run_experiment_name_choices, widget=CustomSelect2)
     run_id = filters.ChoiceFilter(choices=get_run_id_choices, widget=CustomSelect2)
     run_date = filters.DateFilter(input_formats=['%Y-%m-%d', '%d-%m-%Y'], lookup_expr='icontains', widget=forms.SelectDateWidget(attrs={'class': 'form-control', }))
@@ -174,9 +174,9 @@ class RunResultFilter(filters.FilterSet):
 
 
 class FastqFileFilter(filters.FilterSet):
-    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=CustomSelect2)
+    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'))
     run_result = filters.ModelChoiceFilter(field_name='run_result__run_id', queryset=RunResult.objects.all(), widget=CustomSelect2)
-    extraction = filters.ModelChoiceFilter(field_name='extraction__barcode_slug', queryset=Extraction.objects.all(), widget=CustomSelect2)
+    extraction = filters.ModelChoiceFilter(field_name='extraction__barcode_slug', queryset=Extraction.objects.all(), widget=Select2Autocomplete(url='autocomplete_extraction'))
     primer_set = filters.ModelChoiceFilter(field_name='primer_set__primer_slug', queryset=PrimerPair.objects.all(), widget=CustomSelect2)
     submitted_to_insdc = filters.ChoiceFilter(field_name='submitted_to_insdc', choices=YesNo.choices, widget=CustomSelect2)
     seq_meth = filters.ChoiceFilter(field_name='seq_meth', choices=SeqMethods.choices, widget=CustomSelect2)
@@ -188,7 +188,7 @@ class FastqFileFilter(filters.FilterSet):
 
 
 class MixsWaterFilter(filters.FilterSet):
-    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=CustomSelect2)
+    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'))
     barcode_slug = filters.CharFilter(field_name='barcode_slug', lookup_expr='icontains')
     sample_type = filters.ModelChoiceFilter(field_name='sample_type', queryset=SampleType.objects.all(), widget=CustomSelect2)
     project_name = filters.ModelChoiceFilter(field_name='survey_global_id__project_ids', 
@@ -197,7 +197,7 @@ class MixsWaterFilter(filters.FilterSet):
                                               label='Project Name')
     site_id = filters.ModelChoiceFilter(field_name='survey_global_id__site_id',
                                         queryset=FieldSite.objects.all(),
-                                        widget=CustomSelect2,
+                                        widget=Select2Autocomplete(url='autocomplete_fieldsite'),
                                         label='Site')
 
     class Meta:
@@ -207,7 +207,7 @@ class MixsWaterFilter(filters.FilterSet):
 
 
 class MixsSedimentFilter(filters.FilterSet):
-    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=CustomSelect2)
+    created_by = filters.ModelChoiceFilter(field_name='created_by__email', queryset=CustomUser.objects.all(), widget=Select2Autocomplete(url='autocomplete_user'))
     barcode_slug = filters.CharFilter(field_name='barcode_slug', lookup_expr='icontains')
     sample_type = filters.ModelChoiceFilter(field_name='sample_type', queryset=SampleType.objects.all(), widget=CustomSelect2)
     sampling_method = filters.ChoiceFilter(field_name='sampling_method', choices=SamplingMethods.choices, widget=CustomSelect2)
@@ -423,28 +423,30 @@ class FastqFileSerializerFilter(filters.FilterSet):
 
 
 class MixsWaterSerializerFilter(filters.FilterSet):
+    # the MIxS endpoints list field samples; fastq file filters match samples with at least one matching file
     created_by = filters.CharFilter(field_name='created_by__email', lookup_expr='iexact')
-    uuid = filters.CharFilter(field_name='uuid', lookup_expr='iexact')
-    run_result = filters.CharFilter(field_name='run_result__run_id', lookup_expr='iexact')
+    uuid = filters.CharFilter(field_name='extraction__extractions__uuid', lookup_expr='iexact', distinct=True)
+    run_result = filters.CharFilter(field_name='extraction__extractions__run_result__run_id', lookup_expr='iexact', distinct=True)
     extraction = filters.CharFilter(field_name='extraction__barcode_slug', lookup_expr='iexact')
-    primer_set = filters.CharFilter(field_name='primer_set__primer_slug', lookup_expr='iexact')
-    fastq_slug = filters.CharFilter(field_name='fastq_slug', lookup_expr='iexact')
-    submitted_to_insdc = filters.CharFilter(field_name='submitted_to_insdc', lookup_expr='iexact')
+    primer_set = filters.CharFilter(field_name='extraction__extractions__primer_set__primer_slug', lookup_expr='iexact', distinct=True)
+    fastq_slug = filters.CharFilter(field_name='extraction__extractions__fastq_slug', lookup_expr='iexact', distinct=True)
+    submitted_to_insdc = filters.CharFilter(field_name='extraction__extractions__submitted_to_insdc', lookup_expr='iexact', distinct=True)
 
     class Meta:
-        model = FastqFile
+        model = FieldSample
         fields = ['created_by', 'uuid', 'run_result', 'extraction', 'primer_set', 'fastq_slug', 'submitted_to_insdc', ]
 
 
 class MixsSedimentSerializerFilter(filters.FilterSet):
+    # the MIxS endpoints list field samples; fastq file filters match samples with at least one matching file
     created_by = filters.CharFilter(field_name='created_by__email', lookup_expr='iexact')
-    uuid = filters.CharFilter(field_name='uuid', lookup_expr='iexact')
-    run_result = filters.CharFilter(field_name='run_result__run_id', lookup_expr='iexact')
+    uuid = filters.CharFilter(field_name='extraction__extractions__uuid', lookup_expr='iexact', distinct=True)
+    run_result = filters.CharFilter(field_name='extraction__extractions__run_result__run_id', lookup_expr='iexact', distinct=True)
     extraction = filters.CharFilter(field_name='extraction__barcode_slug', lookup_expr='iexact')
-    primer_set = filters.CharFilter(field_name='primer_set__primer_slug', lookup_expr='iexact')
-    fastq_slug = filters.CharFilter(field_name='fastq_slug', lookup_expr='iexact')
-    submitted_to_insdc = filters.CharFilter(field_name='submitted_to_insdc', lookup_expr='iexact')
+    primer_set = filters.CharFilter(field_name='extraction__extractions__primer_set__primer_slug', lookup_expr='iexact', distinct=True)
+    fastq_slug = filters.CharFilter(field_name='extraction__extractions__fastq_slug', lookup_expr='iexact', distinct=True)
+    submitted_to_insdc = filters.CharFilter(field_name='extraction__extractions__submitted_to_insdc', lookup_expr='iexact', distinct=True)
 
     class Meta:
-        model = FastqFile
+        model = FieldSample
         fields = ['created_by', 'uuid', 'run_result', 'extraction', 'primer_set', 'fastq_slug', 'submitted_to_insdc', ]
@@ -5,7 +5,8 @@ from django.contrib.gis import forms
 from django.db.models import Exists, OuterRef
 from django.db.models.query_utils import Q
 from utility.widgets import CustomRadioSelect, CustomSelect2, CustomSelect2Multiple, \
-    CustomAdminDateWidget, CustomAdminSplitDateTime, AddAnotherWidgetWrapper, CustomClearableFileInput
+    CustomAdminDateWidget, CustomAdminSplitDateTime, AddAnotherWidgetWrapper, CustomClearableFileInput, \
+    Select2Autocomplete, Select2AutocompleteMultiple
 from utility.models import ProcessLocation, StandardOperatingProcedure
 from utility.enumerations import VolUnits, ConcentrationUnits, PcrTypes, PcrUnits, ControlTypes, \
     LibPrepKits, LibPrepTypes, LibLayouts, YesNo, InvestigationTypes, SeqMethods, SopTypes
@@ -85,11 +86,7 @@ class ExtractionForm(forms.ModelForm):
         required=True,
         label='Extraction Barcode',
         queryset=SampleBarcode.objects.none(),
-        widget=CustomSelect2(
-            attrs={
-                'class': 'form-control',
-            }
-        )
+        widget=Select2Autocomplete(url='autocomplete_unassigned_samplebarcode')
     )
     process_location = forms.ModelChoiceField(
         required=True,
@@ -109,11 +106,7 @@ class ExtractionForm(forms.ModelForm):
     field_sample = forms.ModelChoiceField(
         required=True,
         queryset=FieldSample.objects.none(),
-        widget=CustomSelect2(
-            attrs={
-                'class': 'form-control',
-            }
-        )
+        widget=Select2Autocomplete(url='autocomplete_unassigned_fieldsample')
     )
     extraction_control = forms.ChoiceField(
         required=True,
@@ -236,6 +229,7 @@ class ExtractionForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # options are paged by the autocomplete urls; these querysets only validate the submitted value
         self.fields['field_sample'].queryset = FieldSample.objects.filter(Q(extraction__isnull=True) | Q(extraction=self.instance))
         self.fields['extraction_barcode'].queryset = SampleBarcode.objects.filter(Q(extraction__isnull=True) | Q(extraction=self.instance))
 
@@ -470,10 +464,10 @@ class PcrCreateForm(forms.ModelForm):
         # filter form options by currently logged in user
         _user = kwargs.pop('user')
         super().__init__(*args, **kwargs)
-        self.fields['pcr_replicate'].widget = (AddAnotherWidgetWrapper(CustomSelect2Multiple(attrs={'class': 'form-control', }), reverse_lazy('add_popup_pcrreplicate')))
+        self.fields['pcr_replicate'].widget = (AddAnotherWidgetWrapper(Select2AutocompleteMultiple(url='autocomplete_user_pcrreplicate'), reverse_lazy('add_popup_pcrreplicate')))
         self.fields['pcr_replicate'].queryset = PcrReplicate.objects.filter(created_by=_user).order_by('-created_datetime')
-        self.fields['extraction'].widget = (AddAnotherWidgetWrapper(CustomSelect2(attrs={'class': 'form-control', }), reverse_lazy('add_popup_extraction')))
-        self.fields['extraction'].queryset = Extraction.objects.all().order_by('-created_datetime')
+        self.fields['extraction'].widget = (AddAnotherWidgetWrapper(Select2Autocomplete(url='autocomplete_extraction'), reverse_lazy('add_popup_extraction')))
+        self.fields['extraction'].queryset = Extraction.objects.all()
         self.fields['pcr_sop'].widget = (AddAnotherWidgetWrapper(CustomSelect2(attrs={'class': 'form-control', }), reverse_lazy('add_popup_standardoperatingprocedure', kwargs={'sop_type': SopTypes.WETLAB}, )))
         self.fields['pcr_sop'].queryset = StandardOperatingProcedure.objects.filter(sop_type=SopTypes.WETLAB).order_by('-created_datetime')
 
@@ -618,9 +612,9 @@ class PcrUpdateForm(forms.ModelForm):
         # filter form options by currently logged in user
         _user = kwargs.pop('user')
         super().__init__(*args, **kwargs)
-        self.fields['extraction'].widget = (AddAnotherWidgetWrapper(CustomSelect2(attrs={'class': 'form-control', }), reverse_lazy('add_popup_extraction')))
-        self.fields['extraction'].queryset = Extraction.objects.all().order_by('-created_datetime')
-        self.fields['pcr_replicate'].widget = (AddAnotherWidgetWrapper(CustomSelect2Multiple(attrs={'class': 'form-control', }), reverse_lazy('add_popup_pcrreplicate')))
+        self.fields['extraction'].widget = (AddAnotherWidgetWrapper(Select2Autocomplete(url='autocomplete_extraction'), reverse_lazy('add_popup_extraction')))
+        self.fields['extraction'].queryset = Extraction.objects.all()
+        self.fields['pcr_replicate'].widget = (AddAnotherWidgetWrapper(Select2AutocompleteMultiple(url='autocomplete_user_pcrreplicate'), reverse_lazy('add_popup_pcrreplicate')))
         self.fields['pcr_replicate'].queryset = PcrReplicate.objects.filter(created_by=_user).order_by('-created_datetime')
         self.fields['pcr_sop'].widget = (AddAnotherWidgetWrapper(CustomSelect2Multiple(attrs={'class': 'form-control', }), reverse_lazy('add_popup_standardoperatingprocedure', kwargs={'sop_type': SopTypes.WETLAB},)))
         self.fields['pcr_sop'].queryset = StandardOperatingProcedure.objects.filter(sop_type=SopTypes.WETLAB).order_by('-created_datetime')
@@ -904,10 +898,10 @@ class LibraryPrepCreateForm(forms.ModelForm):
         # https://simpleisbetterthancomplex.com/tutorial/2018/01/29/how-to-implement-dependent-or-chained-dropdown-list-with-django.html
         _user = kwargs.pop('user')
         super().__init__(*args, **kwargs)
-        self.fields['index_pair'].widget = (AddAnotherWidgetWrapper(CustomSelect2(attrs={'class': 'form-control', }), reverse_lazy('add_indexpair')))
+        self.fields['index_pair'].widget = (AddAnotherWidgetWrapper(Select2Autocomplete(url='autocomplete_user_indexpair'), reverse_lazy('add_indexpair')))
         self.fields['index_pair'].queryset = IndexPair.objects.filter(created_by=_user).order_by('-created_datetime')
-        self.fields['extraction'].widget = (AddAnotherWidgetWrapper(CustomSelect2(attrs={'class': 'form-control', }), reverse_lazy('add_popup_extraction')))
-        self.fields['extraction'].queryset = Extraction.objects.all().order_by('-created_datetime')
+        self.fields['extraction'].widget = (AddAnotherWidgetWrapper(Select2Autocomplete(url='autocomplete_extraction'), reverse_lazy('add_popup_extraction')))
+        self.fields['extraction'].queryset = Extraction.objects.all()
         self.fields['lib_prep_sop'].widget = (AddAnotherWidgetWrapper(CustomSelect2Multiple(attrs={'class': 'form-control', }), reverse_lazy('add_popup_standardoperatingprocedure', kwargs={'sop_type': SopTypes.WETLAB},)))
         self.fields['lib_prep_sop'].queryset = StandardOperatingProcedure.objects.filter(sop_type=SopTypes.WETLAB).order_by('-created_datetime')
 
@@ -1145,10 +1139,10 @@ class LibraryPrepUpdateForm(forms.ModelForm):
         # https://simpleisbetterthancomplex.com/tutorial/2018/01/29/how-to-implement-dependent-or-chained-dropdown-list-with-django.html
         _user = kwargs.pop('user')
         super().__init__(*args, **kwargs)
-        self.fields['index_pair'].widget = (AddAnotherWidgetWrapper(CustomSelect2(attrs={'class': 'form-control', }), reverse_lazy('add_indexpair')))
+        self.fields['index_pair'].widget = (AddAnotherWidgetWrapper(Select2Autocomplete(url='autocomplete_user_indexpair'), reverse_lazy('add_indexpair')))
         self.fields['index_pair'].queryset = IndexPair.objects.filter(created_by=_user).order_by('-created_datetime')
-        self.fields['extraction'].widget = (AddAnotherWidgetWrapper(CustomSelect2(attrs={'class': 'form-control', }), reverse_lazy('add_popup_extraction')))
-        self.fields['extraction'].queryset = Extraction.objects.all().order_by('-created_datetime')
+        self.fields['extraction'].widget = (AddAnotherWidgetWrapper(Select2Autocomplete(url='autocomplete_extraction'), reverse_lazy('add_popup_extraction')))
+        self.fields['extraction'].queryset = Extraction.objects.all()
         self.fields['lib_prep_sop'].widget = (AddAnotherWidgetWrapper(CustomSelect2Multiple(attrs={'class': 'form-control', }), reverse_lazy('add_popup_standardoperatingprocedure', kwargs={'sop_type': SopTypes.WETLAB},)))
         self.fields['lib_prep_sop'].queryset = StandardOperatingProcedure.objects.filter(sop_type=SopTypes.WETLAB).order_by('-created_datetime')
 
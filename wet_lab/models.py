@@ -531,6 +531,40 @@ class RunResult(DateTimeUserMixin):
         verbose_name_plural = 'Run Results'
 
 
+# LibraryPrep columns behind the FastqFile MIxS properties, {mixs field: LibraryPrep lookup}
+MIXS_LIBRARY_PREP_FIELDS = {
+    'nucl_acid_amp': 'amplification_method__amplification_method_name',
+    'lib_layout': 'lib_prep_layout',
+    'mid': 'index_pair__mixs_mid',
+    'adapters': 'index_pair__index_adapter',
+    'pcr_cond': 'lib_prep_thermal_cond',
+}
+# LibraryPrep -> PooledLibrary -> RunPrep -> RunResult -> FastqFile
+LIBRARY_PREP_FASTQ_PATH = 'libraryprep_to_pooledlibrary__pooledlibrary_to_runprep__runresult__run_results'
+
+
+def resolve_mixs_library_values(fastq_files):
+    # the library preps of a fastq file are those pooled into its run that share its extraction and primer set.
+    # Resolve them for every file in fastq_files with a single query and cache {mixs field: [values]} on each
+    # file, so the mixs_* properties of a whole sequencing run cost one query instead of five per file.
+    # returns {fastq pk: {mixs field: [values]}}
+    fastq_files = list(fastq_files)
+    library_values = {fastq_file.pk: {field: [] for field in MIXS_LIBRARY_PREP_FIELDS} for fastq_file in fastq_files}
+    if library_values:
+        # the lookups are passed to a single filter() so that they share one join from the library prep to the file
+        library_preps = LibraryPrep.objects.filter(**{
+            LIBRARY_PREP_FASTQ_PATH + '__in': list(library_values),
+            LIBRARY_PREP_FASTQ_PATH + '__extraction': models.F('extraction'),
+            LIBRARY_PREP_FASTQ_PATH + '__primer_set': models.F('primer_set'),
+        }).values_list(LIBRARY_PREP_FASTQ_PATH, 'pk', *MIXS_LIBRARY_PREP_FIELDS.values()).order_by('pk').distinct()
+        for fastq_pk, library_prep_pk, *values in library_preps:
+            for field, value in zip(MIXS_LIBRARY_PREP_FIELDS, values):
+                library_values[fastq_pk][field].append(value)
+    for fastq_file in fastq_files:
+        fastq_file._mixs_library_values = library_values[fastq_file.pk]
+    return library_values
+
+
 class FastqFile(DateTimeUserMixin):
     # https://www.section.io/engineering-education/how-to-upload-files-to-aws-s3-using-django-rest-framework/
     # https://blog.theodo.com/2019/07/aws-s3-upload-django/
@@ -559,19 +593,19 @@ class FastqFile(DateTimeUserMixin):
     def fastq_url(self):
         return self.fastq_datafile.url
 
+    def get_mixs_library_values(self):
+        # {mixs field: [values]} from the library preps of this file, see resolve_mixs_library_values
+        if not hasattr(self, '_mixs_library_values'):
+            resolve_mixs_library_values([self])
+        return self._mixs_library_values
+
     @property
     def mixs_nucl_acid_amp(self):
-        qs = LibraryPrep.objects.filter(pk__in=self.run_result.run_prep.pooled_library.values_list('library_prep'))
-        qs_extr = qs.filter(extraction=self.extraction, primer_set=self.primer_set)
-        qs_list = qs_extr.values_list('amplification_method__amplification_method_name', flat=True)
-        return '{qs}'.format(qs=list(qs_list))
+        return '{qs}'.format(qs=self.get_mixs_library_values()['nucl_acid_amp'])
 
     @property
     def mixs_lib_layout(self):
-        qs = LibraryPrep.objects.filter(pk__in=self.run_result.run_prep.pooled_library.values_list('library_prep'))
-        qs_extr = qs.filter(extraction=self.extraction, primer_set=self.primer_set)
-        qs_list = qs_extr.values_list('lib_prep_layout', flat=True)
-        return '{qs}'.format(qs=list(qs_list))
+        return '{qs}'.format(qs=self.get_mixs_library_values()['lib_layout'])
 
     @property
     def mixs_target_gene(self):
@@ -587,24 +621,15 @@ class FastqFile(DateTimeUserMixin):
 
     @property
     def mixs_mid(self):
-        qs = LibraryPrep.objects.filter(pk__in=self.run_result.run_prep.pooled_library.values_list('library_prep'))
-        qs_extr = qs.filter(extraction=self.extraction, primer_set=self.primer_set)
-        qs_list = qs_extr.values_list('index_pair__mixs_mid', flat=True)
-        return '{qs}'.format(qs=list(qs_list))
+        return '{qs}'.format(qs=self.get_mixs_library_values()['mid'])
 
     @property
     def mixs_adapters(self):
-        qs = LibraryPrep.objects.filter(pk__in=self.run_result.run_prep.pooled_library.values_list('library_prep'))
-        qs_extr = qs.filter(extraction=self.extraction, primer_set=self.primer_set)
-        qs_list = qs_extr.values_list('index_pair__index_adapter', flat=True)
-        return '{qs}'.format(qs=list(qs_list))
+        return '{qs}'.format(qs=self.get_mixs_library_values()['adapters'])
 
     @property
     def mixs_pcr_cond(self):
-        qs = LibraryPrep.objects.filter(pk__in=self.run_result.run_prep.pooled_library.values_list('library_prep'))
-        qs_extr = qs.filter(extraction=self.extraction, primer_set=self.primer_set)
-        qs_list = qs_extr.values_list('lib_prep_thermal_cond', flat=True)
-        return '{qs}'.format(qs=list(qs_list))
+        return '{qs}'.format(qs=self.get_mixs_library_values()['pcr_cond'])
 
     # @property
     # def mixs_seq_quality_check(self):
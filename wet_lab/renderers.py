@@ -2,6 +2,7 @@
 Custom renderers for exporting data in various formats including ENA XML
 """
 from rest_framework import renderers
+from django.conf import settings
 from django.utils.xmlutils import SimplerXMLGenerator
 from io import StringIO, BytesIO
 import datetime
@@ -137,6 +138,11 @@ class ENAXMLRenderer(renderers.BaseRenderer):
             ('turbidity', 'turbidity', False, 'FNU'),
             ('conductivity', 'conductivity', False, 'S/m'),
             ('dissolved_oxygen', 'dissolved oxygen', False, 'µmol/kg'),  # ENA requires µmol/kg not mg/L
+            ('nucl_acid_amp', 'nucleic acid amplification', False, None),
+            ('lib_layout', 'library layout', False, None),
+            ('mid', 'multiplex identifiers', False, None),
+            ('adapters', 'adapters', False, None),
+            ('pcr_cond', 'pcr conditions', False, None),
         ]
         
         for field_name, ena_name, mandatory, unit in attribute_mapping:
@@ -164,3 +170,83 @@ class ENAXMLRenderer(renderers.BaseRenderer):
             xml.characters(str(unit))
             xml.endElement('UNITS')
         xml.endElement('SAMPLE_ATTRIBUTE')
+
+
+class ZipStream:
+    """
+    Write-only file object for zipfile.ZipFile that holds what has been written until it is taken with pop().
+    It has no tell() or seek(), so zipfile writes each member with a data descriptor instead of seeking back
+    to the local header, and the archive can be sent while it is being written
+    """
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class StreamingENAXMLRenderer(ENAXMLRenderer):
+    """
+    ENA XML renderer that writes the ZIP while the samples are read
+    render_stream() takes any iterable of serialized samples, e.g., the rows of a queryset iterator, and yields
+    the archive in pieces. Submissions of more than samples_per_file samples are split into sample.xml,
+    sample_2.xml, sample_3.xml, ... so each file stays within what the ENA submission service accepts
+    """
+    def __init__(self, samples_per_file=None):
+        self.samples_per_file = samples_per_file or settings.ENA_SAMPLES_PER_FILE
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into the same ZIP as render_stream, in memory"""
+        if data is None:
+            return b''
+        if isinstance(data, list):
+            samples = data
+        elif isinstance(data, dict) and 'results' in data:
+            samples = data['results']
+        else:
+            samples = [data]
+        return b''.join(self.render_stream(samples))
+
+    def _sample_filename(self, index):
+        if index == 1:
+            return 'sample.xml'
+        return f'sample_{index}.xml'
+
+    def render_stream(self, samples):
+        """Yield the ZIP file containing submission.xml and the sample files, one piece at a time"""
+        output = ZipStream()
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr('submission.xml', self._generate_submission_xml())
+            yield output.pop()
+            samples = iter(samples)
+            sample_data = next(samples, None)
+            file_index = 1
+            # an empty submission still gets an empty SAMPLE_SET, as with ENAXMLRenderer
+            while file_index == 1 or sample_data is not None:
+                with zip_file.open(self._sample_filename(file_index), 'w') as sample_file:
+                    xml = SimplerXMLGenerator(sample_file, self.charset)
+                    xml.startDocument()
+                    xml.startElement('SAMPLE_SET', {})
+                    sample_count = 0
+                    while sample_data is not None and sample_count < self.samples_per_file:
+                        self._render_sample(xml, sample_data)
+                        sample_count += 1
+                        # the compressor holds back small amounts of output, so most samples add nothing yet
+                        chunk = output.pop()
+                        if chunk:
+                            yield chunk
+                        sample_data = next(samples, None)
+                    xml.endElement('SAMPLE_SET')
+                    xml.endDocument()
+                file_index += 1
+        # central directory
+        yield output.pop()
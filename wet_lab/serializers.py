@@ -1,14 +1,15 @@
-from django.db.models import Exists, OuterRef
+from django.db.models import Exists, OuterRef, Prefetch
 from rest_framework import serializers
 from .models import PrimerPair, IndexPair, IndexRemovalMethod, SizeSelectionMethod, QuantificationMethod, \
     ExtractionMethod, Extraction, PcrReplicate, Pcr, LibraryPrep, PooledLibrary, RunPrep, \
-    RunResult, FastqFile, AmplificationMethod
+    RunResult, FastqFile, AmplificationMethod, resolve_mixs_library_values
 from sample_label.models import SampleBarcode
-from field_survey.models import FieldSample
+from field_survey.models import FieldSample, EnvMeasure
 from utility.models import ProcessLocation, StandardOperatingProcedure
 from utility.enumerations import YesNo, TargetGenes, SubFragments, PcrTypes, PcrUnits, VolUnits, ConcentrationUnits, \
     LibPrepTypes, LibLayouts, InvestigationTypes, SeqMethods, ControlTypes
 from rest_framework.validators import UniqueValidator, UniqueTogetherValidator
+from utility.serializers import EagerLoadingMixin
 # would have to add another serializer that uses GeoFeatureModelSerializer class
 # and a separate button for downloading GeoJSON format along with CSV
 
@@ -426,13 +427,72 @@ class FastqFileSerializer(serializers.ModelSerializer):
     extraction = serializers.SlugRelatedField(many=False, read_only=False, allow_null=True, slug_field='barcode_slug', queryset=Extraction.objects.all())
 
 
-class MixsWaterSerializer(serializers.ModelSerializer):
+def get_env_measurement_values(field_survey):
+    # {env_measure_type_code: env_measure_value} for the survey, pivoted once from the prefetched env_measurements
+    # (see MIXS_PREFETCH_RELATED_FIELDS) and cached on the survey; the first measurement by pk wins, as with .first()
+    if not hasattr(field_survey, '_env_measurement_values'):
+        if 'env_measurements' in getattr(field_survey, '_prefetched_objects_cache', {}):
+            env_measurements = sorted(field_survey.env_measurements.all(), key=lambda env_measurement: env_measurement.pk)
+        else:
+            env_measurements = field_survey.env_measurements.select_related('env_measure_type').order_by('pk')
+        env_measurement_values = {}
+        for env_measurement in env_measurements:
+            env_measurement_values.setdefault(env_measurement.env_measure_type.env_measure_type_code,
+                                              env_measurement.env_measure_value)
+        field_survey._env_measurement_values = env_measurement_values
+    return field_survey._env_measurement_values
+
+
+# every relation read by the MIxS serializers, so serializing a page or an export costs a fixed number of queries
+MIXS_SELECT_RELATED_FIELDS = ('survey_global_id__site_id__envo_biome_first', 'survey_global_id__site_id__envo_biome_second',
+                              'survey_global_id__site_id__envo_biome_third', 'survey_global_id__site_id__envo_biome_fourth',
+                              'survey_global_id__site_id__envo_biome_fifth', 'field_sample_barcode', 'sample_type',
+                              'extraction__extraction_method__extraction_sop', )
+MIXS_PREFETCH_RELATED_FIELDS = (Prefetch('survey_global_id__env_measurements',
+                                         queryset=EnvMeasure.objects.select_related('env_measure_type')),
+                                'survey_global_id__project_ids', 'extraction__extractions', )
+
+
+def get_field_sample_fastq_files(field_sample):
+    # fastq files sequenced from the sample's extraction, read from the prefetched extraction__extractions
+    try:
+        extraction = field_sample.extraction
+    except Extraction.DoesNotExist:
+        return []
+    return list(extraction.extractions.all())
+
+
+def get_mixs_library_value(field_sample, field):
+    # distinct library prep values of every fastq file of the sample, e.g., the mids of each primer set;
+    # the values are resolved in one query per page by MixsListSerializer
+    values = []
+    for fastq_file in get_field_sample_fastq_files(field_sample):
+        for value in fastq_file.get_mixs_library_values()[field]:
+            if value and value not in values:
+                values.append(value)
+    return '; '.join(values) if values else None
+
+
+class MixsListSerializer(serializers.ListSerializer):
+    # resolve the LibraryPrep-derived MIxS fields of the fastq files of every sample in the page, chunk or
+    # export with a single query before the samples are serialized
+    def to_representation(self, data):
+        field_samples = list(data.all() if hasattr(data, 'all') else data)
+        resolve_mixs_library_values(fastq_file for field_sample in field_samples
+                                    for fastq_file in get_field_sample_fastq_files(field_sample))
+        return super().to_representation(field_samples)
+
+
+class MixsWaterSerializer(serializers.ModelSerializer, EagerLoadingMixin):
     """
     Serializer for water FieldSample data in MIxS format
     Updated to work with FieldSample model directly
     """
     sample_id = serializers.UUIDField(source='sample_global_id', read_only=True)
     barcode = serializers.CharField(source='barcode_slug', read_only=True)
+
+    select_related_fields = MIXS_SELECT_RELATED_FIELDS + ('filter_sample', )
+    prefetch_related_fields = MIXS_PREFETCH_RELATED_FIELDS
     
     class Meta:
         model = FieldSample
@@ -440,7 +500,9 @@ class MixsWaterSerializer(serializers.ModelSerializer):
                   'geo_loc_name', 'collection_date', 'env_broad_scale', 'env_local_scale', 'env_medium',
                   'sample_type', 'sampling_method', 'samp_collect_device', 'samp_mat_process', 'samp_size', 
                   'nucl_acid_ext', 'geographic_location_latitude', 'geographic_location_longitude',
-                  'geographic_location_country', 'temperature', 'ph', 'turbidity', 'conductivity', 'dissolved_oxygen']
+                  'geographic_location_country', 'temperature', 'ph', 'turbidity', 'conductivity', 'dissolved_oxygen',
+                  'nucl_acid_amp', 'lib_layout', 'mid', 'adapters', 'pcr_cond']
+        list_serializer_class = MixsListSerializer
     
     # Survey and Site fields
     project_name = serializers.ReadOnlyField(source='survey_global_id.mixs_project_name')
@@ -469,6 +531,13 @@ class MixsWaterSerializer(serializers.ModelSerializer):
     
     # Extraction (if exists)
     nucl_acid_ext = serializers.SerializerMethodField()
+
+    # Library prep fields of the sample's fastq files
+    nucl_acid_amp = serializers.SerializerMethodField()
+    lib_layout = serializers.SerializerMethodField()
+    mid = serializers.SerializerMethodField()
+    adapters = serializers.SerializerMethodField()
+    pcr_cond = serializers.SerializerMethodField()
     
     # Environmental measurements (from env_measure)
     depth = serializers.SerializerMethodField()
@@ -524,12 +593,10 @@ class MixsWaterSerializer(serializers.ModelSerializer):
     def get_env_measurement(self, obj, measure_type):
         """Helper to get environmental measurement by type - returns just the value without units for ENA compliance"""
         if hasattr(obj, 'survey_global_id') and obj.survey_global_id:
-            env_measurements = obj.survey_global_id.env_measurements.filter(
-                env_measure_type__env_measure_type_code=measure_type
-            ).first()
-            if env_measurements:
+            env_measure_value = get_env_measurement_values(obj.survey_global_id).get(measure_type)
+            if env_measure_value is not None:
                 # Return just the value for ENA compliance
-                return str(env_measurements.env_measure_value)
+                return str(env_measure_value)
         return None
     
     def get_depth(self, obj):
@@ -561,6 +628,22 @@ class MixsWaterSerializer(serializers.ModelSerializer):
             except (ValueError, TypeError):
                 return value
         return value
+
+    def get_nucl_acid_amp(self, obj):
+        return get_mixs_library_value(obj, 'nucl_acid_amp')
+
+    def get_lib_layout(self, obj):
+        return get_mixs_library_value(obj, 'lib_layout')
+
+    def get_mid(self, obj):
+        return get_mixs_library_value(obj, 'mid')
+
+    def get_adapters(self, obj):
+        return get_mixs_library_value(obj, 'adapters')
+
+    def get_pcr_cond(self, obj):
+        return get_mixs_library_value(obj, 'pcr_cond')
+
     # seq_quality_check = serializers.ReadOnlyField(source='mixs_seq_quality_check')
     # chimera_check = serializers.ReadOnlyField(source='mixs_chimera_check')
     # denoise_cluster_method = serializers.ReadOnlyField(source='run_result.quality_metadata.denoise_cluster_metadata.denoise_cluster_method')
@@ -581,13 +664,16 @@ class MixsWaterSerializer(serializers.ModelSerializer):
     # ta_common_name = serializers.ReadOnlyField(source='run_result.quality_metadata.denoise_cluster_metadata.annotation_metadata.taxonomic_annotation.ta_common_name')
 
 
-class MixsSedimentSerializer(serializers.ModelSerializer):
+class MixsSedimentSerializer(serializers.ModelSerializer, EagerLoadingMixin):
     """
     Serializer for sediment FieldSample data in MIxS format
     Updated to work with FieldSample model directly
     """
     sample_id = serializers.UUIDField(source='sample_global_id', read_only=True)
     barcode = serializers.CharField(source='barcode_slug', read_only=True)
+
+    select_related_fields = MIXS_SELECT_RELATED_FIELDS + ('subcore_sample', )
+    prefetch_related_fields = MIXS_PREFETCH_RELATED_FIELDS
     
     class Meta:
         model = FieldSample
@@ -595,7 +681,9 @@ class MixsSedimentSerializer(serializers.ModelSerializer):
                   'geo_loc_name', 'collection_date', 'env_broad_scale', 'env_local_scale', 'env_medium',
                   'sample_type', 'sampling_method', 'samp_collect_device', 'samp_mat_process', 'samp_size',
                   'nucl_acid_ext', 'geographic_location_latitude', 'geographic_location_longitude',
-                  'geographic_location_country', 'temperature', 'ph']
+                  'geographic_location_country', 'temperature', 'ph',
+                  'nucl_acid_amp', 'lib_layout', 'mid', 'adapters', 'pcr_cond']
+        list_serializer_class = MixsListSerializer
     
     # Survey and Site fields
     project_name = serializers.ReadOnlyField(source='survey_global_id.mixs_project_name')
@@ -624,6 +712,13 @@ class MixsSedimentSerializer(serializers.ModelSerializer):
     
     # Extraction (if exists)
     nucl_acid_ext = serializers.SerializerMethodField()
+
+    # Library prep fields of the sample's fastq files
+    nucl_acid_amp = serializers.SerializerMethodField()
+    lib_layout = serializers.SerializerMethodField()
+    mid = serializers.SerializerMethodField()
+    adapters = serializers.SerializerMethodField()
+    pcr_cond = serializers.SerializerMethodField()
     
     # Environmental measurements (from env_measure)
     depth = serializers.SerializerMethodField()
@@ -674,12 +769,10 @@ class MixsSedimentSerializer(serializers.ModelSerializer):
     def get_env_measurement(self, obj, measure_type):
         """Helper to get environmental measurement by type - returns just the value without units for ENA compliance"""
         if hasattr(obj, 'survey_global_id') and obj.survey_global_id:
-            env_measurements = obj.survey_global_id.env_measurements.filter(
-                env_measure_type__env_measure_type_code=measure_type
-            ).first()
-            if env_measurements:
+            env_measure_value = get_env_measurement_values(obj.survey_global_id).get(measure_type)
+            if env_measure_value is not None:
                 # Return just the value for ENA compliance
-                return str(env_measurements.env_measure_value)
+                return str(env_measure_value)
         return None
     
     def get_depth(self, obj):
@@ -691,6 +784,21 @@ class MixsSedimentSerializer(serializers.ModelSerializer):
     def get_ph(self, obj):
         return self.get_env_measurement(obj, 'ph')
 
+    def get_nucl_acid_amp(self, obj):
+        return get_mixs_library_value(obj, 'nucl_acid_amp')
+
+    def get_lib_layout(self, obj):
+        return get_mixs_library_value(obj, 'lib_layout')
+
+    def get_mid(self, obj):
+        return get_mixs_library_value(obj, 'mid')
+
+    def get_adapters(self, obj):
+        return get_mixs_library_value(obj, 'adapters')
+
+    def get_pcr_cond(self, obj):
+        return get_mixs_library_value(obj, 'pcr_cond')
+
     # seq_quality_check = serializers.ReadOnlyField(source='mixs_seq_quality_check')
     # chimera_check = serializers.ReadOnlyField(source='mixs_chimera_check')
     # denoise_cluster_method = serializers.ReadOnlyField(source='run_result.quality_metadata.denoise_cluster_metadata.denoise_cluster_method')
@@ -0,0 +1,17 @@
+# dashboard chart data, cached by utility.stats until a row it is counted from changes
+# https://simpleisbetterthancomplex.com/tutorial/2020/01/19/how-to-use-chart-js-with-django.html
+from utility.charts import return_month_series_lists
+from utility.stats import register_stat
+from .models import Extraction, RunResult
+
+
+@register_stat('run_result_count', ['wet_lab.RunResult'])
+def get_run_result_count_stat():
+    labels, (data, ) = return_month_series_lists((RunResult.objects.all(), 'run_completion_datetime'))
+    return {'labels': labels, 'data': data, }
+
+
+@register_stat('extraction_count', ['wet_lab.Extraction'])
+def get_extraction_count_stat():
+    labels, (data, ) = return_month_series_lists((Extraction.objects.all(), 'extraction_datetime'))
+    return {'labels': labels, 'data': data, }
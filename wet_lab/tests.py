@@ -1,14 +1,25 @@
-from django.test import TestCase
+import io
+import json
+import zipfile
+from django.db import connection
+from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from .models import PrimerPair, IndexPair, IndexRemovalMethod, QuantificationMethod, ExtractionMethod, \
     SizeSelectionMethod, Extraction, PcrReplicate, Pcr, LibraryPrep, PooledLibrary, \
-    RunPrep, RunResult, FastqFile, AmplificationMethod
+    RunPrep, RunResult, FastqFile, AmplificationMethod, resolve_mixs_library_values
 from utility.enumerations import TargetGenes, SubFragments, PcrTypes, VolUnits, ConcentrationUnits, PcrUnits, LibPrepKits, \
     LibPrepTypes, PhiXConcentrationUnits, LibLayouts, YesNo, ControlTypes
 from utility.tests import ProcessLocationTestCase, StandardOperatingProcedureTestCase
 from utility.models import ProcessLocation, StandardOperatingProcedure
-from sample_label.models import SampleBarcode
-from field_survey.models import FieldSample
+from sample_label.models import SampleBarcode, get_water_sample_type
+from sample_label.tests import SampleBarcodeTestCase
+from field_site.models import FieldSite
+from field_survey.models import FieldSample, FieldSurvey, EnvMeasureType, EnvMeasure
 from field_survey.tests import FieldSampleTestCase
+from .serializers import MixsWaterSerializer, MixsSedimentSerializer
+from .renderers import StreamingENAXMLRenderer
+from .views import UnassignedFieldSampleAutocompleteView
+from users.models import CustomUser
 from django.utils import timezone
 
 
@@ -169,6 +180,14 @@ class ExtractionTestCase(TestCase):
         test_exists = Extraction.objects.filter(extraction_notes='test notes')[:1].get()
         self.assertIs(test_exists.was_added_recently(), True)
 
+    def test_unassigned_field_sample_options(self):
+        # field samples that already have an extraction are not offered again
+        request = RequestFactory().get('/', {'term': ''})
+        request.user = CustomUser.objects.create_superuser(email='super@user.com', password='foo')
+        data = json.loads(UnassignedFieldSampleAutocompleteView.as_view()(request).content)
+        extraction = Extraction.objects.filter(extraction_notes='test notes')[:1].get()
+        self.assertNotIn(str(extraction.field_sample.pk), [str(result['id']) for result in data['results']])
+
 
 class PcrReplicateTestCase(TestCase):
     def setUp(self):
@@ -383,3 +402,85 @@ class FastqFileTestCase(TestCase):
         # test if date is added correctly
         test_exists = FastqFile.objects.filter()[:1].get()
         self.assertIs(test_exists.was_added_recently(), True)
+
+    def test_resolve_mixs_library_values(self):
+        # all of the library prep properties come from one query, for one file or a whole run
+        fastq_file = FastqFile.objects.filter()[:1].get()
+        library_prep = LibraryPrep.objects.select_related('index_pair').filter()[:1].get()
+        with CaptureQueriesContext(connection) as queries:
+            resolve_mixs_library_values([fastq_file])
+            lib_layout, mid, pcr_cond = fastq_file.mixs_lib_layout, fastq_file.mixs_mid, fastq_file.mixs_pcr_cond
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(lib_layout, str([library_prep.lib_prep_layout]))
+        self.assertEqual(mid, str([library_prep.index_pair.mixs_mid]))
+        self.assertEqual(pcr_cond, str([library_prep.lib_prep_thermal_cond]))
+        # files without a run have no library preps
+        FastqFile.objects.filter(pk=fastq_file.pk).update(run_result=None)
+        fastq_file = FastqFile.objects.get(pk=fastq_file.pk)
+        self.assertEqual(fastq_file.mixs_adapters, '[]')
+
+
+class MixsSerializerQueryCountTestCase(TestCase):
+    def setUp(self):
+        sample_barcode_test = SampleBarcodeTestCase()
+        sample_barcode_test.setUp()
+        field_site = FieldSite.objects.filter()[:1].get()
+        self.field_survey = FieldSurvey.objects.create(site_id=field_site, recorder_fname='test_first_name')
+        for env_measure_type_code, env_measure_value in [('depth', '10'), ('water_temp', '12.5'), ('ph', '7.1'),
+                                                         ('water_turbidity', '3'), ('conductivity', '150'), ('do', '9')]:
+            env_measure_type = EnvMeasureType.objects.create(env_measure_type_code=env_measure_type_code,
+                                                             env_measure_type_unit='unit',
+                                                             env_measure_type_name=env_measure_type_code)
+            EnvMeasure.objects.create(env_measure_type=env_measure_type, env_measure_value=env_measure_value,
+                                      survey_global_id=self.field_survey)
+        self.add_field_sample('pRR_S00_00m_0000')
+
+    def add_field_sample(self, sample_barcode_id):
+        sample_barcode = SampleBarcode.objects.filter(sample_barcode_id=sample_barcode_id).first()
+        if sample_barcode is None:
+            template = SampleBarcode.objects.filter()[:1].get()
+            sample_barcode = SampleBarcode.objects.create(sample_barcode_id=sample_barcode_id,
+                                                          sample_label_request=template.sample_label_request,
+                                                          site_id=template.site_id,
+                                                          sample_type=template.sample_type,
+                                                          sample_year=template.sample_year,
+                                                          purpose=template.purpose)
+        FieldSample.objects.create(field_sample_barcode=sample_barcode, survey_global_id=self.field_survey,
+                                   sample_type_id=get_water_sample_type())
+
+    def serialize(self, serializer_class):
+        queryset = serializer_class.setup_eager_loading(FieldSample.objects.order_by('barcode_slug'))
+        with CaptureQueriesContext(connection) as queries:
+            data = serializer_class(queryset, many=True).data
+        return data, len(queries)
+
+    def assert_constant_queries(self, serializer_class):
+        # adding samples does not add queries
+        data, single_sample_queries = self.serialize(serializer_class)
+        self.assertEqual(data[0]['depth'], '10')
+        self.assertEqual(data[0]['temperature'], '12.5')
+        self.add_field_sample('pRR_S00_00m_0001')
+        self.add_field_sample('pRR_S00_00m_0002')
+        data, many_sample_queries = self.serialize(serializer_class)
+        self.assertEqual(len(data), 3)
+        self.assertEqual(data[2]['ph'], '7.1')
+        self.assertEqual(many_sample_queries, single_sample_queries)
+
+    def test_mixs_water_query_count(self):
+        self.assert_constant_queries(MixsWaterSerializer)
+
+    def test_mixs_sediment_query_count(self):
+        self.assert_constant_queries(MixsSedimentSerializer)
+
+
+class StreamingENAXMLRendererTestCase(TestCase):
+    def test_split_sample_files(self):
+        # samples are read lazily and split across sample files of at most samples_per_file samples
+        samples = ({'sample_id': 'sample_{num}'.format(num=num), 'project_name': 'test'} for num in range(5))
+        chunks = list(StreamingENAXMLRenderer(samples_per_file=2).render_stream(samples))
+        self.assertGreater(len(chunks), 1)
+        zip_file = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(zip_file.namelist(), ['submission.xml', 'sample.xml', 'sample_2.xml', 'sample_3.xml'])
+        self.assertEqual(zip_file.read('sample.xml').count(b'<SAMPLE '), 2)
+        self.assertIn(b'alias="sample_4"', zip_file.read('sample_3.xml'))
+
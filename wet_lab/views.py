@@ -1,8 +1,7 @@
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.core.exceptions import PermissionDenied
-from django.db.models import Q, F, Count, Func, Value, CharField
-from django.db.models.functions import TruncMonth
+from django.db.models import Q
 from django.http import JsonResponse
 from django.shortcuts import redirect
 from django.urls import reverse
@@ -14,8 +13,9 @@ from django_tables2.views import SingleTableMixin
 from django_filters.views import FilterView
 from rest_framework import viewsets
 from utility.serializers import SerializerExportMixin, CharSerializerExportMixin
-from utility.views import export_context, CreatePopupMixin, UpdatePopupMixin
-from utility.charts import return_queryset_lists, return_zeros_lists, return_merged_zeros_lists, return_json
+from utility.views import export_context, CreatePopupMixin, UpdatePopupMixin, Select2AutocompleteView
+from utility.charts import return_json
+from utility.stats import get_stat
 import wet_lab.serializers as wetlab_serializers
 import wet_lab.filters as wetlab_filters
 from .models import PrimerPair, IndexPair, IndexRemovalMethod, \
@@ -26,8 +26,9 @@ from .forms import IndexPairForm, ExtractionForm, PcrCreateForm, PcrUpdateForm,
     LibraryPrepUpdateForm, PooledLibraryForm, RunPrepForm, RunResultForm, FastqFileUpdateForm, FastqFileCreateForm
 from .tables import ExtractionTable, PcrTable, LibraryPrepTable, PooledLibraryTable, \
     RunPrepTable, RunResultTable, FastqFileTable, MixsWaterTable, MixsSedimentTable
-from .renderers import ENAXMLRenderer
+from .renderers import StreamingENAXMLRenderer
 from django.conf import settings
+from sample_label.models import SampleBarcode
 
 
 
@@ -35,24 +36,67 @@ from django.conf import settings
 ########################################
 # FRONTEND REQUESTS                    #
 ########################################
+class ExtractionAutocompleteView(Select2AutocompleteView):
+    # filters and the extraction of pcr and library prep forms, newest first
+    model = Extraction
+    text_field = 'barcode_slug'
+    ordering = ['-created_datetime', 'pk']
+    cache_timeout = settings.SELECT2_CACHE_TIMEOUT
+
+
+class UnassignedFieldSampleAutocompleteView(Select2AutocompleteView):
+    # field samples of ExtractionForm; a field sample is extracted once, the current one is rendered by the widget
+    model = FieldSample
+    text_field = 'barcode_slug'
+    search_fields = ['barcode_slug', 'field_sample_barcode__sample_barcode_id']
+    cache_timeout = settings.SELECT2_CACHE_TIMEOUT
+
+    def get_base_queryset(self):
+        return FieldSample.objects.filter(extraction__isnull=True)
+
+
+class UnassignedSampleBarcodeAutocompleteView(Select2AutocompleteView):
+    # extraction barcodes of ExtractionForm not yet used by an extraction
+    model = SampleBarcode
+    text_field = 'sample_barcode_id'
+    cache_timeout = settings.SELECT2_CACHE_TIMEOUT
+
+    def get_base_queryset(self):
+        return SampleBarcode.objects.filter(extraction__isnull=True)
+
+
+class UserPcrReplicateAutocompleteView(Select2AutocompleteView):
+    # pcr replicates of the pcr forms created by the current user, newest first
+    model = PcrReplicate
+    text_field = 'pcr_replicate_slug'
+    ordering = ['-created_datetime', 'pk']
+    cache_timeout = settings.SELECT2_CACHE_TIMEOUT
+
+    def get_base_queryset(self):
+        return PcrReplicate.objects.filter(created_by=self.request.user)
+
+
+class UserIndexPairAutocompleteView(Select2AutocompleteView):
+    # index pairs of the library prep forms created by the current user, newest first
+    model = IndexPair
+    text_field = 'index_slug'
+    ordering = ['-created_datetime', 'pk']
+    cache_timeout = settings.SELECT2_CACHE_TIMEOUT
+
+    def get_base_queryset(self):
+        return IndexPair.objects.filter(created_by=self.request.user)
+
+
 @login_required(login_url='dashboard_login')
 def get_run_result_count_chart(request):
-    # https://simpleisbetterthancomplex.com/tutorial/2020/01/19/how-to-use-chart-js-with-django.html
-    # https://stackoverflow.com/questions/38570258/how-to-get-django-queryset-results-with-formatted-datetime-field
-    # https://stackoverflow.com/questions/52354104/django-query-set-for-counting-records-each-month
-    labels, data = return_queryset_lists(RunResult.objects.annotate(run_completion_date=TruncMonth('run_completion_datetime')).values('run_completion_date').annotate(data=Count('pk')).annotate(label=Func(F('run_completion_datetime'), Value('MM/YYYY'), function='to_char', output_field=CharField())))
-    labels, data = return_zeros_lists(labels, data)
-    return JsonResponse(data={'labels': labels, 'data': data, })
+    # chart data is read from the cache, see wet_lab.stats
+    return JsonResponse(data=get_stat('run_result_count'))
 
 
 @login_required(login_url='dashboard_login')
 def get_extraction_count_chart(request):
-    # https://simpleisbetterthancomplex.com/tutorial/2020/01/19/how-to-use-chart-js-with-django.html
-    # https://stackoverflow.com/questions/38570258/how-to-get-django-queryset-results-with-formatted-datetime-field
-    # https://stackoverflow.com/questions/52354104/django-query-set-for-counting-records-each-month
-    labels, data = return_queryset_lists(Extraction.objects.annotate(extraction_date=TruncMonth('extraction_datetime')).values('extraction_date').annotate(data=Count('pk')).annotate(label=Func(F('extraction_datetime'), Value('MM/YYYY'), function='to_char', output_field=CharField())))
-    labels, data = return_zeros_lists(labels, data)
-    return JsonResponse(data={'labels': labels, 'data': data, })
+    # chart data is read from the cache, see wet_lab.stats
+    return JsonResponse(data=get_stat('extraction_count'))
 
 
 ########################################
@@ -1099,7 +1143,7 @@ class MixsWaterFilterView(LoginRequiredMixin,
     export_formats = list(settings.EXPORT_FORMATS) + ['ena_xml']
     # Specify custom renderer for XML
     renderer_classes = {
-        'ena_xml': ENAXMLRenderer,
+        'ena_xml': StreamingENAXMLRenderer,
     }
 
     def get_context_data(self, **kwargs):
@@ -1116,17 +1160,10 @@ class MixsWaterFilterView(LoginRequiredMixin,
         # This gives access to: FieldSample, survey_global_id (FieldSurvey), 
         # field_sample_barcode (SampleBarcode), sample_type (SampleType),
         # filter_sample (FilterSample), and env_measurements through survey
-        queryset = FieldSample.objects.filter(sample_type__sample_type_code='ws').select_related(
-            'survey_global_id',
-            'field_sample_barcode',
-            'sample_type',
-            'filter_sample'
-        ).prefetch_related(
-            'survey_global_id__env_measurements',
-            'survey_global_id__site_id',
-            'survey_global_id__project_ids'
-        )
-        return queryset
+        # the related tables are loaded with the serializer's select_related_fields and prefetch_related_fields,
+        # so the table and its exports take the same number of queries for any number of samples
+        queryset = FieldSample.objects.filter(sample_type__sample_type_code='ws')
+        return self.serializer_class.setup_eager_loading(queryset)
 
     def handle_no_permission(self):
         if self.raise_exception:
@@ -1151,7 +1188,7 @@ class MixsSedimentFilterView(LoginRequiredMixin, PermissionRequiredMixin, CharSe
     export_formats = list(settings.EXPORT_FORMATS) + ['ena_xml']
     # Specify custom renderer for XML
     renderer_classes = {
-        'ena_xml': ENAXMLRenderer,
+        'ena_xml': StreamingENAXMLRenderer,
     }
 
     def get_context_data(self, **kwargs):
@@ -1168,16 +1205,10 @@ class MixsSedimentFilterView(LoginRequiredMixin, PermissionRequiredMixin, CharSe
         # This gives access to: FieldSample, survey_global_id (FieldSurvey), 
         # field_sample_barcode (SampleBarcode), sample_type (SampleType),
         # subcore_sample (SubCoreSample), and env_measurements through survey
-        queryset = FieldSample.objects.filter(sample_type__sample_type_code='ex').select_related(
-            'survey_global_id',
-            'field_sample_barcode',
-            'sample_type',
-            'subcore_sample'
-        ).prefetch_related(
-            'survey_global_id__env_measurements',
-            'survey_global_id__project_ids'
-        )
-        return queryset
+        # the related tables are loaded with the serializer's select_related_fields and prefetch_related_fields,
+        # so the table and its exports take the same number of queries for any number of samples
+        queryset = FieldSample.objects.filter(sample_type__sample_type_code='ex')
+        return self.serializer_class.setup_eager_loading(queryset)
 
     def handle_no_permission(self):
         if self.raise_exception:
@@ -1315,15 +1346,25 @@ class FastqFileViewSet(viewsets.ModelViewSet):
 # MIXS
 class MixsWaterReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = wetlab_serializers.MixsWaterSerializer
-    queryset = FastqFile.objects.prefetch_related('feature', 'annotation_metadata', 'reference_database', )
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = wetlab_filters.MixsWaterSerializerFilter
     swagger_tags = ['mixs']
 
+    def get_queryset(self):
+        # same FieldSample query as MixsWaterFilterView; the library prep fields of every fastq file in the page
+        # are resolved in one query by the serializer's list_serializer_class
+        queryset = FieldSample.objects.filter(sample_type__sample_type_code='ws')
+        return self.get_serializer_class().setup_eager_loading(queryset)
+
 
 class MixsSedimentReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = wetlab_serializers.MixsSedimentSerializer
-    queryset = FastqFile.objects.prefetch_related('feature', 'annotation_metadata', 'reference_database', )
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = wetlab_filters.MixsSedimentSerializerFilter
     swagger_tags = ['mixs']
+
+    def get_queryset(self):
+        # same FieldSample query as MixsSedimentFilterView; the library prep fields of every fastq file in the page
+        # are resolved in one query by the serializer's list_serializer_class
+        queryset = FieldSample.objects.filter(sample_type__sample_type_code='ex')
+        return self.get_serializer_class().setup_eager_loading(queryset)